@@ -53,7 +53,9 @@ CREATE TABLE `course_enrollments` (
   `progress` int(11) DEFAULT 0 CHECK (`progress` >= 0 and `progress` <= 100),
   `completed` tinyint(1) DEFAULT 0,
   `enrolled_at` timestamp NOT NULL DEFAULT current_timestamp(),
-  `completed_at` timestamp NULL DEFAULT NULL
+  `completed_at` timestamp NULL DEFAULT NULL,
+  `last_accessed_at` timestamp NULL DEFAULT NULL,
+  `last_watch_position` int(11) DEFAULT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -152,6 +154,19 @@ INSERT INTO `employee_course_demonstrations` (`id`, `user_id`, `course_name`, `p
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `entity_versions`
+--
+
+CREATE TABLE `entity_versions` (
+  `entity` varchar(64) NOT NULL,
+  `scope` varchar(255) NOT NULL,
+  `version` bigint(20) UNSIGNED NOT NULL DEFAULT 0,
+  `updated_at` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `job_applications`
 --
@@ -264,6 +279,20 @@ INSERT INTO `login_sessions` (`id`, `user_id`, `user_agent`, `ip_address`, `logi
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `notification_recipients`
+--
+
+CREATE TABLE `notification_recipients` (
+  `user_id` int(11) NOT NULL,
+  `notification_id` int(11) NOT NULL,
+  `is_read` tinyint(1) NOT NULL DEFAULT 0,
+  `created_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  `read_at` timestamp NULL DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `notifications`
 --
@@ -394,6 +423,20 @@ INSERT INTO `tasks` (`id`, `title`, `description`, `documentation`, `document_ur
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `upload_blobs`
+--
+
+CREATE TABLE `upload_blobs` (
+  `sha256` char(64) NOT NULL,
+  `size` bigint(20) UNSIGNED NOT NULL,
+  `ref_count` int(11) NOT NULL DEFAULT 0,
+  `created_at` timestamp NOT NULL DEFAULT current_timestamp(),
+  `released_at` timestamp NULL DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `users`
 --
@@ -464,7 +507,8 @@ CREATE TABLE `user_skills` (
 --
 ALTER TABLE `courses`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `idx_courses_department` (`department`);
+  ADD KEY `idx_courses_department` (`department`),
+  ADD KEY `idx_courses_updated_at` (`updated_at`);
 
 --
 -- Indexes for table `course_certificates`
@@ -516,6 +560,7 @@ ALTER TABLE `course_quiz_questions`
 --
 ALTER TABLE `course_watch_history`
   ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `uniq_watch_history_user_course_date` (`user_id`,`course_id`,`watch_date`),
   ADD KEY `user_id` (`user_id`),
   ADD KEY `course_id` (`course_id`);
 
@@ -524,14 +569,23 @@ ALTER TABLE `course_watch_history`
 --
 ALTER TABLE `employee_course_demonstrations`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `user_id` (`user_id`);
+  ADD KEY `user_id` (`user_id`),
+  ADD KEY `idx_demonstrations_user_submitted` (`user_id`,`submitted_at`);
+
+--
+-- Indexes for table `entity_versions`
+--
+ALTER TABLE `entity_versions`
+  ADD PRIMARY KEY (`entity`,`scope`);
 
 --
 -- Indexes for table `job_applications`
 --
 ALTER TABLE `job_applications`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `user_id` (`user_id`);
+  ADD KEY `user_id` (`user_id`),
+  ADD KEY `idx_job_applications_user_submitted` (`user_id`,`submitted_at`),
+  ADD KEY `idx_job_applications_cv_url` (`cv_url`);
 
 --
 -- Indexes for table `job_opportunities`
@@ -557,25 +611,44 @@ ALTER TABLE `leave_requests`
 -- Indexes for table `login_sessions`
 --
 ALTER TABLE `login_sessions`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_login_sessions_user_active` (`user_id`,`is_active`),
+  ADD KEY `idx_login_sessions_active` (`is_active`),
+  ADD KEY `idx_login_sessions_login_time` (`login_time`);
+
+--
+-- Indexes for table `notification_recipients`
+--
+ALTER TABLE `notification_recipients`
+  ADD PRIMARY KEY (`user_id`,`notification_id`),
+  ADD KEY `idx_notification_recipients_inbox` (`user_id`,`created_at`,`notification_id`),
+  ADD KEY `idx_notification_recipients_unread` (`user_id`,`is_read`),
+  ADD KEY `idx_notification_recipients_notification` (`notification_id`);
 
 --
 -- Indexes for table `notifications`
 --
 ALTER TABLE `notifications`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_notifications_created_at` (`created_at`),
+  ADD KEY `idx_notifications_user_created` (`user_id`,`created_at`);
 
 --
 -- Indexes for table `quizzes`
 --
 ALTER TABLE `quizzes`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_quizzes_uploaded_by` (`uploaded_by`),
+  ADD KEY `idx_quizzes_department` (`department`),
+  ADD KEY `idx_quizzes_file_url` (`file_url`);
 
 --
 -- Indexes for table `quiz_submissions`
 --
 ALTER TABLE `quiz_submissions`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_quiz_submissions_quiz` (`quiz_id`),
+  ADD KEY `idx_quiz_submissions_file_url` (`file_url`);
 
 --
 -- Indexes for table `skills`
@@ -587,13 +660,30 @@ ALTER TABLE `skills`
 -- Indexes for table `tasks`
 --
 ALTER TABLE `tasks`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_tasks_assigned_to_status` (`assigned_to`,`status`),
+  ADD KEY `idx_tasks_assigned_by` (`assigned_by`),
+  ADD KEY `idx_tasks_status_deadline` (`status`,`deadline`),
+  ADD KEY `idx_tasks_deadline` (`deadline`),
+  ADD KEY `idx_tasks_updated_at` (`updated_at`),
+  ADD KEY `idx_tasks_document_url` (`document_url`);
+
+--
+-- Indexes for table `upload_blobs`
+--
+ALTER TABLE `upload_blobs`
+  ADD PRIMARY KEY (`sha256`),
+  ADD KEY `idx_upload_blobs_ref_count` (`ref_count`);
 
 --
 -- Indexes for table `users`
 --
 ALTER TABLE `users`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_users_email` (`email`),
+  ADD KEY `idx_users_department_role` (`department`,`role`),
+  ADD KEY `idx_users_role` (`role`),
+  ADD KEY `idx_users_updated_at` (`updated_at`);
 
 --
 -- Indexes for table `user_skills`
@@ -605,6 +695,18 @@ ALTER TABLE `user_skills`
 -- AUTO_INCREMENT for dumped tables
 --
 
+--
+-- AUTO_INCREMENT for table `course_interactions`
+--
+ALTER TABLE `course_interactions`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+
+--
+-- AUTO_INCREMENT for table `course_watch_history`
+--
+ALTER TABLE `course_watch_history`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+
 --
 -- AUTO_INCREMENT for table `courses`
 --
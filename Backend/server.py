@@ -1,22 +1,53 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Request, request, jsonify, send_file, g, has_request_context, Response, stream_with_context
 from flask_cors import CORS, cross_origin
 from mysql.connector import connect
+from mysql.connector import errors as mysql_errors
 from werkzeug.security import check_password_hash, generate_password_hash
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, safe_join
+from werkzeug.http import is_resource_modified
+from werkzeug.exceptions import RequestEntityTooLarge
 import jwt
 import datetime
 import os
+import sys
 from pathlib import Path
 import logging
-from functools import wraps
+from functools import wraps, lru_cache
 from dotenv import load_dotenv
 import json
+import base64
+import hashlib
 from fpdf import FPDF
 import io
+import csv
 import traceback
 from decimal import Decimal
 from werkzeug.utils import secure_filename
 import time
+import math
+import re
+import atexit
+import threading
+import multiprocessing
+import uuid
+import mimetypes
+import tempfile
+import shutil
+from urllib.parse import quote
+from collections import deque, OrderedDict
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -56,6 +87,7 @@ def after_request(response):
     response.headers['Access-Control-Allow-Credentials'] = 'true'
     response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization'
     response.headers['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,PATCH,OPTIONS'
+    response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor, Content-Disposition'
     return response
 
 # If not present, add an OPTIONS handler for /api/job-opportunities
@@ -75,6 +107,9 @@ os.makedirs(QUIZ_UPLOAD_FOLDER, exist_ok=True)
 TASK_DOCUMENTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'task_documents')
 os.makedirs(TASK_DOCUMENTS_FOLDER, exist_ok=True)
 
+EXPORTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'exports')
+os.makedirs(EXPORTS_FOLDER, exist_ok=True)
+
 # # Database configuration
 # db_config = {
 #     'host': os.getenv('DB_HOST', 'localhost'),
@@ -98,35 +133,1292 @@ db_config = {
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'x7k9p2m4q8v5n3j6h1t0r2y5u8w3z6b9')
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET', 'hr_management_jwt_secret_key_2024_secure')
 
+HTTP_DATE_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+HTTP_DATE_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def format_http_date(value):
+    """Format a date/datetime exactly like werkzeug's http_date, without its overhead"""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        hour, minute, second = value.hour, value.minute, value.second
+    else:
+        hour = minute = second = 0
+    return (f"{HTTP_DATE_WEEKDAYS[value.weekday()]}, {value.day:02d} {HTTP_DATE_MONTHS[value.month - 1]} "
+            f"{value.year:04d} {hour:02d}:{minute:02d}:{second:02d} GMT")
+
+def json_default(obj):
+    """Encode the non-JSON types that come back from MySQL rows"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        # Same wire format jsonify has always used for dates
+        return format_http_date(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj)
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode('utf-8', errors='replace')
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def dumps_json(obj, **kwargs):
+    """Serialize in a single pass, using orjson when it is installed"""
+    if orjson is not None and not kwargs:
+        return orjson.dumps(
+            obj,
+            default=json_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+    return json.dumps(obj, default=json_default, **kwargs)
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+
+    class FastJSONProvider(DefaultJSONProvider):
+        """JSON provider backed by dumps_json"""
+
+        def dumps(self, obj, **kwargs):
+            kwargs.pop('cls', None)
+            if kwargs.get('default') is not None:
+                return json.dumps(obj, **kwargs)
+            kwargs.pop('default', None)
+            return dumps_json(obj, **kwargs)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            start = time.perf_counter()
+            body = dumps_json(obj)
+            record_serialization(time.perf_counter() - start)
+            return self._app.response_class(f"{body}\n", mimetype=self.mimetype)
+
+    app.json = FastJSONProvider(app)
+except ImportError:
+    # Flask < 2.2 (the pinned 2.0) has no JSON providers: jsonify itself is
+    # replaced so responses are still encoded by dumps_json
+    from flask.json import JSONEncoder
+
+    class FastJSONEncoder(JSONEncoder):
+        def default(self, obj):
+            try:
+                return json_default(obj)
+            except TypeError:
+                return super().default(obj)
+
+    # Still used by flask.json.dumps and the tojson template filter
+    app.json_encoder = FastJSONEncoder
+
+    def jsonify(*args, **kwargs):
+        """flask.jsonify with the body encoded by dumps_json"""
+        if args and kwargs:
+            raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
+        obj = args[0] if len(args) == 1 else (args or kwargs)
+        start = time.perf_counter()
+        body = dumps_json(obj)
+        record_serialization(time.perf_counter() - start)
+        return app.response_class(f"{body}\n", mimetype=app.config.get('JSONIFY_MIMETYPE', 'application/json'))
+
 # Add this after your app initialization
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Upload pipeline configuration
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv('UPLOAD_MAX_REQUEST_BYTES', 25 * 1024 * 1024))
+UPLOAD_FORM_OVERHEAD = int(os.getenv('UPLOAD_FORM_OVERHEAD', 64 * 1024))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+CV_MAX_BYTES = int(os.getenv('CV_MAX_BYTES', 2 * 1024 * 1024))
+ADMIN_CV_MAX_BYTES = int(os.getenv('ADMIN_CV_MAX_BYTES', 5 * 1024 * 1024))
+TASK_DOCUMENT_MAX_BYTES = int(os.getenv('TASK_DOCUMENT_MAX_BYTES', 10 * 1024 * 1024))
+QUIZ_FILE_MAX_BYTES = int(os.getenv('QUIZ_FILE_MAX_BYTES', 10 * 1024 * 1024))
+DEMONSTRATION_MAX_BYTES = int(os.getenv('DEMONSTRATION_MAX_BYTES', 20 * 1024 * 1024))
+
+# Spooled uploads live under UPLOAD_FOLDER so moving them into place is a rename
+UPLOAD_INCOMING_FOLDER = os.path.join(UPLOAD_FOLDER, '.incoming')
+os.makedirs(UPLOAD_INCOMING_FOLDER, exist_ok=True)
+
+# Backstop for every endpoint; werkzeug answers 413 before reading the body
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_REQUEST_BYTES
+
+
+class HashingUploadStream:
+    """Spool target for one uploaded file: counts and hashes bytes as the form parser writes them"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self._stored = False
+        fd, self.path = tempfile.mkstemp(dir=UPLOAD_INCOMING_FOLDER)
+        self._file = os.fdopen(fd, 'w+b')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise RequestEntityTooLarge()
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def store(self, destination):
+        self._file.close()
+        os.replace(self.path, destination)
+        self._stored = True
+
+    def close(self):
+        self._file.close()
+        if not self._stored:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """Streams files to HashingUploadStream on endpoints that set an upload_limit"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        limit = g.get('upload_limit')
+        if limit is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        stream = HashingUploadStream(limit)
+        g.setdefault('_upload_streams', []).append(stream)
+        return stream
+
+
+app.request_class = UploadRequest
+
+@app.teardown_request
+def discard_upload_streams(exc=None):
+    # Removes spooled files the handler did not store
+    for stream in g.pop('_upload_streams', []):
+        stream.close()
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_request_too_large(e):
+    return jsonify({'error': 'Request too large'}), 413
+
+def upload_limit(max_bytes):
+    """Cap each uploaded file at max_bytes and stream it to disk; goes under token_required.
+
+    Oversized requests are refused from Content-Length before the body is read,
+    and a file that grows past the cap mid-stream stops the parse.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.mimetype == 'multipart/form-data':
+                too_large = jsonify({'error': f'File too large. Max {max_bytes / (1024 * 1024):g}MB.'}), 413
+                if request.content_length and request.content_length > max_bytes + UPLOAD_FORM_OVERHEAD:
+                    return too_large
+                g.upload_limit = max_bytes
+                try:
+                    request.files
+                except RequestEntityTooLarge:
+                    return too_large
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+def save_upload(file, destination):
+    """Store an uploaded FileStorage at destination and return its size and SHA-256"""
+    stream = file.stream
+    if isinstance(stream, HashingUploadStream):
+        stream.store(destination)
+        return {'size': stream.size, 'sha256': stream.sha256.hexdigest()}
+
+    # Parsed without an upload_limit: copy in chunks, hashing on the way
+    digest = hashlib.sha256()
+    size = 0
+    with open(destination, 'wb') as out:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            out.write(chunk)
+    return {'size': size, 'sha256': digest.hexdigest()}
+
+# Content-addressed upload storage
+BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'blobs')
+os.makedirs(BLOB_FOLDER, exist_ok=True)
+BLOB_GC_GRACE_SECONDS = int(os.getenv('BLOB_GC_GRACE_SECONDS', 3600))
+BLOB_FILENAME_PATTERN = re.compile(r'^([0-9a-f]{64})_(.+)$')
+
+# (table, column, url prefix, legacy folder) for every column that references an upload
+UPLOAD_REFERENCES = [
+    ('job_applications', 'cv_url', '/uploads/cvs/', CV_UPLOAD_FOLDER),
+    ('tasks', 'document_url', '/uploads/task_documents/', TASK_DOCUMENTS_FOLDER),
+    ('quizzes', 'file_url', '/uploads/quizzes/', QUIZ_UPLOAD_FOLDER),
+    ('quiz_submissions', 'file_url', '/uploads/quiz_submissions/', QUIZ_SUBMISSION_FOLDER)
+]
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """Uploads stored once per SHA-256 under BLOB_FOLDER, reference-counted in upload_blobs.
+
+    Upload URLs keep their folder but name the blob: /uploads/cvs/<sha256>_<filename>.
+    A duplicate upload only touches the existing blob and bumps ref_count in the
+    transaction that inserts the referencing row. Blobs are removed by
+    collect_garbage() once unreferenced for BLOB_GC_GRACE_SECONDS; the grace
+    period covers uploads placed but not yet committed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._stats = {'stored': 0, 'deduplicated': 0, 'bytes_saved': 0}
+        self._lock = threading.Lock()
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def put(self, file):
+        """Place an uploaded FileStorage in the store and return its size and SHA-256"""
+        stream = file.stream
+        if not isinstance(stream, HashingUploadStream):
+            # Parsed without an upload_limit: spool through the incoming folder first
+            fd, spooled = tempfile.mkstemp(dir=UPLOAD_INCOMING_FOLDER)
+            os.close(fd)
+            info = save_upload(file, spooled)
+            self._place(spooled, info)
+            return info
+
+        info = {'size': stream.size, 'sha256': stream.sha256.hexdigest()}
+        path = self.path(info['sha256'])
+        if self._exists(path, info):
+            stream.close()
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            stream.store(path)
+        return info
+
+    def _place(self, spooled, info):
+        path = self.path(info['sha256'])
+        if self._exists(path, info):
+            os.remove(spooled)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(spooled, path)
+
+    def _exists(self, path, info):
+        try:
+            # Re-setting the same times bumps only ctime: collect_garbage() leaves the blob
+            # alone until our reference commits, and the mtime-based ETag does not move
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        except FileNotFoundError:
+            with self._lock:
+                self._stats['stored'] += 1
+            return False
+        with self._lock:
+            self._stats['deduplicated'] += 1
+            self._stats['bytes_saved'] += info['size']
+        return True
+
+    def url(self, prefix, info, filename):
+        return f"{prefix}{info['sha256']}_{filename}"
+
+    def add_ref(self, cursor, info):
+        cursor.execute('''
+            INSERT INTO upload_blobs (sha256, size, ref_count)
+            VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE ref_count = ref_count + 1, released_at = NULL
+        ''', (info['sha256'], info['size']))
+
+    def release(self, cursor, url):
+        sha256 = blob_sha256(url)
+        if sha256:
+            cursor.execute('''
+                UPDATE upload_blobs
+                SET ref_count = ref_count - 1,
+                    released_at = IF(ref_count = 0, CURRENT_TIMESTAMP, released_at)
+                WHERE sha256 = %s AND ref_count > 0
+            ''', (sha256,))
+
+    def reference_counts(self, cursor):
+        """Count blob references straight from the URL columns"""
+        counts = {}
+        for table, column, prefix, folder in UPLOAD_REFERENCES:
+            cursor.execute(f'SELECT {column} as url FROM {table} WHERE {column} LIKE %s', (prefix + '%',))
+            for row in cursor.fetchall():
+                sha256 = blob_sha256(row['url'])
+                if sha256:
+                    counts[sha256] = counts.get(sha256, 0) + 1
+        return counts
+
+    def collect_garbage(self):
+        """Reconcile ref_count with the URL columns, then delete unreferenced blobs past the grace period"""
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        removed = []
+        try:
+            counts = self.reference_counts(cursor)
+            cursor.execute('SELECT sha256, ref_count FROM upload_blobs')
+            stored = {row['sha256']: row['ref_count'] for row in cursor.fetchall()}
+
+            # Rows deleted without release() (e.g. with their user) leave counts too high
+            drifted = [(counts.get(sha256, 0), sha256) for sha256, ref_count in stored.items()
+                       if counts.get(sha256, 0) != ref_count]
+            if drifted:
+                cursor.executemany('''
+                    UPDATE upload_blobs
+                    SET ref_count = %s,
+                        released_at = IF(%s = 0, COALESCE(released_at, CURRENT_TIMESTAMP), NULL)
+                    WHERE sha256 = %s
+                ''', [(count, count, sha256) for count, sha256 in drifted])
+            conn.commit()
+
+            cursor.execute('''
+                SELECT sha256 FROM upload_blobs
+                WHERE ref_count = 0 AND released_at < NOW() - INTERVAL %s SECOND
+            ''', (BLOB_GC_GRACE_SECONDS,))
+            candidates = [row['sha256'] for row in cursor.fetchall()]
+
+            cutoff = time.time() - BLOB_GC_GRACE_SECONDS
+            for sha256 in candidates:
+                path = self.path(sha256)
+                if os.path.exists(path) and os.stat(path).st_ctime > cutoff:
+                    continue
+                cursor.execute('DELETE FROM upload_blobs WHERE sha256 = %s AND ref_count = 0', (sha256,))
+                conn.commit()
+                if cursor.rowcount:
+                    removed.append(sha256)
+                    if os.path.exists(path):
+                        os.remove(path)
+
+            # Files placed by uploads whose row never committed
+            for directory, _, filenames in os.walk(self.root):
+                for sha256 in filenames:
+                    path = os.path.join(directory, sha256)
+                    if sha256 not in stored and sha256 not in counts and os.stat(path).st_ctime < cutoff:
+                        os.remove(path)
+                        removed.append(sha256)
+        finally:
+            cursor.close()
+            conn.close()
+        return removed
+
+    def import_legacy_uploads(self):
+        """Move files stored under timestamped names into the store and point their rows at the blobs"""
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        imported = {'files': 0, 'rows': 0, 'bytes_saved': 0}
+        try:
+            for table, column, prefix, folder in UPLOAD_REFERENCES:
+                cursor.execute(f'SELECT id, {column} as url FROM {table} WHERE {column} LIKE %s', (prefix + '%',))
+                rows_by_url = {}
+                for row in cursor.fetchall():
+                    if not blob_sha256(row['url']):
+                        rows_by_url.setdefault(row['url'], []).append(row['id'])
+
+                for url, ids in rows_by_url.items():
+                    filename = url[len(prefix):]
+                    legacy_path = safe_join(folder, filename)
+                    if legacy_path is None or not os.path.isfile(legacy_path):
+                        continue
+                    info = {'sha256': hash_file(legacy_path), 'size': os.path.getsize(legacy_path)}
+                    path = self.path(info['sha256'])
+                    if os.path.exists(path):
+                        imported['bytes_saved'] += info['size']
+                    else:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        shutil.copy2(legacy_path, path)
+
+                    cursor.executemany(f'UPDATE {table} SET {column} = %s WHERE id = %s',
+                                       [(self.url(prefix, info, filename), row_id) for row_id in ids])
+                    cursor.execute('''
+                        INSERT INTO upload_blobs (sha256, size, ref_count)
+                        VALUES (%s, %s, %s)
+                        ON DUPLICATE KEY UPDATE ref_count = ref_count + VALUES(ref_count), released_at = NULL
+                    ''', (info['sha256'], info['size'], len(ids)))
+                    conn.commit()
+                    # The legacy copy goes only once its rows point at the blob
+                    os.remove(legacy_path)
+                    imported['files'] += 1
+                    imported['rows'] += len(ids)
+        finally:
+            cursor.close()
+            conn.close()
+        return imported
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+def blob_sha256(url):
+    """The blob hash named by an upload URL, or None for legacy and external URLs"""
+    if not url:
+        return None
+    match = BLOB_FILENAME_PATTERN.match(url.rsplit('/', 1)[-1])
+    return match.group(1) if match else None
+
+
+blob_store = BlobStore(BLOB_FOLDER)
+
 
 # Print JWT secret for reference
 # print("JWT Secret Key:", app.config['JWT_SECRET_KEY'])
 # print("App Secret Key:", app.config['SECRET_KEY'])
 
-def get_db_connection():
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 3600))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+    pass
+
+
+def is_transient_db_error(e):
+    """True when the database was unreachable or busy, rather than rejecting the data"""
+    return isinstance(e, (PoolTimeoutError, mysql_errors.InterfaceError, mysql_errors.OperationalError))
+
+# Missing column default, unknown column, missing table: the schema is behind the code
+SCHEMA_ERROR_CODES = (1054, 1146, 1364)
+
+def is_schema_db_error(e):
+    """True when a statement failed because the schema does not match, not because of one row"""
+    return isinstance(e, mysql_errors.Error) and e.errno in SCHEMA_ERROR_CODES
+
+# Lock wait timeout, deadlock: InnoDB rolled the transaction back and it may simply be rerun
+LOCK_CONFLICT_ERROR_CODES = (1205, 1213)
+
+def is_lock_conflict_db_error(e):
+    """True when the transaction lost a lock conflict and is safe to retry as a whole"""
+    return isinstance(e, mysql_errors.Error) and e.errno in LOCK_CONFLICT_ERROR_CODES
+
+
+class PooledConnection:
+    """Wraps a MySQL connection so that close() hands it back to the pool"""
+
+    def __init__(self, pool, raw_conn, created_at):
+        self._pool = pool
+        self._conn = raw_conn
+        self._created_at = created_at
+        self._released = False
+        self.profile = None
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        raw_cursor = self._conn.cursor(*args, **kwargs)
+        if self.profile is not None:
+            return ProfiledCursor(raw_cursor, self.profile)
+        return raw_cursor
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn, self._created_at)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool with overflow, pre-ping and recycling"""
+
+    def __init__(self, config, size=5, max_overflow=10, timeout=30, recycle=3600, pre_ping=True):
+        self.config = config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._idle = deque()
+        self._total = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'overflow_created': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'recycled': 0,
+            'health_check_failures': 0,
+            'total_wait_time': 0.0
+        }
+
+    def acquire(self, wait=True):
+        """Check out a connection; with wait=False, None unless one is free within the base size"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw_conn, created_at = self._idle.pop()
+                    break
+                if not wait and self._total >= self.size:
+                    return None
+                if self._total < self.size + self.max_overflow:
+                    if self._total >= self.size:
+                        self._stats['overflow_created'] += 1
+                    self._total += 1
+                    raw_conn, created_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(f'Timed out after {self.timeout}s waiting for a database connection')
+                if not waited:
+                    waited = True
+                    self._stats['waits'] += 1
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_time'] += time.monotonic() - started
+
+        try:
+            if raw_conn is not None and not self._is_usable(raw_conn, created_at):
+                raw_conn = None
+            if raw_conn is None:
+                raw_conn = connect(**self.config)
+                created_at = time.monotonic()
+                with self._cond:
+                    self._stats['connections_created'] += 1
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, raw_conn, created_at)
+
+    def _is_usable(self, raw_conn, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._cond:
+                self._stats['recycled'] += 1
+            self._close_quietly(raw_conn)
+            return False
+        if self.pre_ping:
+            try:
+                raw_conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                self._close_quietly(raw_conn)
+                return False
+        return True
+
+    def release(self, raw_conn, created_at):
+        # Reset per-request state before anyone else can check it out
+        reusable = True
+        try:
+            if raw_conn.unread_result:
+                raw_conn.consume_results()
+            if raw_conn.in_transaction:
+                raw_conn.rollback()
+        except Exception:
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable and len(self._idle) < self.size:
+                self._idle.append((raw_conn, created_at))
+                raw_conn = None
+            else:
+                self._total -= 1
+            self._cond.notify()
+
+        if raw_conn is not None:
+            self._close_quietly(raw_conn)
+
+    def _close_quietly(self, raw_conn):
+        try:
+            raw_conn.close()
+        except Exception:
+            pass
+
+    def metrics(self):
+        with self._cond:
+            metrics = dict(self._stats)
+            metrics.update({
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'total_connections': self._total,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'avg_wait_time': round(metrics['total_wait_time'] / metrics['checkouts'], 6) if metrics['checkouts'] else 0
+            })
+        return metrics
+
+
+db_pool = ConnectionPool(
+    db_config,
+    size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_MAX_OVERFLOW,
+    timeout=DB_POOL_TIMEOUT,
+    recycle=DB_POOL_RECYCLE,
+    pre_ping=DB_POOL_PRE_PING
+)
+
+def get_db_connection(wait=True):
     try:
-        conn = connect(**db_config)
-        return conn
+        conn = db_pool.acquire(wait)
     except Exception as e:
         logger.error(f"Database connection error: {str(e)}")
         raise
+    if conn is None:
+        return None
+    # Remember request-scoped checkouts so they are returned even on early exits
+    if has_request_context():
+        g.setdefault('_db_connections', []).append(conn)
+        conn.profile = g.get('_sql_profile')
+    return conn
+
+@app.teardown_request
+def release_db_connections(exc=None):
+    for conn in g.pop('_db_connections', []):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error releasing database connection: {str(e)}")
+
+@app.errorhandler(PoolTimeoutError)
+def handle_pool_timeout(e):
+    return jsonify({'message': 'Database is busy, please retry'}), 503
+
+# Query batching configuration
+QUERY_BATCH_WORKERS = int(os.getenv('QUERY_BATCH_WORKERS', 8))
+QUERY_BATCH_MAX_CONNECTIONS = int(os.getenv('QUERY_BATCH_MAX_CONNECTIONS', 4))
+
+
+class QueryBatcher:
+    """Runs independent read statements concurrently on pooled connections.
+
+    run() takes {name: (sql, params)} and returns {name: rows}. The statements
+    are dealt out across up to max_connections connections, one share per
+    connection, so the batch costs roughly the slowest share instead of the
+    sum of all round trips. Only the first connection may wait on the pool;
+    extra ones are taken only when free within the base pool size, so a busy
+    pool degrades to running the batch one statement after another.
+
+    The shares read separate snapshots, so batch only reads that need not be
+    mutually consistent. Statements still show up one by one in the request
+    profile, but the request's query time counts the batch's wall time.
+    """
+
+    def __init__(self, workers=8, max_connections=4):
+        self.max_connections = max_connections
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='query-batch')
+        self._lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'statements': 0,
+            'connections': 0,
+            'serial_batches': 0
+        }
+
+    def run(self, queries):
+        names = list(queries)
+        profile = g.get('_sql_profile') if has_request_context() else None
+        recorded = len(profile.queries) if profile is not None else 0
+        start = time.perf_counter()
+        conns = [get_db_connection()]
+        futures = []
+        try:
+            while len(conns) < min(self.max_connections, len(names)):
+                conn = get_db_connection(wait=False)
+                if conn is None:
+                    break
+                conns.append(conn)
+
+            shares = [names[i::len(conns)] for i in range(len(conns))]
+            futures = [self._executor.submit(self._fetch, conn, share, queries)
+                       for conn, share in zip(conns[1:], shares[1:])]
+            results = self._fetch(conns[0], shares[0], queries)
+            for future in futures:
+                results.update(future.result())
+        finally:
+            # Never hand a connection back while a worker is still reading from it
+            for future in futures:
+                future.exception()
+            for conn in conns:
+                conn.close()
+
+        if profile is not None:
+            # The shares ran side by side: only the wall time is time the request spent in the database
+            statement_time = sum(q['time'] for q in profile.queries[recorded:])
+            profile.query_overlap += max(0.0, statement_time - (time.perf_counter() - start))
+
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['statements'] += len(names)
+            self._stats['connections'] += len(conns)
+            if len(conns) == 1:
+                self._stats['serial_batches'] += 1
+        return results
+
+    def _fetch(self, conn, names, queries):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            results = {}
+            for name in names:
+                sql, params = queries[name]
+                cursor.execute(sql, params)
+                results[name] = cursor.fetchall()
+            return results
+        finally:
+            cursor.close()
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_connections'] = round(stats['connections'] / stats['batches'], 2) if stats['batches'] else 0
+        return stats
+
+
+query_batcher = QueryBatcher(workers=QUERY_BATCH_WORKERS, max_connections=QUERY_BATCH_MAX_CONNECTIONS)
+
+# Request profiling configuration
+SQL_PROFILING = os.getenv('SQL_PROFILING', 'true').lower() == 'true'
+PROFILE_N_PLUS_ONE_THRESHOLD = int(os.getenv('PROFILE_N_PLUS_ONE_THRESHOLD', 5))
+PROFILE_SLOW_QUERY_MS = float(os.getenv('PROFILE_SLOW_QUERY_MS', 200))
+PROFILE_MAX_STATEMENTS = int(os.getenv('PROFILE_MAX_STATEMENTS', 200))
+PROFILE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(sql):
+    """Collapse whitespace, placeholder lists and inline numbers so repeats group together"""
+    statement = ' '.join(sql.split())
+    statement = re.sub(r'%s(\s*,\s*%s)+', '%s, ...', statement)
+    return re.sub(r'\b\d+\b', '?', statement)
+
+
+class RequestProfile:
+    """Statements, rows and timings collected while serving one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.query_overlap = 0.0  # statement time that ran concurrently inside a QueryBatcher batch
+        self.serialization_time = 0.0
+        self.status = None
+
+    def record_query(self, sql, duration):
+        entry = {'sql': sql, 'time': duration, 'rows': 0}
+        self.queries.append(entry)
+        return entry
+
+    @property
+    def query_time(self):
+        return sum(q['time'] for q in self.queries) - self.query_overlap
+
+
+class ProfiledCursor:
+    """Cursor proxy that times statements and fetches and counts the rows they return"""
+
+    def __init__(self, cursor, profile):
+        self._cursor = cursor
+        self._profile = profile
+        self._current = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._current = self._profile.record_query(operation, time.perf_counter() - start)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._current = self._profile.record_query(operation, time.perf_counter() - start)
+
+    def _fetched(self, start, count):
+        # Unbuffered cursors read rows off the wire here, so fetch time counts toward the statement
+        if self._current is not None:
+            self._current['time'] += time.perf_counter() - start
+            self._current['rows'] += count
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+
+class SQLProfiler:
+    """Aggregates request profiles per route and per statement, and spots N+1 query patterns"""
+
+    def __init__(self, n_plus_one_threshold=5, slow_query_ms=200, max_statements=200):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_query_ms = slow_query_ms
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+            self._statements = {}
+            self._n_plus_one = {}
+            self._started_at = datetime.datetime.now()
+
+    def _new_route(self):
+        return {
+            'requests': 0,
+            'errors': 0,
+            'handler_time': 0.0,
+            'max_handler_time': 0.0,
+            'queries': 0,
+            'max_queries': 0,
+            'query_time': 0.0,
+            'rows': 0,
+            'serialization_time': 0.0,
+            'n_plus_one': 0,
+            'buckets': [0] * len(PROFILE_BUCKETS)
+        }
+
+    def finish(self, profile, route, method):
+        handler_time = time.perf_counter() - profile.started
+
+        grouped = {}
+        for q in profile.queries:
+            statement = normalize_statement(q['sql'])
+            stats = grouped.setdefault(statement, [0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += q['time']
+            stats[2] += q['rows']
+            if q['time'] * 1000 >= self.slow_query_ms:
+                logger.warning(f"Slow query ({q['time'] * 1000:.1f} ms) in {method} {route}: {statement}")
+
+        repeated = {stmt: stats[0] for stmt, stats in grouped.items() if stats[0] >= self.n_plus_one_threshold}
+        query_time = profile.query_time
+        rows = sum(stats[2] for stats in grouped.values())
+        key = (route, method)
+
+        with self._lock:
+            r = self._routes.get(key)
+            if r is None:
+                r = self._routes[key] = self._new_route()
+            r['requests'] += 1
+            if profile.status is not None and profile.status >= 500:
+                r['errors'] += 1
+            r['handler_time'] += handler_time
+            r['max_handler_time'] = max(r['max_handler_time'], handler_time)
+            r['queries'] += len(profile.queries)
+            r['max_queries'] = max(r['max_queries'], len(profile.queries))
+            r['query_time'] += query_time
+            r['rows'] += rows
+            r['serialization_time'] += profile.serialization_time
+            if repeated:
+                r['n_plus_one'] += 1
+            for i, bound in enumerate(PROFILE_BUCKETS):
+                if handler_time <= bound:
+                    r['buckets'][i] += 1
+                    break
+
+            for statement, (count, total, fetched) in grouped.items():
+                s = self._statements.get(statement)
+                if s is None:
+                    if len(self._statements) >= self.max_statements:
+                        cheapest = min(self._statements, key=lambda k: self._statements[k]['time'])
+                        del self._statements[cheapest]
+                    s = self._statements[statement] = {'calls': 0, 'time': 0.0, 'max_time': 0.0, 'rows': 0, 'routes': set()}
+                s['calls'] += count
+                s['time'] += total
+                s['max_time'] = max(s['max_time'], total / count)
+                s['rows'] += fetched
+                s['routes'].add(f"{method} {route}")
+
+            new_patterns = []
+            for statement, count in repeated.items():
+                n = self._n_plus_one.get((key, statement))
+                if n is None:
+                    n = self._n_plus_one[(key, statement)] = {'occurrences': 0, 'max_repeats': 0}
+                    new_patterns.append((statement, count))
+                n['occurrences'] += 1
+                n['max_repeats'] = max(n['max_repeats'], count)
+                n['last_seen'] = datetime.datetime.now()
+
+        for statement, count in new_patterns:
+            logger.warning(f"Possible N+1 in {method} {route}: statement ran {count} times: {statement}")
+
+    def snapshot(self):
+        with self._lock:
+            routes = []
+            for (route, method), r in self._routes.items():
+                requests = r['requests']
+                routes.append({
+                    'route': route,
+                    'method': method,
+                    'requests': requests,
+                    'errors': r['errors'],
+                    'avg_handler_ms': round(r['handler_time'] / requests * 1000, 3),
+                    'max_handler_ms': round(r['max_handler_time'] * 1000, 3),
+                    'avg_queries': round(r['queries'] / requests, 2),
+                    'max_queries': r['max_queries'],
+                    'avg_query_ms': round(r['query_time'] / requests * 1000, 3),
+                    'avg_rows': round(r['rows'] / requests, 2),
+                    'avg_serialization_ms': round(r['serialization_time'] / requests * 1000, 3),
+                    'total_handler_ms': round(r['handler_time'] * 1000, 3),
+                    'n_plus_one_requests': r['n_plus_one']
+                })
+            statements = [{
+                'statement': statement,
+                'calls': st['calls'],
+                'total_ms': round(st['time'] * 1000, 3),
+                'avg_ms': round(st['time'] / st['calls'] * 1000, 3),
+                'max_ms': round(st['max_time'] * 1000, 3),
+                'rows': st['rows'],
+                'routes': sorted(st['routes'])
+            } for statement, st in self._statements.items()]
+            n_plus_one = [{
+                'route': route,
+                'method': method,
+                'statement': statement,
+                'occurrences': n['occurrences'],
+                'max_repeats': n['max_repeats'],
+                'last_seen': n['last_seen'].isoformat()
+            } for ((route, method), statement), n in self._n_plus_one.items()]
+            started_at = self._started_at
+
+        routes.sort(key=lambda r: r['total_handler_ms'], reverse=True)
+        statements.sort(key=lambda s: s['total_ms'], reverse=True)
+        n_plus_one.sort(key=lambda n: n['max_repeats'], reverse=True)
+        return {
+            'since': started_at.isoformat(),
+            'routes': routes,
+            'statements': statements,
+            'n_plus_one': n_plus_one
+        }
+
+    def prometheus(self):
+        def label(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = [
+            '# HELP hr_http_request_duration_seconds Handler time per route.',
+            '# TYPE hr_http_request_duration_seconds histogram'
+        ]
+        with self._lock:
+            routes = [(route, method, dict(r, buckets=list(r['buckets']))) for (route, method), r in self._routes.items()]
+        for route, method, r in routes:
+            labels = f'route="{label(route)}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(PROFILE_BUCKETS, r['buckets']):
+                cumulative += count
+                lines.append(f'hr_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'hr_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {r["requests"]}')
+            lines.append(f'hr_http_request_duration_seconds_sum{{{labels}}} {r["handler_time"]:.6f}')
+            lines.append(f'hr_http_request_duration_seconds_count{{{labels}}} {r["requests"]}')
+
+        counters = [
+            ('hr_http_request_errors_total', 'Requests that ended with a 5xx status.', 'errors', '{}'),
+            ('hr_db_queries_total', 'SQL statements executed.', 'queries', '{}'),
+            ('hr_db_query_duration_seconds_total', 'Time spent executing and fetching SQL, batched statements counted by wall time.', 'query_time', '{:.6f}'),
+            ('hr_db_rows_total', 'Rows fetched from the database.', 'rows', '{}'),
+            ('hr_serialization_duration_seconds_total', 'Time spent encoding JSON responses.', 'serialization_time', '{:.6f}'),
+            ('hr_n_plus_one_requests_total', 'Requests that repeated a statement past the N+1 threshold.', 'n_plus_one', '{}')
+        ]
+        for name, help_text, field, fmt in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for route, method, r in routes:
+                lines.append(f'{name}{{route="{label(route)}",method="{method}"}} {fmt.format(r[field])}')
+
+        pool = db_pool.metrics()
+        for field in ('total_connections', 'in_use', 'idle'):
+            lines.append(f'# TYPE hr_db_pool_{field} gauge')
+            lines.append(f'hr_db_pool_{field} {pool[field]}')
+        for field in ('checkouts', 'timeouts', 'waits'):
+            lines.append(f'# TYPE hr_db_pool_{field}_total counter')
+            lines.append(f'hr_db_pool_{field}_total {pool[field]}')
+        return '\n'.join(lines) + '\n'
+
+
+sql_profiler = SQLProfiler(
+    n_plus_one_threshold=PROFILE_N_PLUS_ONE_THRESHOLD,
+    slow_query_ms=PROFILE_SLOW_QUERY_MS,
+    max_statements=PROFILE_MAX_STATEMENTS
+)
+
+def record_serialization(seconds):
+    if has_request_context():
+        profile = g.get('_sql_profile')
+        if profile is not None:
+            profile.serialization_time += seconds
+
+@app.before_request
+def start_request_profile():
+    if SQL_PROFILING:
+        g._sql_profile = RequestProfile()
+
+@app.after_request
+def add_server_timing(response):
+    profile = g.get('_sql_profile')
+    if profile is not None:
+        profile.status = response.status_code
+        response.headers['Server-Timing'] = (
+            f'db;dur={profile.query_time * 1000:.1f};desc="{len(profile.queries)} queries", '
+            f'app;dur={(time.perf_counter() - profile.started) * 1000:.1f}'
+        )
+    return response
+
+@app.teardown_request
+def finish_request_profile(exc=None):
+    profile = g.pop('_sql_profile', None)
+    if profile is None:
+        return
+    if exc is not None and profile.status is None:
+        profile.status = 500
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    try:
+        sql_profiler.finish(profile, route, request.method)
+    except Exception as e:
+        logger.error(f"Error recording request profile: {str(e)}")
+
+# Identity cache configuration
+PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', 60))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv('PRINCIPAL_CACHE_MAX_ENTRIES', 10000))
+
+PRINCIPAL_SQL = '''
+    SELECT id, role, department, is_active,
+           (SELECT MAX(ls.id) FROM login_sessions ls
+            WHERE ls.user_id = users.id) as latest_session_id,
+           (SELECT MAX(ls.id) FROM login_sessions ls
+            WHERE ls.user_id = users.id AND ls.is_active = 1) as active_session_id
+    FROM users WHERE id = %s
+'''
+
+
+def session_floor(latest_session_id, active_session_id):
+    """Lowest sid still valid: the latest session, or none at all once it has ended"""
+    if latest_session_id is None:
+        return 0
+    if latest_session_id == active_session_id:
+        return latest_session_id
+    return latest_session_id + 1
+
+class PrincipalCache:
+    """TTL cache of the identity fields (id, role, department, is_active) handlers authorize against"""
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > now:
+                return dict(entry[0])
+            generation = self._generation
+
+        principal = self._load(user_id)
+
+        with self._lock:
+            # Skip the store if an invalidation raced with the load
+            if principal is not None and generation == self._generation:
+                if len(self._entries) >= self.max_entries:
+                    self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+                self._entries[user_id] = (principal, now + self.ttl)
+        return dict(principal) if principal is not None else None
+
+    def _load(self, user_id):
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(PRINCIPAL_SQL, (user_id,))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        if not row:
+            return None
+        return {
+            'id': row['id'],
+            'role': row['role'],
+            'department': row['department'],
+            'is_active': bool(row['is_active']),
+            'session_floor': session_floor(row['latest_session_id'], row['active_session_id'])
+        }
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache(ttl=PRINCIPAL_CACHE_TTL, max_entries=PRINCIPAL_CACHE_MAX_ENTRIES)
+
+# Verified token cache configuration
+TOKEN_LIFETIME_SECONDS = int(os.getenv('TOKEN_LIFETIME_SECONDS', 86400))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', 10000))
+STREAM_TICKET_TTL = int(os.getenv('STREAM_TICKET_TTL', 60))
+
+
+class TokenCache:
+    """LRU of verified bearer tokens keyed by SHA-256 digest, plus the session revocation list.
+
+    A hit skips splitting, base64/JSON decoding and the HMAC check; exp is
+    still enforced on every hit. Tokens carry their login_sessions id (sid),
+    and a login revokes every earlier session of that user; a logout revokes
+    the session itself. Other workers learn of it through the principal's
+    session_floor within PRINCIPAL_CACHE_TTL.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # digest -> (claims, exp)
+        self._session_floors = {}  # user_id -> (lowest valid sid, expires)
+        self._redeemed_tickets = {}  # stream ticket jti -> exp
+        self._stats = {'hits': 0, 'misses': 0, 'revoked': 0, 'tickets_redeemed': 0, 'tickets_replayed': 0}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        digest = hashlib.sha256(token.encode('utf-8')).digest()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[1] <= time.time():
+                # Expired tokens fall through to jwt.decode for the proper error
+                self._entries.pop(digest, None)
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def put(self, token, claims):
+        if 'exp' not in claims:
+            return
+        digest = hashlib.sha256(token.encode('utf-8')).digest()
+        with self._lock:
+            self._entries[digest] = (claims, claims['exp'])
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def revoke_sessions_before(self, user_id, session_id):
+        now = time.time()
+        with self._lock:
+            current = self._session_floors.get(user_id)
+            if current is None or session_id > current[0]:
+                if len(self._session_floors) >= self.max_entries:
+                    self._session_floors = {k: v for k, v in self._session_floors.items() if v[1] > now}
+                # Tokens older than the revocation have all expired after one token lifetime
+                self._session_floors[user_id] = (session_id, now + TOKEN_LIFETIME_SECONDS)
+
+    def is_revoked(self, claims, session_floor=0):
+        sid = claims.get('sid')
+        if sid is None:
+            # Issued before tokens carried a session; these simply expire
+            return False
+        floor = session_floor or 0
+        with self._lock:
+            local = self._session_floors.get(claims['user_id'])
+            if local is not None and local[1] > time.time():
+                floor = max(floor, local[0])
+            if sid < floor:
+                self._stats['revoked'] += 1
+                return True
+        return False
+
+    def redeem_ticket(self, claims):
+        """Mark a stream ticket used; False when this worker has already seen it"""
+        now = time.time()
+        with self._lock:
+            if claims['jti'] in self._redeemed_tickets:
+                self._stats['tickets_replayed'] += 1
+                return False
+            if len(self._redeemed_tickets) >= self.max_entries:
+                self._redeemed_tickets = {k: v for k, v in self._redeemed_tickets.items() if v > now}
+            self._redeemed_tickets[claims['jti']] = claims['exp']
+            self._stats['tickets_redeemed'] += 1
+        return True
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['revoked_users'] = len(self._session_floors)
+        return stats
+
+
+token_cache = TokenCache(max_entries=TOKEN_CACHE_MAX_ENTRIES)
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization')
+        ticket = None
+        if not token and getattr(f, 'accepts_stream_ticket', False):
+            # EventSource cannot send headers, so streams present a short-lived ticket in the URL
+            ticket = request.args.get('ticket')
         
-        if not token:
+        if not token and not ticket:
             return jsonify({'message': 'Token is missing'}), 401
 
         try:
-            token = token.split(' ')[1]  # Remove 'Bearer ' prefix
-            data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+            if ticket:
+                data = jwt.decode(ticket, app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+                if data.get('purpose') != 'stream':
+                    raise jwt.InvalidTokenError('not a stream ticket')
+                if not token_cache.redeem_ticket(data):
+                    return jsonify({'message': 'Ticket has already been used'}), 401
+            else:
+                token = token.split(' ')[1]  # Remove 'Bearer ' prefix
+                data = token_cache.get(token)
+                if data is None:
+                    data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+                    token_cache.put(token, data)
+                if 'purpose' in data:
+                    # Single-purpose tickets are never bearer tokens
+                    raise jwt.InvalidTokenError('ticket used as a bearer token')
             current_user_id = data['user_id']
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token has expired'}), 401
@@ -136,9 +1428,1135 @@ def token_required(f):
             logger.error(f"Token validation error: {str(e)}")
             return jsonify({'message': 'Token is invalid'}), 401
 
+        # Resolve the caller's role and department once, from the cache when possible
+        try:
+            g.current_user = principal_cache.get(current_user_id)
+        except Exception as e:
+            logger.error(f"Error resolving current user: {str(e)}")
+            return jsonify({'message': 'Error resolving current user'}), 500
+
+        floor = g.current_user['session_floor'] if g.current_user else 0
+        if token_cache.is_revoked(data, floor):
+            return jsonify({'message': 'Session has ended, please log in again'}), 401
+
+        g.token_claims = data
         return f(current_user_id, *args, **kwargs)
     return decorated
 
+def accepts_stream_ticket(f):
+    """Let token_required also accept a stream ticket from ?ticket= (for EventSource streams)"""
+    f.accepts_stream_ticket = True
+    return f
+
+def session_active(claims):
+    """Whether the login session behind claims has neither expired nor been revoked"""
+    expires = claims.get('session_exp') or claims.get('exp')
+    if expires is not None and time.time() >= expires:
+        return False
+    principal = principal_cache.get(claims['user_id'])
+    if principal is None:
+        return False
+    return not token_cache.is_revoked(claims, principal['session_floor'])
+
+# Conditional GET configuration
+ETAG_SETTLE_SECONDS = int(os.getenv('ETAG_SETTLE_SECONDS', 2))
+
+# Data sources a conditional GET can depend on. Every write the application
+# makes is counted in entity_versions (see bump_entity_versions); the listed
+# expressions add what changes outside it, such as courses edited in the database.
+ETAG_SOURCES = {
+    'users': [],
+    'tasks': [],
+    'courses': ['(SELECT MAX(updated_at) FROM courses)'],
+    'course_enrollments': [],
+    'demonstrations': [],
+    'quizzes': [],
+    'job_applications': []
+}
+
+def bump_entity_versions(entities, departments=None):
+    """Count a write to `entities` in `departments` (None: department unknown), as invalidation_tags scopes it"""
+    scopes = {department for department in departments or () if department} or {'*'}
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany('''
+            INSERT INTO entity_versions (entity, scope, version) VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+        ''', [(entity, scope) for entity in sorted(entities) for scope in sorted(scopes)])
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+def data_fingerprint(sources, departments=None):
+    """Fingerprint the given ETAG_SOURCES, as seen from `departments`, in one round trip.
+
+    The entity_versions counters are summed over the caller's departments plus
+    the unscoped '*' row (every row for None), so only writes the caller could
+    see move it. Returns None while an extra source changed within
+    ETAG_SETTLE_SECONDS, since a second write in the same second would not
+    move MAX(updated_at).
+    """
+    scope_filter = ''
+    params = list(sources)
+    if departments is not None:
+        scopes = list(departments) + ['*']
+        scope_filter = f" AND scope IN ({', '.join(['%s'] * len(scopes))})"
+        params += scopes
+    expressions = [
+        'NOW()',
+        f'''(SELECT COALESCE(SUM(version), 0) FROM entity_versions
+             WHERE entity IN ({', '.join(['%s'] * len(sources))}){scope_filter})'''
+    ]
+    for source in sources:
+        expressions.extend(ETAG_SOURCES[source])
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT ' + ', '.join(expressions), params)
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    now, values = row[0], row[1:]
+    settle_cutoff = now - datetime.timedelta(seconds=ETAG_SETTLE_SECONDS)
+    if any(isinstance(value, datetime.datetime) and value > settle_cutoff for value in values):
+        return None
+    return values
+
+def conditional_get(*sources):
+    """ETag / If-None-Match support for GET endpoints; goes under token_required.
+
+    With sources, the ETag comes from data_fingerprint() plus the caller's
+    identity and query string, so an unchanged client gets 304 before the
+    handler runs. Without sources (endpoints served from in-process caches)
+    the handler runs and the ETag is a hash of the response body.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user_id, *args, **kwargs):
+            etag = None
+            if sources:
+                try:
+                    user = g.current_user or {}
+                    fingerprint = data_fingerprint(sources, cache_departments(user) if user else None)
+                    if fingerprint is not None:
+                        key = repr((request.path, request.query_string, current_user_id,
+                                    user.get('role'), user.get('department'), fingerprint))
+                        etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+                except Exception as e:
+                    logger.error(f"Error computing ETag fingerprint: {str(e)}")
+                # cached_response keys on it, so a body is never served under a newer ETag
+                g.data_etag = etag
+
+                if etag and request.if_none_match.contains_weak(etag):
+                    response = app.response_class(status=304)
+                    response.set_etag(etag, weak=True)
+                    response.headers['Cache-Control'] = 'private, no-cache'
+                    return response
+
+            response = app.make_response(f(current_user_id, *args, **kwargs))
+            if response.status_code == 200:
+                response.headers['Cache-Control'] = 'private, no-cache'
+                if etag:
+                    response.set_etag(etag, weak=True)
+                elif not sources and not response.is_streamed:
+                    response.add_etag()
+                    response.make_conditional(request)
+            return response
+        return decorated
+    return decorator
+
+# Response cache configuration
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 30))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 2000))
+RESPONSE_CACHE_REDIS_URL = os.getenv('RESPONSE_CACHE_REDIS_URL')
+
+
+class LocalCacheBackend:
+    """In-process LRU of cached bodies with a tag -> keys index"""
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires, tags)
+        self._tags = {}
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl, tags):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'backend': 'local',
+                'entries': len(self._entries),
+                'tags': len(self._tags),
+                'evictions': self._evictions
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCacheBackend:
+    """Redis-backed cache shared by every worker process; tags are Redis sets of keys"""
+
+    def __init__(self, url, prefix='hr:response-cache:'):
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(self.prefix + key)
+
+    def set(self, key, value, ttl, tags):
+        pipe = self._client.pipeline(transaction=False)
+        pipe.set(self.prefix + key, value, ex=ttl)
+        for tag in tags:
+            # A tag set only needs to outlive the newest entry it points at
+            pipe.sadd(self.prefix + 'tag:' + tag, self.prefix + key)
+            pipe.expire(self.prefix + 'tag:' + tag, ttl)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        tag_keys = [self.prefix + 'tag:' + tag for tag in tags]
+        pipe = self._client.pipeline(transaction=False)
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        keys = set().union(*pipe.execute())
+        self._client.delete(*tag_keys, *keys)
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self._client.delete(*keys)
+
+    def metrics(self):
+        return {'backend': 'redis'}
+
+
+def cache_tags(entities, departments):
+    """Tags for an entry that reads `entities` within `departments` (None: every department)"""
+    scopes = [f'dept:{department}' for department in departments] if departments is not None else ['dept:*']
+    return list(entities) + [f'{scope}/{entity}' for entity in entities for scope in scopes]
+
+def invalidation_tags(entities, departments=None):
+    """Tags to drop after writing `entities` in `departments` (None: department unknown).
+
+    A department write reaches that department's entries and the cross-department
+    ones; an unscoped write reaches every entry reading the entity.
+    """
+    departments = {department for department in departments or () if department}
+    if not departments:
+        return list(entities)
+    return [f'dept:{department}/{entity}' for entity in entities for department in departments] + \
+        [f'dept:*/{entity}' for entity in entities]
+
+def cache_departments(user):
+    """Departments whose data the caller can see; None for every department"""
+    if user['role'] == 'Admin':
+        return None
+    if user['role'] == 'TeamLeader' and user['department'] == 'Customer-Service':
+        return ['Customer-Service', 'Finance']
+    return [user['department']]
+
+
+class ResponseCache:
+    """Cache of JSON GET bodies for the expensive read endpoints, dropped by tag from the write handlers.
+
+    Entries are tagged per entity and department (cache_tags), so a task
+    written in IT only drops IT's entries and the cross-department ones while
+    other departments stay warm. RESPONSE_CACHE_TTL bounds anything a write
+    path does not invalidate, such as names joined in from another department.
+    """
+
+    def __init__(self, backend, ttl=30):
+        self.backend = backend
+        self.ttl = ttl
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Response cache read failed: {str(e)}")
+            value = None
+            with self._lock:
+                self._errors += 1
+        with self._lock:
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return value
+
+    def set(self, key, value, tags, generation):
+        with self._lock:
+            # Skip the store if an invalidation raced with the load
+            if generation != self._generation:
+                return
+        try:
+            self.backend.set(key, value, self.ttl, tags)
+        except Exception as e:
+            logger.error(f"Response cache write failed: {str(e)}")
+            with self._lock:
+                self._errors += 1
+
+    def invalidate(self, entities, departments=None):
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+        try:
+            self.backend.invalidate(invalidation_tags(entities, departments))
+        except Exception as e:
+            logger.error(f"Response cache invalidation failed: {str(e)}")
+            with self._lock:
+                self._errors += 1
+        # conditional_get reads these, so ETags move even where this cache is disabled
+        try:
+            bump_entity_versions(entities, departments)
+        except Exception as e:
+            logger.error(f"Entity version bump failed: {str(e)}")
+            with self._lock:
+                self._errors += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+        self.backend.clear()
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            stats = {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self._invalidations,
+                'errors': self._errors
+            }
+        try:
+            stats.update(self.backend.metrics())
+        except Exception as e:
+            logger.error(f"Response cache metrics failed: {str(e)}")
+        return stats
+
+
+def create_response_cache_backend():
+    if RESPONSE_CACHE_REDIS_URL:
+        if redis is not None:
+            return RedisCacheBackend(RESPONSE_CACHE_REDIS_URL)
+        logger.warning("RESPONSE_CACHE_REDIS_URL is set but redis is not installed; using the in-process cache")
+    return LocalCacheBackend(max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(create_response_cache_backend(), ttl=RESPONSE_CACHE_TTL)
+
+def cached_response(*entities, per_user=False):
+    """Serve a JSON GET endpoint from response_cache; goes under token_required / conditional_get.
+
+    Entries are keyed by path, query string and the caller's role and
+    department (and user id when per_user), and tagged with the entities the
+    handler reads. Under conditional_get the key also holds the ETag of the
+    current data fingerprint, so a write another worker invalidated (or a
+    course edited directly in the database) is a miss here too.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user_id, *args, **kwargs):
+            user = g.current_user
+            if not RESPONSE_CACHE_ENABLED or not user:
+                return f(current_user_id, *args, **kwargs)
+
+            key = repr((request.path, request.query_string, user['role'], user['department'],
+                        current_user_id if per_user else None, g.get('data_etag')))
+            key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+            body = response_cache.get(key)
+            if body is not None:
+                response = app.response_class(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            generation = response_cache.generation
+            response = app.make_response(f(current_user_id, *args, **kwargs))
+            if response.status_code == 200 and response.mimetype == 'application/json' and not response.is_streamed:
+                response_cache.set(key, response.get_data(), cache_tags(entities, cache_departments(user)), generation)
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorated
+    return decorator
+
+# Dashboard summary configuration
+SUMMARY_RECONCILE_INTERVAL = int(os.getenv('SUMMARY_RECONCILE_INTERVAL', 300))
+USER_ROLES = ['Admin', 'TeamLeader', 'Employee']
+TASK_STATUSES = ['Todo', 'In Progress', 'Completed']
+
+# The counts are independent, so reconcile() sends them out as one concurrent batch
+DASHBOARD_SUMMARY_QUERIES = {
+    'users': ('''
+        SELECT role, department, is_active, COUNT(*) as count
+        FROM users
+        GROUP BY role, department, is_active
+    ''', ()),
+    'tasks': ('''
+        SELECT t.status, u.department, COUNT(*) as count
+        FROM tasks t
+        LEFT JOIN users u ON t.assigned_to = u.id
+        GROUP BY t.status, u.department
+    ''', ()),
+    'active_sessions': ('SELECT COUNT(*) as count FROM login_sessions WHERE is_active = 1', ()),
+    'courses': ('SELECT COUNT(*) as count FROM courses', ()),
+    'demonstrations': ('SELECT COUNT(*) as count FROM employee_course_demonstrations', ()),
+    'recent_sessions': ('''
+        SELECT ls.id, ls.user_id, ls.login_time, ls.is_active, u.name as user_name
+        FROM login_sessions ls
+        JOIN users u ON ls.user_id = u.id
+        ORDER BY ls.login_time DESC
+        LIMIT 5
+    ''', ())
+}
+
+
+class DashboardSummary:
+    """In-process rollup of the admin dashboard counters, kept current by the write paths.
+
+    Counters are loaded by a full reconciliation on first use, then adjusted
+    incrementally by the handlers that write users, tasks, sessions and
+    demonstrations. A background thread re-runs the reconciliation every
+    SUMMARY_RECONCILE_INTERVAL seconds to correct drift (e.g. writes made by
+    other workers or directly in the database).
+    """
+
+    def __init__(self, reconcile_interval=300):
+        self.reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._state = None
+        self._reconciler = None
+        self.last_reconciled_at = None
+
+    def _empty_state(self):
+        return {
+            'users': {'total': 0, 'active': 0, 'roles': {role: 0 for role in USER_ROLES}},
+            'tasks': {status: 0 for status in TASK_STATUSES},
+            'departments': {},
+            'active_sessions': 0,
+            'courses': 0,
+            'demonstrations': 0,
+            'recent_sessions': deque(maxlen=5)
+        }
+
+    def _department(self, state, department):
+        if department not in state['departments']:
+            state['departments'][department] = {
+                'users': 0,
+                'active': 0,
+                'roles': {role: 0 for role in USER_ROLES},
+                'tasks': {status: 0 for status in TASK_STATUSES}
+            }
+        return state['departments'][department]
+
+    def _apply_user(self, state, role, department, is_active, delta):
+        buckets = [state['users']]
+        if department is not None:
+            dept = self._department(state, department)
+            dept['users'] += delta
+            buckets.append(dept)
+        state['users']['total'] += delta
+        for bucket in buckets:
+            if is_active:
+                bucket['active'] += delta
+            if role in bucket['roles']:
+                bucket['roles'][role] += delta
+
+    def _apply_task(self, state, department, status, delta):
+        if status in state['tasks']:
+            state['tasks'][status] += delta
+        if department is not None and status in TASK_STATUSES:
+            self._department(state, department)['tasks'][status] += delta
+
+    def user_added(self, role, department, is_active=True):
+        with self._lock:
+            if self._state is not None:
+                self._apply_user(self._state, role, department, is_active, 1)
+
+    def user_removed(self, role, department, is_active=True):
+        with self._lock:
+            if self._state is not None:
+                self._apply_user(self._state, role, department, is_active, -1)
+
+    def user_changed(self, old, new):
+        with self._lock:
+            if self._state is not None:
+                self._apply_user(self._state, old['role'], old['department'], old['is_active'], -1)
+                self._apply_user(self._state, new['role'], new['department'], new['is_active'], 1)
+
+    def task_added(self, department, status):
+        with self._lock:
+            if self._state is not None:
+                self._apply_task(self._state, department, status, 1)
+
+    def task_removed(self, department, status):
+        with self._lock:
+            if self._state is not None:
+                self._apply_task(self._state, department, status, -1)
+
+    def task_changed(self, old_department, old_status, new_department, new_status):
+        if old_department == new_department and old_status == new_status:
+            return
+        with self._lock:
+            if self._state is not None:
+                self._apply_task(self._state, old_department, old_status, -1)
+                self._apply_task(self._state, new_department, new_status, 1)
+
+    def session_started(self, session, deactivated_count=0):
+        with self._lock:
+            if self._state is None:
+                return
+            self._state['active_sessions'] += 1 - deactivated_count
+            for recent in self._state['recent_sessions']:
+                if recent['user_id'] == session['user_id']:
+                    recent['is_active'] = False
+            self._state['recent_sessions'].appendleft(dict(session, is_active=True))
+
+    def sessions_ended(self, count, session_ids):
+        with self._lock:
+            if self._state is None:
+                return
+            self._state['active_sessions'] = max(0, self._state['active_sessions'] - count)
+            ended = set(session_ids)
+            for recent in self._state['recent_sessions']:
+                if recent['id'] in ended:
+                    recent['is_active'] = False
+
+    def demonstration_added(self):
+        with self._lock:
+            if self._state is not None:
+                self._state['demonstrations'] += 1
+
+    def reconcile(self):
+        """Recompute every counter from the database and swap it in"""
+        state = self._empty_state()
+        results = query_batcher.run(DASHBOARD_SUMMARY_QUERIES)
+
+        for row in results['users']:
+            self._apply_user(state, row['role'], row['department'], bool(row['is_active']), int(row['count']))
+        for row in results['tasks']:
+            self._apply_task(state, row['department'], row['status'], int(row['count']))
+        state['active_sessions'] = int(results['active_sessions'][0]['count'])
+        state['courses'] = int(results['courses'][0]['count'])
+        state['demonstrations'] = int(results['demonstrations'][0]['count'])
+        for row in results['recent_sessions']:
+            state['recent_sessions'].append({
+                'id': row['id'],
+                'user_id': row['user_id'],
+                'user_name': row['user_name'],
+                'login_time': row['login_time'],
+                'is_active': bool(row['is_active'])
+            })
+
+        with self._lock:
+            self._state = state
+            self.last_reconciled_at = datetime.datetime.now()
+
+    def _run_reconciler(self):
+        while True:
+            time.sleep(self.reconcile_interval)
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.error(f"Dashboard summary reconciliation error: {str(e)}")
+
+    def start(self):
+        with self._lock:
+            if self._reconciler is None and self.reconcile_interval > 0:
+                self._reconciler = threading.Thread(target=self._run_reconciler, name='dashboard-summary', daemon=True)
+                self._reconciler.start()
+
+    def snapshot(self):
+        if self._state is None:
+            self.reconcile()
+            self.start()
+        with self._lock:
+            state = self._state
+            return {
+                'users': {'total': state['users']['total'], 'active': state['users']['active'], 'roles': dict(state['users']['roles'])},
+                'tasks': dict(state['tasks']),
+                'departments': {
+                    name: {'users': dept['users'], 'active': dept['active'], 'roles': dict(dept['roles']), 'tasks': dict(dept['tasks'])}
+                    for name, dept in state['departments'].items()
+                },
+                'active_sessions': state['active_sessions'],
+                'courses': state['courses'],
+                'demonstrations': state['demonstrations'],
+                'recent_sessions': [dict(session) for session in state['recent_sessions']]
+            }
+
+
+dashboard_summary = DashboardSummary(reconcile_interval=SUMMARY_RECONCILE_INTERVAL)
+
+# Login session bookkeeping configuration
+SESSION_SWEEP_INTERVAL = int(os.getenv('SESSION_SWEEP_INTERVAL', 300))
+SESSION_WRITE_TIMEOUT = float(os.getenv('SESSION_WRITE_TIMEOUT', 10))
+SESSION_WRITE_RETRIES = int(os.getenv('SESSION_WRITE_RETRIES', 3))
+
+ACTIVE_SESSIONS_LOCK_SQL = '''
+    SELECT id, user_id FROM login_sessions
+    WHERE user_id IN ({placeholders}) AND is_active = 1
+    FOR UPDATE
+'''
+
+EXPIRED_SESSIONS_SQL = '''
+    SELECT id FROM login_sessions
+    WHERE is_active = 1 AND login_time < %s
+'''
+
+class SessionManager:
+    """Group-commits login_sessions writes and ends sessions that outlived their token.
+
+    Logins and logouts are queued and the caller waits for the writer thread,
+    which drains everything queued into a single transaction: logouts and the
+    users' previous sessions are deactivated by primary key (looked up through
+    the (user_id, is_active) index), new sessions are inserted, and the batch
+    commits once. A batch that loses a deadlock or lock wait is rerun up to
+    `retries` times before its callers get the error. A caller that gives up
+    waiting takes its operation back: it is dropped from the queue, or skipped
+    by the next attempt if its batch was already taken.
+
+    Every SESSION_SWEEP_INTERVAL seconds the same thread ends active sessions
+    older than TOKEN_LIFETIME_SECONDS, whose tokens can no longer be used, so
+    is_active only counts live sessions and logout_time is always filled in.
+    """
+
+    def __init__(self, sweep_interval=300, timeout=10, retries=3):
+        self.sweep_interval = sweep_interval
+        self.timeout = timeout
+        self.retries = retries
+        self._queue = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._writer = None
+        self._next_sweep = 0
+        self._stats = {
+            'logins': 0,
+            'logouts': 0,
+            'expired': 0,
+            'flushes': 0,
+            'largest_batch': 0,
+            'flush_failures': 0,
+            'write_retries': 0,
+            'abandoned': 0
+        }
+
+    def start(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='session-writer', daemon=True)
+                self._writer.start()
+                atexit.register(self.stop)
+
+    def begin(self, user_id, user_agent, ip_address):
+        """Open a session; returns its id, login_time and the session ids it superseded"""
+        return self._submit({'kind': 'login', 'user_id': user_id, 'user_agent': user_agent, 'ip_address': ip_address})
+
+    def end(self, user_id, session_id):
+        """Log a session out; returns whether it was still active"""
+        return self._submit({'kind': 'logout', 'user_id': user_id, 'session_id': session_id})
+
+    def _submit(self, op):
+        self.start()
+        op['done'] = threading.Event()
+        op['result'] = None
+        op['error'] = None
+        op['abandoned'] = False
+        with self._lock:
+            self._queue.append(op)
+        self._wake.set()
+        if self._stopped:
+            self.flush()
+        if not op['done'].wait(self.timeout):
+            with self._lock:
+                if not op['done'].is_set():
+                    # Nobody will read the result, so do not write it either
+                    op['abandoned'] = True
+                    if op in self._queue:
+                        self._queue.remove(op)
+                    self._stats['abandoned'] += 1
+            if op['abandoned']:
+                raise RuntimeError('Timed out waiting for the session writer')
+        if op['error'] is not None:
+            raise op['error']
+        return op['result']
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Session flush on shutdown failed: {str(e)}")
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.sweep_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Session flush error: {str(e)}")
+            if self.sweep_interval > 0 and time.monotonic() >= self._next_sweep:
+                self._next_sweep = time.monotonic() + self.sweep_interval
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Session sweep error: {str(e)}")
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = self._queue
+                self._queue = []
+
+            attempt = 0
+            while True:
+                with self._lock:
+                    batch = [op for op in batch if not op['abandoned']]
+                if not batch:
+                    return 0
+                try:
+                    ended = self._write(batch)
+                    break
+                except Exception as e:
+                    if is_lock_conflict_db_error(e) and attempt < self.retries:
+                        # InnoDB rolled the whole transaction back, so rerunning it is safe
+                        attempt += 1
+                        with self._lock:
+                            self._stats['write_retries'] += 1
+                        time.sleep(0.05 * attempt)
+                        continue
+                    # Out of retries, or not worth one: the waiting callers get the error
+                    with self._lock:
+                        self._stats['flush_failures'] += 1
+                        for op in batch:
+                            op['error'] = e
+                            op['done'].set()
+                    raise
+
+            with self._lock:
+                self._stats['logins'] += sum(1 for op in batch if op['kind'] == 'login')
+                self._stats['logouts'] += len(ended)
+                self._stats['flushes'] += 1
+                self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+            if ended:
+                dashboard_summary.sessions_ended(len(ended), ended)
+            with self._lock:
+                for op in batch:
+                    op['done'].set()
+            return len(batch)
+
+    def _write(self, batch):
+        now = datetime.datetime.now().replace(microsecond=0)
+        logins = [op for op in batch if op['kind'] == 'login']
+        logouts = [op for op in batch if op['kind'] == 'logout']
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            ended = []
+            if logouts:
+                session_ids = sorted({op['session_id'] for op in logouts})
+                placeholders = ', '.join(['%s'] * len(session_ids))
+                cursor.execute(f'''
+                    SELECT id FROM login_sessions
+                    WHERE id IN ({placeholders}) AND is_active = 1
+                    FOR UPDATE
+                ''', session_ids)
+                ended = [row['id'] for row in cursor.fetchall()]
+                if ended:
+                    placeholders = ', '.join(['%s'] * len(ended))
+                    cursor.execute(f'''
+                        UPDATE login_sessions SET is_active = 0, logout_time = %s
+                        WHERE id IN ({placeholders})
+                    ''', [now] + ended)
+                for op in logouts:
+                    op['result'] = op['session_id'] in ended
+
+            if logins:
+                user_ids = sorted({op['user_id'] for op in logins})
+                placeholders = ', '.join(['%s'] * len(user_ids))
+                cursor.execute(ACTIVE_SESSIONS_LOCK_SQL.format(placeholders=placeholders), user_ids)
+                current = {}
+                for row in cursor.fetchall():
+                    current.setdefault(row['user_id'], []).append(row['id'])
+
+                # A later login in the same batch supersedes an earlier one of the same user
+                superseded = []
+                for op in logins:
+                    cursor.execute('''
+                        INSERT INTO login_sessions (user_id, user_agent, ip_address, login_time)
+                        VALUES (%s, %s, %s, %s)
+                    ''', (op['user_id'], op['user_agent'], op['ip_address'], now))
+                    previous = current.get(op['user_id'], [])
+                    superseded.extend(previous)
+                    op['result'] = {'id': cursor.lastrowid, 'login_time': now, 'superseded': previous}
+                    current[op['user_id']] = [cursor.lastrowid]
+
+                if superseded:
+                    placeholders = ', '.join(['%s'] * len(superseded))
+                    cursor.execute(f'''
+                        UPDATE login_sessions SET is_active = 0, logout_time = %s
+                        WHERE id IN ({placeholders})
+                    ''', [now] + superseded)
+
+            conn.commit()
+            return ended
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def sweep(self):
+        """End active sessions whose token has expired, dating logout_time to the expiry"""
+        cutoff = datetime.datetime.now() - datetime.timedelta(seconds=TOKEN_LIFETIME_SECONDS)
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(EXPIRED_SESSIONS_SQL, (cutoff,))
+            session_ids = [row['id'] for row in cursor.fetchall()]
+            if not session_ids:
+                return 0
+            placeholders = ', '.join(['%s'] * len(session_ids))
+            cursor.execute(f'''
+                UPDATE login_sessions
+                SET is_active = 0, logout_time = DATE_ADD(login_time, INTERVAL %s SECOND)
+                WHERE id IN ({placeholders}) AND is_active = 1
+            ''', [TOKEN_LIFETIME_SECONDS] + session_ids)
+            # Another worker's sweep may have ended some of them first
+            expired = cursor.rowcount
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+        with self._lock:
+            self._stats['expired'] += expired
+        dashboard_summary.sessions_ended(expired, session_ids)
+        return expired
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queued'] = len(self._queue)
+        return stats
+
+
+session_manager = SessionManager(sweep_interval=SESSION_SWEEP_INTERVAL, timeout=SESSION_WRITE_TIMEOUT,
+                                 retries=SESSION_WRITE_RETRIES)
+
+# Versioned schema migrations, applied in order and recorded in schema_migrations.
+# Each migration may declare indexes (table, name, columns), which are only
+# created when missing, and plain SQL statements.
+SCHEMA_MIGRATIONS = [
+    {
+        'version': 1,
+        'name': 'hot_path_indexes',
+        'indexes': [
+            ('tasks', 'idx_tasks_assigned_to_status', ['assigned_to', 'status']),
+            ('tasks', 'idx_tasks_assigned_by', ['assigned_by']),
+            ('tasks', 'idx_tasks_status_deadline', ['status', 'deadline']),
+            ('tasks', 'idx_tasks_deadline', ['deadline']),
+            ('tasks', 'idx_tasks_updated_at', ['updated_at']),
+            ('login_sessions', 'idx_login_sessions_user_active', ['user_id', 'is_active']),
+            ('login_sessions', 'idx_login_sessions_active', ['is_active']),
+            ('login_sessions', 'idx_login_sessions_login_time', ['login_time']),
+            ('users', 'idx_users_email', ['email']),
+            ('users', 'idx_users_department_role', ['department', 'role']),
+            ('users', 'idx_users_role', ['role']),
+            ('notifications', 'idx_notifications_created_at', ['created_at']),
+            ('notifications', 'idx_notifications_user_created', ['user_id', 'created_at']),
+            ('employee_course_demonstrations', 'idx_demonstrations_user_submitted', ['user_id', 'submitted_at']),
+            ('job_applications', 'idx_job_applications_user_submitted', ['user_id', 'submitted_at']),
+            ('quizzes', 'idx_quizzes_uploaded_by', ['uploaded_by']),
+            ('quizzes', 'idx_quizzes_department', ['department']),
+            ('quiz_submissions', 'idx_quiz_submissions_quiz', ['quiz_id'])
+        ]
+    },
+    {
+        'version': 2,
+        'name': 'watch_history_daily_key',
+        # Heartbeats upsert one row per user, course and day; fold existing duplicates first
+        'statements': [
+            'ALTER TABLE course_watch_history MODIFY id int(11) NOT NULL AUTO_INCREMENT',
+            '''
+            UPDATE course_watch_history w
+            JOIN (
+                SELECT MIN(id) as keep_id, MAX(id) as last_id, SUM(watch_duration) as total_duration
+                FROM course_watch_history
+                GROUP BY user_id, course_id, watch_date
+                HAVING COUNT(*) > 1
+            ) d ON w.id = d.keep_id
+            JOIN course_watch_history l ON l.id = d.last_id
+            SET w.watch_duration = d.total_duration,
+                w.watch_position = l.watch_position,
+                w.completed_segments = l.completed_segments
+            ''',
+            '''
+            DELETE w FROM course_watch_history w
+            JOIN (
+                SELECT user_id, course_id, watch_date, MIN(id) as keep_id
+                FROM course_watch_history
+                GROUP BY user_id, course_id, watch_date
+                HAVING COUNT(*) > 1
+            ) d ON w.user_id = d.user_id AND w.course_id = d.course_id
+                AND w.watch_date = d.watch_date AND w.id <> d.keep_id
+            '''
+        ],
+        'unique_indexes': [
+            ('course_watch_history', 'uniq_watch_history_user_course_date', ['user_id', 'course_id', 'watch_date'])
+        ]
+    },
+    {
+        'version': 3,
+        'name': 'notification_inbox',
+        # One row per recipient; existing notifications go to every active user, keeping their read flag
+        'statements': [
+            '''
+            CREATE TABLE IF NOT EXISTS notification_recipients (
+                user_id int(11) NOT NULL,
+                notification_id int(11) NOT NULL,
+                is_read tinyint(1) NOT NULL DEFAULT 0,
+                created_at timestamp NOT NULL DEFAULT current_timestamp(),
+                read_at timestamp NULL DEFAULT NULL,
+                PRIMARY KEY (user_id, notification_id),
+                KEY idx_notification_recipients_inbox (user_id, created_at, notification_id),
+                KEY idx_notification_recipients_unread (user_id, is_read),
+                KEY idx_notification_recipients_notification (notification_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            ''',
+            '''
+            INSERT IGNORE INTO notification_recipients (user_id, notification_id, is_read, created_at)
+            SELECT u.id, n.id, COALESCE(n.is_read, 0), n.created_at
+            FROM notifications n
+            JOIN users u ON u.is_active = 1
+            '''
+        ]
+    },
+    {
+        'version': 4,
+        'name': 'etag_fingerprint_indexes',
+        # Lets MAX(updated_at) in data_fingerprint() read one index entry
+        'indexes': [
+            ('users', 'idx_users_updated_at', ['updated_at']),
+            ('courses', 'idx_courses_updated_at', ['updated_at'])
+        ]
+    },
+    {
+        'version': 5,
+        'name': 'upload_blobs',
+        # Content-addressed uploads; ref_count mirrors the URL columns in UPLOAD_REFERENCES
+        'statements': [
+            '''
+            CREATE TABLE IF NOT EXISTS upload_blobs (
+                sha256 char(64) NOT NULL,
+                size bigint(20) UNSIGNED NOT NULL,
+                ref_count int(11) NOT NULL DEFAULT 0,
+                created_at timestamp NOT NULL DEFAULT current_timestamp(),
+                released_at timestamp NULL DEFAULT NULL,
+                PRIMARY KEY (sha256),
+                KEY idx_upload_blobs_ref_count (ref_count)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            '''
+        ]
+    },
+    {
+        'version': 6,
+        'name': 'course_interactions_auto_increment',
+        # InteractionCollector inserts without an id
+        'statements': [
+            'ALTER TABLE course_interactions MODIFY id int(11) NOT NULL AUTO_INCREMENT'
+        ]
+    },
+    {
+        'version': 7,
+        'name': 'enrollment_resume_position',
+        # WatchHistoryBuffer writes the resume point back onto the enrollment
+        'columns': [
+            ('course_enrollments', 'last_accessed_at', 'timestamp NULL DEFAULT NULL'),
+            ('course_enrollments', 'last_watch_position', 'int(11) DEFAULT NULL')
+        ],
+        # Deployments that recorded version 2 before it made the id AUTO_INCREMENT
+        'statements': [
+            'ALTER TABLE course_watch_history MODIFY id int(11) NOT NULL AUTO_INCREMENT'
+        ]
+    },
+    {
+        'version': 8,
+        'name': 'entity_versions',
+        # Change counters behind conditional_get, bumped by response_cache.invalidate
+        'statements': [
+            '''
+            CREATE TABLE IF NOT EXISTS entity_versions (
+                entity varchar(64) NOT NULL,
+                scope varchar(255) NOT NULL,
+                version bigint(20) UNSIGNED NOT NULL DEFAULT 0,
+                updated_at timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+                PRIMARY KEY (entity, scope)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+            '''
+        ]
+    },
+    {
+        'version': 9,
+        'name': 'upload_reference_indexes',
+        # send_upload looks up the referencing row before serving a blob
+        'indexes': [
+            ('job_applications', 'idx_job_applications_cv_url', ['cv_url']),
+            ('tasks', 'idx_tasks_document_url', ['document_url']),
+            ('quizzes', 'idx_quizzes_file_url', ['file_url']),
+            ('quiz_submissions', 'idx_quiz_submissions_file_url', ['file_url'])
+        ]
+    }
+]
+
+def apply_migrations():
+    """Apply any schema migrations that have not been recorded yet"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    applied_now = []
+    try:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version int(11) NOT NULL PRIMARY KEY,
+                name varchar(255) NOT NULL,
+                applied_at timestamp NOT NULL DEFAULT current_timestamp()
+            )
+        ''')
+        cursor.execute('SELECT version FROM schema_migrations')
+        applied = {row['version'] for row in cursor.fetchall()}
+
+        for migration in sorted(SCHEMA_MIGRATIONS, key=lambda m: m['version']):
+            if migration['version'] in applied:
+                continue
+
+            for table, column, definition in migration.get('columns', []):
+                cursor.execute('''
+                    SELECT COUNT(*) as count
+                    FROM information_schema.columns
+                    WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+                ''', (table, column))
+                if cursor.fetchone()['count']:
+                    continue
+                cursor.execute(f'ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}')
+                logger.info(f"Added column {column} to {table}")
+
+            for statement in migration.get('statements', []):
+                cursor.execute(statement)
+
+            indexes = [(index, 'INDEX') for index in migration.get('indexes', [])]
+            indexes += [(index, 'UNIQUE INDEX') for index in migration.get('unique_indexes', [])]
+            for (table, index_name, columns), kind in indexes:
+                cursor.execute('''
+                    SELECT COUNT(*) as count
+                    FROM information_schema.statistics
+                    WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+                ''', (table, index_name))
+                if cursor.fetchone()['count']:
+                    continue
+                column_list = ', '.join(f'`{column}`' for column in columns)
+                cursor.execute(f'ALTER TABLE `{table}` ADD {kind} `{index_name}` ({column_list})')
+                logger.info(f"Created index {index_name} on {table}({', '.join(columns)})")
+
+            cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (%s, %s)',
+                           (migration['version'], migration['name']))
+            conn.commit()
+            applied_now.append(migration['version'])
+            logger.info(f"Applied migration {migration['version']}: {migration['name']}")
+
+        return applied_now
+    finally:
+        cursor.close()
+        conn.close()
+
+def check_query_plans(queries=None):
+    """Run EXPLAIN on the hot route queries (HOT_QUERIES) and flag full table scans"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    findings = []
+    try:
+        for route, sql, params in (queries or HOT_QUERIES):
+            cursor.execute('EXPLAIN ' + sql, params)
+            for row in cursor.fetchall():
+                full_scan = row.get('type') == 'ALL' and not row.get('key')
+                findings.append({
+                    'route': route,
+                    'table': row.get('table'),
+                    'type': row.get('type'),
+                    'key': row.get('key'),
+                    'rows': row.get('rows'),
+                    'extra': row.get('Extra'),
+                    'full_scan': full_scan
+                })
+        return findings
+    finally:
+        cursor.close()
+        conn.close()
+
 
 # def db_connection():
 #     db_settings = [
@@ -161,6 +2579,103 @@ def token_required(f):
 #         return jsonify({f"There is a database error: {str(error)}"})
 #         raise
 
+# Password hashing configuration
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 16))
+
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated pool so a login storm cannot occupy every worker.
+
+    pbkdf2 and scrypt release the GIL, so the pool size is the number of cores
+    hashing may take. At most workers + queue_size jobs are admitted; past
+    that check() and hash() return None and the endpoint answers 429. Hashes
+    made with other parameters are upgraded after a successful login.
+    """
+
+    def __init__(self, method, salt_length=16, workers=2, queue_size=16):
+        self.method = method
+        self.salt_length = salt_length
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._stats = {'checks': 0, 'hashes': 0, 'rejected': 0, 'rehashed': 0}
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            return None
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def check(self, password_hash, password):
+        """True or False, or None when the pool is saturated"""
+        future = self._submit(check_password_hash, password_hash, password)
+        if future is None:
+            return None
+        with self._lock:
+            self._stats['checks'] += 1
+        return future.result()
+
+    def hash(self, password):
+        """A new hash with the current parameters, or None when the pool is saturated"""
+        future = self._submit(generate_password_hash, password, self.method, self.salt_length)
+        if future is None:
+            return None
+        with self._lock:
+            self._stats['hashes'] += 1
+        return future.result()
+
+    def needs_rehash(self, password_hash):
+        method, _, rest = password_hash.partition('$')
+        return method != self.method or len(rest.partition('$')[0]) != self.salt_length
+
+    def rehash_later(self, user_id, password, old_hash):
+        """Upgrade a stored hash off the request path; dropped when saturated, so a later login retries"""
+        self._submit(self._rehash, user_id, password, old_hash)
+
+    def _rehash(self, user_id, password, old_hash):
+        try:
+            new_hash = generate_password_hash(password, self.method, self.salt_length)
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            try:
+                # Only replace the hash we verified; a concurrent password change wins
+                cursor.execute('UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s',
+                               (new_hash, user_id, old_hash))
+                conn.commit()
+                updated = cursor.rowcount
+            finally:
+                cursor.close()
+                conn.close()
+            with self._lock:
+                self._stats['rehashed'] += updated
+        except Exception as e:
+            logger.error(f"Error rehashing password for user {user_id}: {str(e)}")
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_METHOD, salt_length=PASSWORD_SALT_LENGTH,
+                                 workers=PASSWORD_HASH_WORKERS, queue_size=PASSWORD_HASH_QUEUE_SIZE)
+
+def hashing_busy_response():
+    response = jsonify({'message': 'Too many password operations in progress, please retry'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+USER_BY_EMAIL_SQL = 'SELECT * FROM users WHERE email = %s'
+
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -174,32 +2689,45 @@ def login():
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute('SELECT * FROM users WHERE email = %s', (email,))
+        cursor.execute(USER_BY_EMAIL_SQL, (email,))
         user = cursor.fetchone()
-        
+        # Hand the connection back before waiting on the hashing pool and the session
+        # writer, which both take connections from the same pool
+        cursor.close()
+        conn.close()
+
         if not user:
             return jsonify({'message': 'Invalid email or password'}), 401
 
         # Only allow login if the provided password matches the stored hash
-        if not check_password_hash(user['password_hash'], password):
+        password_ok = password_hasher.check(user['password_hash'], password)
+        if password_ok is None:
+            return hashing_busy_response()
+        if not password_ok:
             return jsonify({'message': 'Invalid email or password'}), 401
+        if password_hasher.needs_rehash(user['password_hash']):
+            password_hasher.rehash_later(user['id'], password, user['password_hash'])
 
-        # Delete any existing active sessions for this user
-        cursor.execute('UPDATE login_sessions SET is_active = 0 WHERE user_id = %s', (user['id'],))
-        
-        # Create new session
-        cursor.execute('''
-            INSERT INTO login_sessions (user_id, user_agent, ip_address)
-            VALUES (%s, %s, %s)
-        ''', (user['id'], request.user_agent.string, request.remote_addr))
-        conn.commit()
+        # Create the new session; the session writer also ends any previous ones
+        session = session_manager.begin(user['id'], request.user_agent.string, request.remote_addr)
+        session_id = session['id']
+        token_cache.revoke_sessions_before(user['id'], session_id)
+        principal_cache.invalidate(user['id'])
+
+        dashboard_summary.session_started({
+            'id': session_id,
+            'user_id': user['id'],
+            'user_name': user['name'],
+            'login_time': session['login_time']
+        }, len(session['superseded']))
 
         # Generate JWT token with role information
         token = jwt.encode({
             'user_id': user['id'],
             'email': user['email'],
             'role': user['role'],
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1)
+            'sid': session_id,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=TOKEN_LIFETIME_SECONDS)
         }, app.config['JWT_SECRET_KEY'], algorithm='HS256')
 
         # Determine redirect URL based on role
@@ -244,6 +2772,28 @@ def login():
         except:
             pass
 
+@app.route('/api/auth/logout', methods=['POST'])
+@token_required
+def logout(current_user_id):
+    token = request.headers['Authorization'].split(' ')[1]
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+
+    session_id = claims.get('sid')
+    if session_id is None:
+        # Tokens issued before sessions were tracked cannot be ended early
+        return jsonify({'message': 'Logged out'})
+
+    try:
+        session_manager.end(current_user_id, session_id)
+        token_cache.revoke_sessions_before(current_user_id, session_id + 1)
+        principal_cache.invalidate(current_user_id)
+        return jsonify({'message': 'Logged out'})
+    except Exception as e:
+        logger.error(f"Logout error: {str(e)}")
+        return jsonify({'message': 'An error occurred during logout'}), 500
+
 # Function to update users with proper bcrypt hashed passwords
 @app.route('/api/admin/update-passwords', methods=['POST'])
 def update_user_passwords():
@@ -252,7 +2802,9 @@ def update_user_passwords():
         cursor = conn.cursor(dictionary=True)
         
         # Generate a proper bcrypt hash for password123
-        password_hash = generate_password_hash("password123")
+        password_hash = password_hasher.hash("password123")
+        if password_hash is None:
+            return hashing_busy_response()
         
         # Update all users with the proper hash
         cursor.execute('UPDATE users SET password_hash = %s', (password_hash,))
@@ -293,49 +2845,41 @@ def get_current_user(current_user_id):
     del user['password_hash']  
     return jsonify(user)
 
+# Users with their task count and latest CV; {where} narrows it to a department
+USERS_LISTING_SQL = '''
+    SELECT u.*, COUNT(t.id) as tasks_count,
+           ja.cv_url, ja.job_title as cv_job_title, ja.submitted_at as cv_submitted_at
+    FROM users u
+    LEFT JOIN tasks t ON t.assigned_to = u.id
+    LEFT JOIN (
+        SELECT user_id, cv_url, job_title, submitted_at,
+               ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY submitted_at DESC) as rn
+        FROM job_applications
+        WHERE cv_url IS NOT NULL
+    ) ja ON u.id = ja.user_id AND ja.rn = 1
+    {where}
+    GROUP BY u.id
+'''
+
 @app.route('/api/users', methods=['GET'])
 @token_required
+@conditional_get('users', 'tasks', 'job_applications')
+@cached_response('users', 'tasks', 'job_applications')
 def get_users(current_user_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     
     # First check if the current user is an admin or team leader
-    cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-    current_user = cursor.fetchone()
+    current_user = g.current_user
     
     if current_user['role'] not in ['Admin', 'TeamLeader']:
         return jsonify({'message': 'Unauthorized'}), 403
 
     # If team leader, only return their department's employees
     if current_user['role'] == 'TeamLeader':
-        cursor.execute('''
-            SELECT u.*, COUNT(t.id) as tasks_count,
-                   ja.cv_url, ja.job_title as cv_job_title, ja.submitted_at as cv_submitted_at
-            FROM users u 
-            LEFT JOIN tasks t ON t.assigned_to = u.id 
-            LEFT JOIN (
-                SELECT user_id, cv_url, job_title, submitted_at,
-                       ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY submitted_at DESC) as rn
-                FROM job_applications 
-                WHERE cv_url IS NOT NULL
-            ) ja ON u.id = ja.user_id AND ja.rn = 1
-            WHERE u.department = (SELECT department FROM users WHERE id = %s)
-            GROUP BY u.id
-        ''', (current_user_id,))
+        cursor.execute(USERS_LISTING_SQL.format(where='WHERE u.department = %s'), (current_user['department'],))
     else:
-        cursor.execute('''
-            SELECT u.*, COUNT(t.id) as tasks_count,
-                   ja.cv_url, ja.job_title as cv_job_title, ja.submitted_at as cv_submitted_at
-            FROM users u 
-            LEFT JOIN tasks t ON t.assigned_to = u.id 
-            LEFT JOIN (
-                SELECT user_id, cv_url, job_title, submitted_at,
-                       ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY submitted_at DESC) as rn
-                FROM job_applications 
-                WHERE cv_url IS NOT NULL
-            ) ja ON u.id = ja.user_id AND ja.rn = 1
-            GROUP BY u.id
-        ''')
+        cursor.execute(USERS_LISTING_SQL.format(where=''))
     
     users = cursor.fetchall()
     cursor.close()
@@ -354,8 +2898,7 @@ def create_user(current_user_id):
     cursor = conn.cursor(dictionary=True)
     
     # Check if current user is admin
-    cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-    current_user = cursor.fetchone()
+    current_user = g.current_user
     
     if current_user['role'] != 'Admin':
         return jsonify({'message': 'Only admins can create users'}), 403
@@ -372,7 +2915,9 @@ def create_user(current_user_id):
         return jsonify({'message': 'Email already exists'}), 400
 
     # Hash password
-    password_hash = generate_password_hash(data['password'])
+    password_hash = password_hasher.hash(data['password'])
+    if password_hash is None:
+        return hashing_busy_response()
 
     try:
         cursor.execute('''
@@ -394,6 +2939,9 @@ def create_user(current_user_id):
         cursor.execute('SELECT * FROM users WHERE id = %s', (new_user_id,))
         new_user = cursor.fetchone()
         del new_user['password_hash']
+
+        dashboard_summary.user_added(new_user['role'], new_user['department'], bool(new_user['is_active']))
+        response_cache.invalidate(['users'], [new_user['department']])
         
         return jsonify(new_user), 201
     except Exception as e:
@@ -411,11 +2959,10 @@ def update_user(current_user_id, user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Check permissions and get current user role
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         # Get the user being updated
-        cursor.execute('SELECT role FROM users WHERE id = %s', (user_id,))
+        cursor.execute('SELECT role, department, is_active FROM users WHERE id = %s', (user_id,))
         user_to_update = cursor.fetchone()
         
         if not user_to_update:
@@ -471,6 +3018,8 @@ def update_user(current_user_id, user_id):
         query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s"
         cursor.execute(query, tuple(update_values))
         conn.commit()
+        principal_cache.invalidate(user_id)
+        response_cache.invalidate(['users'], [user_to_update['department'], data.get('department')])
         
         # Fetch and return updated user
         cursor.execute('''
@@ -485,6 +3034,11 @@ def update_user(current_user_id, user_id):
         if updated_user:
             # Convert boolean fields
             updated_user['isActive'] = bool(updated_user['isActive'])
+
+            dashboard_summary.user_changed(
+                {'role': user_to_update['role'], 'department': user_to_update['department'], 'is_active': bool(user_to_update['is_active'])},
+                {'role': updated_user['role'], 'department': updated_user['department'], 'is_active': updated_user['isActive']}
+            )
             
             return jsonify({
                 'message': 'User updated successfully',
@@ -511,13 +3065,12 @@ def delete_user(current_user_id, user_id):
         # Check if user is trying to delete their own account
         if current_user_id != user_id:
             # Only admins can delete other users
-            cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-            current_user = cursor.fetchone()
+            current_user = g.current_user
             if current_user['role'] != 'Admin':
                 return jsonify({'message': 'Unauthorized to delete other users'}), 403
         
         # Check if user is the last admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (user_id,))
+        cursor.execute('SELECT role, department, is_active FROM users WHERE id = %s', (user_id,))
         user_to_delete = cursor.fetchone()
         
         if user_to_delete['role'] == 'Admin':
@@ -529,9 +3082,13 @@ def delete_user(current_user_id, user_id):
         # Delete the user
         cursor.execute('DELETE FROM users WHERE id = %s', (user_id,))
         conn.commit()
+        principal_cache.invalidate(user_id)
+        response_cache.invalidate(['users', 'tasks', 'demonstrations', 'job_applications'], [user_to_delete['department']])
         
         if cursor.rowcount == 0:
             return jsonify({'message': 'User not found'}), 404
+
+        dashboard_summary.user_removed(user_to_delete['role'], user_to_delete['department'], bool(user_to_delete['is_active']))
             
         return jsonify({'message': 'User deleted successfully'})
         
@@ -568,7 +3125,9 @@ def update_user_password(current_user_id, user_id):
             return jsonify({'error': 'Missing new password'}), 400
 
         # Generate new password hash
-        new_password_hash = generate_password_hash(new_password)
+        new_password_hash = password_hasher.hash(new_password)
+        if new_password_hash is None:
+            return hashing_busy_response()
         
         # Update password in database
         cursor.execute('UPDATE users SET password_hash = %s WHERE id = %s', 
@@ -598,8 +3157,7 @@ def reset_user_password(current_user_id, user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Check if current user is admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         if current_user['role'] != 'Admin' and current_user_id != user_id:
             return jsonify({'message': 'Unauthorized'}), 403
@@ -622,30 +3180,128 @@ def reset_user_password(current_user_id, user_id):
         cursor.close()
         conn.close()
 
+# Task listing pagination
+TASKS_PAGE_SIZE = int(os.getenv('TASKS_PAGE_SIZE', 100))
+TASKS_MAX_PAGE_SIZE = int(os.getenv('TASKS_MAX_PAGE_SIZE', 500))
+
+def encode_cursor(values):
+    """Encode keyset values into an opaque cursor string"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+def parse_task_query_args(args):
+    """Parse filter and keyset pagination args for the task listings.
+
+    Returns (where_clauses, params, limit, cursor). Raises ValueError on bad input.
+    """
+    clauses = []
+    params = []
+
+    assignee = args.get('assignee')
+    if assignee:
+        try:
+            params.append(int(assignee))
+        except ValueError:
+            raise ValueError('assignee must be an integer')
+        clauses.append('t.assigned_to = %s')
+
+    status = args.get('status')
+    if status:
+        if status not in TASK_STATUSES:
+            raise ValueError('Invalid status')
+        clauses.append('t.status = %s')
+        params.append(status)
+
+    for arg, operator in (('deadline_from', '>='), ('deadline_to', '<=')):
+        if args.get(arg):
+            try:
+                clauses.append(f't.deadline {operator} %s')
+                params.append(datetime.datetime.fromisoformat(args[arg]))
+            except ValueError:
+                raise ValueError(f'Invalid {arg}')
+
+    try:
+        limit = int(args.get('limit', TASKS_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('Invalid limit')
+    limit = max(1, min(limit, TASKS_MAX_PAGE_SIZE))
+
+    cursor = None
+    if args.get('cursor'):
+        try:
+            deadline, task_id = decode_cursor(args['cursor'])
+            cursor = (datetime.datetime.fromisoformat(deadline), int(task_id))
+        except Exception:
+            raise ValueError('Invalid cursor')
+
+    return clauses, params, limit, cursor
+
+def build_task_page_query(select, scope_clauses, scope_params, filter_clauses, filter_params, limit, page_cursor):
+    """Keyset-paginated task query ordered by (deadline, id) descending, one row past the page.
+
+    Returns (query, params).
+    """
+    clauses = scope_clauses + filter_clauses
+    params = scope_params + filter_params
+    if page_cursor:
+        clauses.append('(t.deadline < %s OR (t.deadline = %s AND t.id < %s))')
+        params.extend([page_cursor[0], page_cursor[0], page_cursor[1]])
+
+    query = select
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    query += ' ORDER BY t.deadline DESC, t.id DESC LIMIT %s'
+    params.append(limit + 1)
+    return query, tuple(params)
+
+def fetch_task_page(cursor, select, scope_clauses, scope_params, filter_clauses, filter_params, limit, page_cursor):
+    """Run build_task_page_query(). Returns (rows, next_cursor)."""
+    cursor.execute(*build_task_page_query(select, scope_clauses, scope_params,
+                                          filter_clauses, filter_params, limit, page_cursor))
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last['deadline'].isoformat(), last['id']])
+    return rows, next_cursor
+
+def task_list_scope(user, user_id):
+    """(select, scope_clauses, scope_params) for the tasks `user` may list"""
+    if user['role'] == 'Admin':
+        return 'SELECT t.* FROM tasks t', [], []
+    if user['role'] == 'TeamLeader':
+        # Team leaders list their department's tasks
+        return 'SELECT t.* FROM tasks t JOIN users u ON t.assigned_to = u.id', ['u.department = %s'], [user['department']]
+    return 'SELECT t.* FROM tasks t', ['t.assigned_to = %s'], [user_id]
+
 @app.route('/api/tasks', methods=['GET'])
 @token_required
 def get_tasks(current_user_id):
+    """List visible tasks, newest deadline first, with keyset pagination.
+
+    Query args: assignee, status, deadline_from, deadline_to, limit, cursor.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        filter_clauses, filter_params, limit, page_cursor = parse_task_query_args(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        # If admin or team leader, get all tasks for their department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
-        
-        if current_user['role'] == 'Admin':
-            cursor.execute('SELECT * FROM tasks')
-        elif current_user['role'] == 'TeamLeader':
-            cursor.execute('''
-                SELECT t.* FROM tasks t
-                JOIN users u ON t.assigned_to = u.id
-                WHERE u.department = %s
-            ''', (current_user['department'],))
-        else:
-            cursor.execute('SELECT * FROM tasks WHERE assigned_to = %s', (current_user_id,))
-        
-        tasks = cursor.fetchall()
-        return jsonify(tasks)
+        select, scope_clauses, scope_params = task_list_scope(g.current_user, current_user_id)
+        tasks, next_cursor = fetch_task_page(cursor, select, scope_clauses, scope_params,
+                                             filter_clauses, filter_params, limit, page_cursor)
+        response = jsonify(tasks)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
     
     except Exception as e:
         logger.error(f"Error fetching tasks: {str(e)}")
@@ -654,41 +3310,127 @@ def get_tasks(current_user_id):
         cursor.close()
         conn.close()
 
-@app.route('/api/courses', methods=['GET'])
-@token_required
-def get_courses(current_user_id):
-    try:
+# Course catalog configuration
+COURSE_CATALOG_TTL = int(os.getenv('COURSE_CATALOG_TTL', 300))
+COURSE_CATALOG_MAX_PAGE_SIZE = int(os.getenv('COURSE_CATALOG_MAX_PAGE_SIZE', 200))
+COURSE_DIFFICULTIES = ['Beginner', 'Intermediate', 'Advanced']
+
+# Courses with enrollment counts; {where} narrows it to a department
+COURSE_CATALOG_SQL = '''
+    SELECT c.*, COALESCE(e.enrolled_count, 0) as enrolled_users
+    FROM courses c
+    LEFT JOIN (
+        SELECT course_id, COUNT(*) as enrolled_count
+        FROM course_enrollments
+        GROUP BY course_id
+    ) e ON e.course_id = c.id
+    {where}
+    ORDER BY c.id
+'''
+
+
+class CourseCatalog:
+    """Courses with their enrollment counts, cached per department.
+
+    A department's catalog is loaded with one grouped query and kept for
+    COURSE_CATALOG_TTL seconds. The application never creates or removes
+    enrollments (they are managed in the database, and watch progress does not
+    change the counts), so the TTL alone bounds how stale a catalog can be.
+    """
+
+    ALL = '*'
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, department=None):
+        """Return (courses, course_ids) ordered by id; department=None means every course"""
+        key = department or self.ALL
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] > now:
+                return entry[0], entry[1]
+
+        courses = self._load(department)
+        ids = [course['id'] for course in courses]
+
+        with self._lock:
+            self._entries[key] = (courses, ids, now + self.ttl)
+        return courses, ids
+
+    def _load(self, department):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
-        
-        if current_user['role'] == 'Admin':
-            cursor.execute('SELECT * FROM courses')
-        else:
-            cursor.execute('SELECT * FROM courses WHERE department = %s', (current_user['department'],))
-        
-        courses = cursor.fetchall()
-        
-        # Get enrollment info for each course
+        try:
+            if department:
+                cursor.execute(COURSE_CATALOG_SQL.format(where='WHERE c.department = %s'), (department,))
+            else:
+                cursor.execute(COURSE_CATALOG_SQL.format(where=''))
+            courses = cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
         for course in courses:
-            cursor.execute('''
-                SELECT COUNT(*) as enrolled_count 
-                FROM course_enrollments 
-                WHERE course_id = %s
-            ''', (course['id'],))
-            enrollment = cursor.fetchone()
-            course['enrolled_users'] = enrollment['enrolled_count']
-        
-        return jsonify(courses)
-    
+            course['enrolled_users'] = int(course['enrolled_users'])
+        return courses
+
+
+course_catalog = CourseCatalog(ttl=COURSE_CATALOG_TTL)
+
+@app.route('/api/courses', methods=['GET'])
+@token_required
+@conditional_get()
+def get_courses(current_user_id):
+    """List courses with enrollment counts.
+
+    Optional filters: department (admins only), difficulty. Pass limit to page
+    by course id; the next page's cursor is returned in X-Next-Cursor.
+    """
+    current_user = g.current_user
+
+    department = request.args.get('department')
+    if current_user['role'] != 'Admin':
+        if department and department != current_user['department']:
+            return jsonify({'message': 'Unauthorized'}), 403
+        department = current_user['department']
+
+    difficulty = request.args.get('difficulty')
+    if difficulty and difficulty not in COURSE_DIFFICULTIES:
+        return jsonify({'message': f"Invalid difficulty, expected one of: {', '.join(COURSE_DIFFICULTIES)}"}), 400
+
+    try:
+        limit = request.args.get('limit')
+        limit = min(int(limit), COURSE_CATALOG_MAX_PAGE_SIZE) if limit else None
+        if limit is not None and limit < 1:
+            raise ValueError('limit must be positive')
+        page_cursor = request.args.get('cursor')
+        after_id = int(decode_cursor(page_cursor)[0]) if page_cursor else None
+    except (ValueError, TypeError, IndexError):
+        return jsonify({'message': 'Invalid pagination parameters'}), 400
+
+    try:
+        courses, ids = course_catalog.get(department)
     except Exception as e:
         logger.error(f"Error fetching courses: {str(e)}")
         return jsonify({'message': 'Error fetching courses'}), 500
-    finally:
-        cursor.close()
-        conn.close()
+
+    if after_id is not None:
+        courses = courses[bisect_right(ids, after_id):]
+    if difficulty:
+        courses = [course for course in courses if course['difficulty'] == difficulty]
+
+    next_cursor = None
+    if limit is not None and len(courses) > limit:
+        courses = courses[:limit]
+        next_cursor = encode_cursor([courses[-1]['id']])
+
+    response = jsonify(courses)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/api/login-sessions', methods=['GET'])
 @token_required
@@ -697,8 +3439,7 @@ def get_login_sessions(current_user_id):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         if current_user['role'] == 'Admin':
             cursor.execute('''
@@ -728,123 +3469,105 @@ def get_login_sessions(current_user_id):
         cursor.close()
         conn.close()
 
-
-
-
-@app.route('/api/admin/dashboard-stats', methods=['GET'])
+@app.route('/api/admin/db-pool-stats', methods=['GET'])
 @token_required
-def get_dashboard_stats(current_user_id):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Check if user is admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
-        if current_user['role'] != 'Admin':
-            return jsonify({'message': 'Unauthorized'}), 403
-
-        # Get user stats
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_users,
-                SUM(CASE WHEN is_active = 1 THEN 1 ELSE 0 END) as active_users,
-                SUM(CASE WHEN role = 'Admin' THEN 1 ELSE 0 END) as admins,
-                SUM(CASE WHEN role = 'TeamLeader' THEN 1 ELSE 0 END) as team_leaders,
-                SUM(CASE WHEN role = 'Employee' THEN 1 ELSE 0 END) as employees
-            FROM users
-        ''')
-        user_stats = cursor.fetchone()
+def get_db_pool_stats(current_user_id):
+    """Get connection pool metrics"""
+    current_user = g.current_user
+    if not current_user or current_user['role'] != 'Admin':
+        return jsonify({'message': 'Unauthorized'}), 403
 
-        # Convert Decimal values to integers
-        user_stats = {k: int(v) if isinstance(v, (int, float, str)) else 0 for k, v in user_stats.items()}
+    return jsonify(db_pool.metrics())
 
-        # Get task stats
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_tasks,
-                SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END) as completed_tasks,
-                SUM(CASE WHEN status = 'In Progress' THEN 1 ELSE 0 END) as in_progress_tasks,
-                SUM(CASE WHEN status = 'Todo' THEN 1 ELSE 0 END) as todo_tasks
-            FROM tasks
-        ''')
-        task_stats = cursor.fetchone()
-
-        # Convert Decimal values to integers
-        task_stats = {
-            'total_tasks': int(task_stats['total_tasks']),
-            'completed_tasks': int(task_stats['completed_tasks']),
-            'in_progress_tasks': int(task_stats['in_progress_tasks']),
-            'todo_tasks': int(task_stats['todo_tasks'])
-        }
+@app.route('/api/admin/metrics', methods=['GET'])
+@token_required
+def get_request_metrics(current_user_id):
+    """Get per-route and per-statement timings collected by the request profiler"""
+    current_user = g.current_user
+    if not current_user or current_user['role'] != 'Admin':
+        return jsonify({'message': 'Unauthorized'}), 403
 
-        # Get department stats
-        cursor.execute('''
-            SELECT department, COUNT(*) as count
-            FROM users
-            WHERE department IS NOT NULL
-            GROUP BY department
-        ''')
-        department_stats = cursor.fetchall()
+    metrics = sql_profiler.snapshot()
+    metrics['db_pool'] = db_pool.metrics()
+    metrics['watch_history_buffer'] = watch_history_buffer.metrics()
+    metrics['interaction_collector'] = interaction_collector.metrics()
+    metrics['notification_broker'] = notification_broker.metrics()
+    metrics['response_cache'] = response_cache.metrics()
+    metrics['blob_store'] = blob_store.metrics()
+    metrics['password_hasher'] = password_hasher.metrics()
+    metrics['token_cache'] = token_cache.metrics()
+    metrics['session_manager'] = session_manager.metrics()
+    metrics['query_batcher'] = query_batcher.metrics()
+    return jsonify(metrics)
+
+@app.route('/api/admin/metrics', methods=['DELETE'])
+@token_required
+def reset_request_metrics(current_user_id):
+    """Reset the request profiler aggregates"""
+    current_user = g.current_user
+    if not current_user or current_user['role'] != 'Admin':
+        return jsonify({'message': 'Unauthorized'}), 403
 
-        # Convert Decimal values to integers in department stats
-        department_stats = [
-            {'name': stat['department'], 'value': int(stat['count']) if isinstance(stat['count'], (int, float, str)) else 0}
-            for stat in department_stats
-        ]
+    sql_profiler.reset()
+    return jsonify({'message': 'Metrics reset'})
 
-        # Get active sessions
-        cursor.execute('SELECT COUNT(*) as count FROM login_sessions WHERE is_active = 1')
-        active_sessions = cursor.fetchone()
-        active_sessions_count = int(active_sessions['count']) if isinstance(active_sessions['count'], (int, float, str)) else 0
+@app.route('/api/admin/metrics/prometheus', methods=['GET'])
+@token_required
+def get_prometheus_metrics(current_user_id):
+    """Expose request profiler aggregates in Prometheus text format"""
+    current_user = g.current_user
+    if not current_user or current_user['role'] != 'Admin':
+        return jsonify({'message': 'Unauthorized'}), 403
 
-        # Get course count
-        cursor.execute('SELECT COUNT(*) as count FROM courses')
-        course_count = cursor.fetchone()
-        course_count_value = int(course_count['count']) if isinstance(course_count['count'], (int, float, str)) else 0
+    return Response(sql_profiler.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
-        # Get total course enrollments from employee_course_demonstrations
-        cursor.execute('SELECT COUNT(*) as count FROM employee_course_demonstrations')
-        total_course_enrollments = int(cursor.fetchone()['count'])
+@app.route('/api/admin/dashboard-stats', methods=['GET'])
+@token_required
+@conditional_get()
+def get_dashboard_stats(current_user_id):
+    # Check if user is admin
+    current_user = g.current_user
+    if not current_user or current_user['role'] != 'Admin':
+        return jsonify({'message': 'Unauthorized'}), 403
 
-        # Get recent sessions with user info
-        cursor.execute('''
-            SELECT ls.id, ls.login_time, ls.is_active, u.name as user_name
-            FROM login_sessions ls
-            JOIN users u ON ls.user_id = u.id
-            ORDER BY ls.login_time DESC
-            LIMIT 5
-        ''')
-        recent_sessions = cursor.fetchall()
+    try:
+        # Counters are maintained incrementally by the write paths
+        summary = dashboard_summary.snapshot()
+        users = summary['users']
+        tasks = summary['tasks']
 
         stats = {
-            'totalUsers': user_stats['total_users'],
-            'activeUsers': user_stats['active_users'],
-            'totalTasks': task_stats['total_tasks'],
-            'completedTasks': task_stats['completed_tasks'],
-            'totalCourses': course_count_value,
-            'activeSessions': active_sessions_count,
-            'departmentStats': department_stats,
+            'totalUsers': users['total'],
+            'activeUsers': users['active'],
+            'totalTasks': sum(tasks.values()),
+            'completedTasks': tasks['Completed'],
+            'totalCourses': summary['courses'],
+            'activeSessions': summary['active_sessions'],
+            'departmentStats': [
+                {'name': name, 'value': dept['users']}
+                for name, dept in summary['departments'].items()
+                if dept['users'] > 0
+            ],
             'taskStats': [
-                {'name': 'Completed', 'value': task_stats['completed_tasks']},
-                {'name': 'In Progress', 'value': task_stats['in_progress_tasks']},
-                {'name': 'Todo', 'value': task_stats['todo_tasks']},
+                {'name': 'Completed', 'value': tasks['Completed']},
+                {'name': 'In Progress', 'value': tasks['In Progress']},
+                {'name': 'Todo', 'value': tasks['Todo']},
             ],
             'roleStats': [
-                {'name': 'Admins', 'value': user_stats['admins']},
-                {'name': 'Team Leaders', 'value': user_stats['team_leaders']},
-                {'name': 'Employees', 'value': user_stats['employees']},
+                {'name': 'Admins', 'value': users['roles']['Admin']},
+                {'name': 'Team Leaders', 'value': users['roles']['TeamLeader']},
+                {'name': 'Employees', 'value': users['roles']['Employee']},
             ],
             'recentSessions': [
                 {
                     'id': str(session['id']),
                     'userName': session['user_name'],
                     'loginTime': session['login_time'].isoformat(),
-                    'isActive': bool(session['is_active'])
+                    'isActive': session['is_active']
                 }
-                for session in recent_sessions
+                for session in summary['recent_sessions']
             ],
-            'totalCourseEnrollments': total_course_enrollments
+            'totalCourseEnrollments': summary['demonstrations']
         }
 
         return jsonify(stats)
@@ -852,26 +3575,348 @@ def get_dashboard_stats(current_user_id):
     except Exception as e:
         logger.error(f"Error fetching dashboard stats: {str(e)}")
         return jsonify({'message': 'Error fetching dashboard stats'}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
-@app.route('/api/notifications', methods=['GET'])
+# Notification push configuration
+SSE_HEARTBEAT_INTERVAL = float(os.getenv('SSE_HEARTBEAT_INTERVAL', 15))
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', 256))
+SSE_MAX_SUBSCRIBERS = int(os.getenv('SSE_MAX_SUBSCRIBERS', 500))
+SSE_HISTORY_SIZE = int(os.getenv('SSE_HISTORY_SIZE', 1000))
+
+
+class Subscription:
+    """Bounded event queue for one connected stream"""
+
+    RESYNC = {'id': None, 'event': 'resync', 'data': {}}
+
+    def __init__(self, user_id, max_events=256):
+        self.user_id = user_id
+        self.max_events = max_events
+        self._events = deque()
+        self._overflowed = False
+        self._cond = threading.Condition()
+
+    def push(self, event):
+        with self._cond:
+            if len(self._events) >= self.max_events:
+                # A client this far behind has to reload anyway; don't let it hold memory
+                self._events.clear()
+                self._overflowed = True
+            else:
+                self._events.append(event)
+            self._cond.notify()
+
+    def request_resync(self):
+        with self._cond:
+            self._overflowed = True
+            self._cond.notify()
+
+    def get(self, timeout):
+        """Next event, RESYNC if events were dropped, or None after timeout"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._events or self._overflowed, timeout)
+            if self._overflowed:
+                self._overflowed = False
+                return self.RESYNC
+            return self._events.popleft() if self._events else None
+
+
+class NotificationBroker:
+    """In-process pub/sub that pushes notification deltas to SSE subscribers.
+
+    Events go to every subscriber, or only to the given user ids. Recent events
+    are kept so a reconnecting client can resume from Last-Event-ID. Only
+    clients connected to this worker process are reached.
+    """
+
+    def __init__(self, history=1000, max_events=256, max_subscribers=500):
+        self.max_events = max_events
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._stats = {'published': 0, 'delivered': 0, 'rejected_subscribers': 0}
+
+    def publish(self, event_type, data, user_ids=None):
+        recipients = frozenset(user_ids) if user_ids is not None else None
+        with self._lock:
+            event = {'id': self._next_id, 'event': event_type, 'data': data, 'users': recipients}
+            self._next_id += 1
+            self._history.append(event)
+            targets = [sub for sub in self._subscribers if recipients is None or sub.user_id in recipients]
+            self._stats['published'] += 1
+            self._stats['delivered'] += len(targets)
+        for sub in targets:
+            sub.push(event)
+        return event['id']
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Register a stream, replaying anything after last_event_id; None when at capacity"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                self._stats['rejected_subscribers'] += 1
+                return None
+            sub = Subscription(user_id, self.max_events)
+            self._subscribers.add(sub)
+            if last_event_id is not None:
+                if self._history and last_event_id < self._history[0]['id'] - 1:
+                    # Some of what the client missed has already been evicted
+                    sub.request_resync()
+                for event in self._history:
+                    if event['id'] > last_event_id and (event['users'] is None or user_id in event['users']):
+                        sub.push(event)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+            metrics['subscribers'] = len(self._subscribers)
+            metrics['last_event_id'] = self._next_id - 1
+        return metrics
+
+
+notification_broker = NotificationBroker(
+    history=SSE_HISTORY_SIZE,
+    max_events=SSE_QUEUE_SIZE,
+    max_subscribers=SSE_MAX_SUBSCRIBERS
+)
+
+def format_sse(event):
+    lines = []
+    if event['id'] is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {dumps_json(event['data'])}")
+    return '\n'.join(lines) + '\n\n'
+
+@app.route('/api/notifications/stream-ticket', methods=['POST'])
 @token_required
-def get_notifications(current_user_id):
+def create_stream_ticket(current_user_id):
+    """Issue a single-use ticket for opening the notification stream"""
+    claims = g.token_claims
+    now = datetime.datetime.utcnow()
+    ticket = jwt.encode({
+        'user_id': current_user_id,
+        'sid': claims.get('sid'),
+        'purpose': 'stream',
+        'jti': uuid.uuid4().hex,
+        # The stream must still end when the session it was opened from does
+        'session_exp': claims.get('exp'),
+        'exp': now + datetime.timedelta(seconds=STREAM_TICKET_TTL)
+    }, app.config['JWT_SECRET_KEY'], algorithm='HS256')
+    return jsonify({'ticket': ticket, 'expires_in': STREAM_TICKET_TTL})
+
+@app.route('/api/notifications/stream', methods=['GET'])
+@token_required
+@accepts_stream_ticket
+def stream_notifications(current_user_id):
+    """Push notification and task-assignment events as Server-Sent Events"""
+    claims = g.token_claims
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
     try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    sub = notification_broker.subscribe(current_user_id, last_event_id)
+    if sub is None:
+        response = jsonify({'message': 'Too many open streams, please retry'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    def events():
+        try:
+            yield "retry: 5000\n: connected\n\n"
+            while True:
+                event = sub.get(SSE_HEARTBEAT_INTERVAL)
+                try:
+                    active = session_active(claims)
+                except Exception as e:
+                    logger.error(f"Error checking stream session: {str(e)}")
+                    active = False
+                if not active:
+                    # Logging out or expiring ends the stream too; the client needs a new ticket
+                    yield "event: session-ended\ndata: {}\n\n"
+                    return
+                # Comments keep proxies from timing out and surface dead connections
+                yield format_sse(event) if event is not None else ': keepalive\n\n'
+        finally:
+            notification_broker.unsubscribe(sub)
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# Notification inbox configuration
+NOTIFICATIONS_PAGE_SIZE = int(os.getenv('NOTIFICATIONS_PAGE_SIZE', 50))
+NOTIFICATIONS_MAX_PAGE_SIZE = int(os.getenv('NOTIFICATIONS_MAX_PAGE_SIZE', 200))
+UNREAD_COUNT_TTL = int(os.getenv('UNREAD_COUNT_TTL', 60))
+UNREAD_COUNT_MAX_ENTRIES = int(os.getenv('UNREAD_COUNT_MAX_ENTRIES', 10000))
+
+UNREAD_COUNT_SQL = 'SELECT COUNT(*) as count FROM notification_recipients WHERE user_id = %s AND is_read = 0'
+
+
+class UnreadCounter:
+    """Cached per-user unread notification counts, adjusted in place by the inbox write paths"""
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counts.get(user_id)
+            if entry and entry[1] > now:
+                return entry[0]
+            generation = self._generation
+
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute('''
+        try:
+            cursor.execute(UNREAD_COUNT_SQL, (user_id,))
+            count = int(cursor.fetchone()['count'])
+        finally:
+            cursor.close()
+            conn.close()
+
+        with self._lock:
+            # Skip the store if a write raced with the load
+            if generation == self._generation:
+                if len(self._counts) >= self.max_entries:
+                    self._counts = {k: v for k, v in self._counts.items() if v[1] > now}
+                self._counts[user_id] = (count, now + self.ttl)
+        return count
+
+    def adjust(self, user_ids, delta):
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                entry = self._counts.get(user_id)
+                if entry:
+                    self._counts[user_id] = (max(0, entry[0] + delta), entry[1])
+
+    def set(self, user_id, count):
+        with self._lock:
+            self._generation += 1
+            self._counts[user_id] = (count, time.monotonic() + self.ttl)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._generation += 1
+            self._counts.pop(user_id, None)
+
+
+unread_counter = UnreadCounter(ttl=UNREAD_COUNT_TTL, max_entries=UNREAD_COUNT_MAX_ENTRIES)
+
+def fan_out_notification(cursor, notification_id, created_at, department=None, user_ids=None):
+    """Write one inbox row per recipient and return the recipient ids"""
+    clauses = ['is_active = 1']
+    params = []
+    if department:
+        clauses.append('department = %s')
+        params.append(department)
+    if user_ids is not None:
+        if not user_ids:
+            return []
+        clauses.append(f"id IN ({', '.join(['%s'] * len(user_ids))})")
+        params.extend(user_ids)
+    cursor.execute(f"SELECT id FROM users WHERE {' AND '.join(clauses)}", tuple(params))
+    recipients = [row['id'] for row in cursor.fetchall()]
+    if recipients:
+        # executemany folds this into a single multi-row INSERT
+        cursor.executemany(
+            'INSERT IGNORE INTO notification_recipients (user_id, notification_id, created_at) VALUES (%s, %s, %s)',
+            [(user_id, notification_id, created_at) for user_id in recipients]
+        )
+    return recipients
+
+def build_notification_page_query(user_id, scope_all, unread_only, limit, page_cursor):
+    """Keyset-paginated inbox query (every notification for scope_all), one row past the page.
+
+    Returns (query, params).
+    """
+    if scope_all:
+        query = '''
             SELECT n.id, n.title, n.message, n.created_at as createdAt, n.is_read, n.user_id, n.type, n.link
             FROM notifications n
-            ORDER BY n.created_at DESC
-        ''')
+        '''
+        created_col, id_col = 'n.created_at', 'n.id'
+        clauses, params = [], []
+    else:
+        query = '''
+            SELECT n.id, n.title, n.message, r.created_at as createdAt, r.is_read, n.user_id, n.type, n.link
+            FROM notification_recipients r
+            JOIN notifications n ON n.id = r.notification_id
+        '''
+        created_col, id_col = 'r.created_at', 'r.notification_id'
+        clauses, params = ['r.user_id = %s'], [user_id]
+        if unread_only:
+            clauses.append('r.is_read = 0')
+
+    if page_cursor:
+        clauses.append(f'({created_col} < %s OR ({created_col} = %s AND {id_col} < %s))')
+        params.extend([page_cursor[0], page_cursor[0], page_cursor[1]])
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    query += f' ORDER BY {created_col} DESC, {id_col} DESC LIMIT %s'
+    params.append(limit + 1)
+    return query, tuple(params)
+
+@app.route('/api/notifications', methods=['GET'])
+@token_required
+def get_notifications(current_user_id):
+    """List the caller's notifications, newest first, with keyset pagination on (created_at, id).
+
+    Query args: unread=true, limit, cursor, and scope=all for admins to list every
+    notification. The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    current_user = g.current_user
+    scope_all = request.args.get('scope') == 'all'
+    if scope_all and current_user['role'] != 'Admin':
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    try:
+        limit = request.args.get('limit')
+        limit = min(int(limit), NOTIFICATIONS_MAX_PAGE_SIZE) if limit else NOTIFICATIONS_PAGE_SIZE
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        page_cursor = request.args.get('cursor')
+        page_cursor = decode_cursor(page_cursor) if page_cursor else None
+        if page_cursor:
+            page_cursor = [datetime.datetime.fromisoformat(page_cursor[0]), int(page_cursor[1])]
+    except (ValueError, TypeError, IndexError):
+        return jsonify({'message': 'Invalid pagination parameters'}), 400
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute(*build_notification_page_query(current_user_id, scope_all, request.args.get('unread') == 'true',
+                                                      limit, page_cursor))
         notifications = cursor.fetchall()
+
+        next_cursor = None
+        if len(notifications) > limit:
+            notifications = notifications[:limit]
+            last = notifications[-1]
+            next_cursor = encode_cursor([last['createdAt'].isoformat(), last['id']])
+
         for n in notifications:
             if isinstance(n['createdAt'], datetime.datetime):
                 n['createdAt'] = n['createdAt'].isoformat()
-        return jsonify(notifications)
+        response = jsonify(notifications)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
     except Exception as e:
         logger.error(f"Error fetching notifications: {str(e)}")
         return jsonify({'message': 'Error fetching notifications'}), 500
@@ -879,6 +3924,76 @@ def get_notifications(current_user_id):
         cursor.close()
         conn.close()
 
+@app.route('/api/notifications/unread-count', methods=['GET'])
+@token_required
+def get_unread_notification_count(current_user_id):
+    """Get the caller's unread notification count"""
+    try:
+        return jsonify({'unread': unread_counter.get(current_user_id)})
+    except Exception as e:
+        logger.error(f"Error fetching unread count: {str(e)}")
+        return jsonify({'message': 'Error fetching unread count'}), 500
+
+@app.route('/api/notifications/mark-read', methods=['POST'])
+@token_required
+def mark_notifications_read(current_user_id):
+    """Mark the given notification ids ({"ids": [...]}) as read for the caller"""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or len(ids) > NOTIFICATIONS_MAX_PAGE_SIZE:
+        return jsonify({'message': f'ids must be a list of 1 to {NOTIFICATIONS_MAX_PAGE_SIZE} notification ids'}), 400
+    try:
+        ids = sorted({int(notification_id) for notification_id in ids})
+    except (TypeError, ValueError):
+        return jsonify({'message': 'ids must be integers'}), 400
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f'''
+            UPDATE notification_recipients
+            SET is_read = 1, read_at = CURRENT_TIMESTAMP
+            WHERE user_id = %s AND is_read = 0 AND notification_id IN ({', '.join(['%s'] * len(ids))})
+        ''', (current_user_id, *ids))
+        updated = cursor.rowcount
+        conn.commit()
+
+        unread_counter.adjust([current_user_id], -updated)
+        unread = unread_counter.get(current_user_id)
+        notification_broker.publish('unread_count', {'unread': unread}, user_ids=[current_user_id])
+        return jsonify({'updated': updated, 'unread': unread})
+    except Exception as e:
+        logger.error(f"Error marking notifications read: {str(e)}")
+        return jsonify({'message': 'Error marking notifications read'}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+@app.route('/api/notifications/mark-all-read', methods=['POST'])
+@token_required
+def mark_all_notifications_read(current_user_id):
+    """Mark every notification in the caller's inbox as read"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute('''
+            UPDATE notification_recipients
+            SET is_read = 1, read_at = CURRENT_TIMESTAMP
+            WHERE user_id = %s AND is_read = 0
+        ''', (current_user_id,))
+        updated = cursor.rowcount
+        conn.commit()
+
+        unread_counter.set(current_user_id, 0)
+        notification_broker.publish('unread_count', {'unread': 0}, user_ids=[current_user_id])
+        return jsonify({'updated': updated, 'unread': 0})
+    except Exception as e:
+        logger.error(f"Error marking notifications read: {str(e)}")
+        return jsonify({'message': 'Error marking notifications read'}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 @app.route('/api/notifications', methods=['POST'])
 @token_required
 def create_notification(current_user_id):
@@ -887,8 +4002,7 @@ def create_notification(current_user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Check if user is admin or team leader
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         if current_user['role'] not in ['Admin', 'TeamLeader']:
             return jsonify({'message': 'Unauthorized to create notifications'}), 403
@@ -898,22 +4012,42 @@ def create_notification(current_user_id):
         
         if not all(field in data for field in required_fields):
             return jsonify({'message': 'Missing required fields'}), 400
+
+        # Optional targeting; by default every active user receives it, or the
+        # whole department when a team leader sends it
+        department = data.get('department')
+        if current_user['role'] == 'TeamLeader':
+            if department and department != current_user['department']:
+                return jsonify({'message': 'You can only notify your own department'}), 403
+            department = current_user['department']
+        user_ids = data.get('userIds')
+        if user_ids is not None:
+            if not isinstance(user_ids, list) or not user_ids:
+                return jsonify({'message': 'userIds must be a non-empty list of user ids'}), 400
+            try:
+                user_ids = [int(user_id) for user_id in user_ids]
+            except (TypeError, ValueError):
+                return jsonify({'message': 'userIds must be a non-empty list of user ids'}), 400
             
         # Insert notification
+        created_at = datetime.datetime.now().replace(microsecond=0)
         cursor.execute('''
-            INSERT INTO notifications (title, message, user_id, type, link)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO notifications (title, message, user_id, type, link, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
         ''', (
             data['title'],
             data['message'],
             current_user_id,
             data['type'],
-            data.get('link')
+            data.get('link'),
+            created_at
         ))
+        notification_id = cursor.lastrowid
+        recipients = fan_out_notification(cursor, notification_id, created_at, department, user_ids)
         conn.commit()
+        unread_counter.adjust(recipients, 1)
         
         # Get the created notification
-        notification_id = cursor.lastrowid
         cursor.execute('''
             SELECT n.*, u.name as user_name, u.department 
             FROM notifications n
@@ -923,6 +4057,7 @@ def create_notification(current_user_id):
         
         new_notification = cursor.fetchone()
         new_notification['created_at'] = new_notification['created_at'].isoformat()
+        notification_broker.publish('notification', new_notification, user_ids=recipients)
         
         return jsonify(new_notification), 201
         
@@ -955,13 +4090,24 @@ def delete_notification(current_user_id, notification_id):
         if result['role'] != 'Admin' and result['user_id'] != current_user_id:
             return jsonify({'message': 'Unauthorized to delete this notification'}), 403
         
+        cursor.execute(
+            'SELECT user_id, is_read FROM notification_recipients WHERE notification_id = %s',
+            (notification_id,)
+        )
+        recipients = cursor.fetchall()
+
         # Delete the notification
+        cursor.execute('DELETE FROM notification_recipients WHERE notification_id = %s', (notification_id,))
         cursor.execute('DELETE FROM notifications WHERE id = %s', (notification_id,))
+        deleted = cursor.rowcount
         conn.commit()
         
-        if cursor.rowcount == 0:
+        if deleted == 0:
             return jsonify({'message': 'Notification not found'}), 404
-            
+
+        unread_counter.adjust([r['user_id'] for r in recipients if not r['is_read']], -1)
+        notification_broker.publish('notification_deleted', {'id': notification_id},
+                                    user_ids=[r['user_id'] for r in recipients])
         return jsonify({'message': 'Notification deleted successfully'})
         
     except Exception as e:
@@ -981,8 +4127,7 @@ def update_team_leader_profile(current_user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Verify user is a team leader
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
         
         if not user or user['role'] != 'TeamLeader':
             return jsonify({'error': 'Unauthorized'}), 403
@@ -1007,6 +4152,7 @@ def update_team_leader_profile(current_user_id):
             current_user_id
         ))
         conn.commit()
+        response_cache.invalidate(['users'], [user['department']])
 
         # Get updated user data
         cursor.execute("""
@@ -1055,8 +4201,10 @@ def update_team_leader_password(current_user_id):
         if not new_password:
             return jsonify({'error': 'Missing new password'}), 400
 
-        # Generate new password hash using werkzeug's generate_password_hash
-        new_password_hash = generate_password_hash(new_password)
+        # Generate new password hash on the hashing pool
+        new_password_hash = password_hasher.hash(new_password)
+        if new_password_hash is None:
+            return hashing_busy_response()
         
         # Update password in database
         cursor.execute('UPDATE users SET password_hash = %s WHERE id = %s', 
@@ -1086,8 +4234,7 @@ def delete_team_leader_account(current_user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Verify user is a team leader
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
         
         if not user or user['role'] != 'TeamLeader':
             return jsonify({'error': 'Unauthorized'}), 403
@@ -1111,6 +4258,9 @@ def delete_team_leader_account(current_user_id):
         # Delete the user
         cursor.execute('DELETE FROM users WHERE id = %s', (current_user_id,))
         conn.commit()
+        principal_cache.invalidate(current_user_id)
+        response_cache.invalidate(['users', 'tasks', 'demonstrations', 'job_applications'], [user['department']])
+        dashboard_summary.user_removed(user['role'], user['department'], user['is_active'])
 
         return jsonify({
             'success': True,
@@ -1124,52 +4274,101 @@ def delete_team_leader_account(current_user_id):
         cursor.close()
         conn.close()
 
+# None of these depend on each other, so the dashboard sends them out as one
+# concurrent batch; each takes the department as its only parameter
+TEAM_LEADER_DASHBOARD_QUERIES = {
+    # Team members (employees in the department)
+    'team_members': '''
+        SELECT id, name, email, phone_number, skill_level, experience,
+               experience_level, description, profile_image_url, is_active
+        FROM users
+        WHERE department = %s AND role = 'Employee'
+    ''',
+    # Department tasks with correct column names
+    'department_tasks': '''
+        SELECT tasks.*, users.name as assigned_to_name, users.email as assigned_to_email
+        FROM tasks
+        INNER JOIN users ON tasks.assigned_to = users.id
+        WHERE users.department = %s
+        ORDER BY tasks.deadline DESC
+    ''',
+    # Task statistics with proper NULL handling
+    'task_stats': '''
+        SELECT
+            COALESCE(COUNT(*), 0) as total_tasks,
+            COALESCE(SUM(CASE WHEN tasks.status = 'Completed' THEN 1 ELSE 0 END), 0) as completed_tasks,
+            COALESCE(SUM(CASE WHEN tasks.status = 'In Progress' THEN 1 ELSE 0 END), 0) as in_progress_tasks,
+            COALESCE(SUM(CASE WHEN tasks.status = 'Todo' THEN 1 ELSE 0 END), 0) as todo_tasks
+        FROM tasks
+        INNER JOIN users ON tasks.assigned_to = users.id
+        WHERE users.department = %s
+    ''',
+    # Department courses
+    'department_courses': '''
+        SELECT c.*,
+               COUNT(ce.user_id) as enrolled_count
+        FROM courses c
+        LEFT JOIN course_enrollments ce ON c.id = ce.course_id
+        WHERE c.department = %s
+        GROUP BY c.id
+    ''',
+    # Department-wide demonstration count (the same for every course)
+    'demo_count': '''
+        SELECT COUNT(*) as demo_count
+        FROM employee_course_demonstrations d
+        JOIN users u ON d.user_id = u.id
+        WHERE u.department = %s
+    ''',
+    # Total number of completed courses by employees in the department
+    'completed_courses': '''
+        SELECT COUNT(*) as completed_courses_count
+        FROM course_enrollments ce
+        JOIN users u ON ce.user_id = u.id
+        WHERE ce.completed = 1 AND u.department = %s AND u.role = 'Employee'
+    ''',
+    # Task completion stats for every team member in one grouped query
+    'member_task_stats': '''
+        SELECT
+            t.assigned_to as user_id,
+            COUNT(*) as total_tasks,
+            SUM(CASE WHEN t.status = 'Completed' THEN 1 ELSE 0 END) as completed_tasks
+        FROM tasks t
+        JOIN users u ON t.assigned_to = u.id
+        WHERE u.department = %s AND u.role = 'Employee'
+        GROUP BY t.assigned_to
+    ''',
+    # Course demonstration stats for every team member in one grouped query
+    'member_demo_stats': '''
+        SELECT
+            d.user_id,
+            COUNT(*) as total_demos,
+            COUNT(DISTINCT d.course_name) as unique_courses
+        FROM employee_course_demonstrations d
+        JOIN users u ON d.user_id = u.id
+        WHERE u.department = %s AND u.role = 'Employee'
+        GROUP BY d.user_id
+    '''
+}
+
 @app.route('/api/team-leader/dashboard', methods=['GET'])
 @token_required
+@conditional_get('users', 'tasks', 'courses', 'course_enrollments', 'demonstrations')
+@cached_response('users', 'tasks', 'courses', 'course_enrollments', 'demonstrations')
 def get_team_leader_dashboard(current_user_id):
     """Get dashboard data for team leader"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         # Verify user is a team leader and get their department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
         
         if not user or user['role'] != 'TeamLeader':
             return jsonify({'error': 'Unauthorized'}), 403
 
-        # Get team members (employees in the department)
-        cursor.execute('''
-            SELECT id, name, email, phone_number, skill_level, experience, 
-                   experience_level, description, profile_image_url, is_active
-            FROM users 
-            WHERE department = %s AND role = 'Employee'
-        ''', (user['department'],))
-        team_members = cursor.fetchall()
-
-        # Get department tasks with correct column names
-        cursor.execute('''
-            SELECT tasks.*, users.name as assigned_to_name, users.email as assigned_to_email
-            FROM tasks
-            INNER JOIN users ON tasks.assigned_to = users.id
-            WHERE users.department = %s
-            ORDER BY tasks.deadline DESC
-        ''', (user['department'],))
-        department_tasks = cursor.fetchall()
+        department = (user['department'],)
+        results = query_batcher.run({name: (sql, department) for name, sql in TEAM_LEADER_DASHBOARD_QUERIES.items()})
 
-        # Get task statistics with proper NULL handling
-        cursor.execute('''
-            SELECT 
-                COALESCE(COUNT(*), 0) as total_tasks,
-                COALESCE(SUM(CASE WHEN tasks.status = 'Completed' THEN 1 ELSE 0 END), 0) as completed_tasks,
-                COALESCE(SUM(CASE WHEN tasks.status = 'In Progress' THEN 1 ELSE 0 END), 0) as in_progress_tasks,
-                COALESCE(SUM(CASE WHEN tasks.status = 'Todo' THEN 1 ELSE 0 END), 0) as todo_tasks
-            FROM tasks
-            INNER JOIN users ON tasks.assigned_to = users.id
-            WHERE users.department = %s
-        ''', (user['department'],))
-        task_stats = cursor.fetchone()
+        team_members = results['team_members']
+        department_tasks = results['department_tasks']
+        task_stats = results['task_stats'][0] if results['task_stats'] else None
 
         # Ensure task_stats has default values if NULL
         if not task_stats:
@@ -1188,63 +4387,26 @@ def get_team_leader_dashboard(current_user_id):
                 'todo_tasks': int(task_stats['todo_tasks'])
             }
 
-        # Get department courses
-        cursor.execute('''
-            SELECT c.*, 
-                   COUNT(ce.user_id) as enrolled_count
-            FROM courses c
-            LEFT JOIN course_enrollments ce ON c.id = ce.course_id
-            WHERE c.department = %s
-            GROUP BY c.id
-        ''', (user['department'],))
-        department_courses = cursor.fetchall()
-
-        # For each course, get demonstration count from employee_course_demonstrations
+        department_courses = results['department_courses']
+        total_demonstrations = results['demo_count'][0]['demo_count']
         for course in department_courses:
-            cursor.execute('''
-                SELECT COUNT(*) as demo_count
-                FROM employee_course_demonstrations d
-                JOIN users u ON d.user_id = u.id
-                WHERE u.department = %s
-            ''', (user['department'],))
-            demo_count = cursor.fetchone()['demo_count']
-            course['demonstrations_count'] = demo_count
-
-        # Get total number of completed courses by employees in the department
-        cursor.execute('''
-            SELECT COUNT(*) as completed_courses_count
-            FROM course_enrollments ce
-            JOIN users u ON ce.user_id = u.id
-            WHERE ce.completed = 1 AND u.department = %s AND u.role = 'Employee'
-        ''', (user['department'],))
-        completed_courses_count = cursor.fetchone()['completed_courses_count']
+            course['demonstrations_count'] = total_demonstrations
+
+        completed_courses_count = results['completed_courses'][0]['completed_courses_count']
+        member_task_stats = {row['user_id']: row for row in results['member_task_stats']}
+        member_demo_stats = {row['user_id']: row for row in results['member_demo_stats']}
 
         # Get performance metrics for each team member
         performance_metrics = []
+        total_courses = len(department_courses)
         for member in team_members:
-            # Get task completion stats with proper NULL handling
-            cursor.execute('''
-                SELECT 
-                    COALESCE(COUNT(*), 0) as total_tasks,
-                    COALESCE(SUM(CASE WHEN status = 'Completed' THEN 1 ELSE 0 END), 0) as completed_tasks
-                FROM tasks
-                WHERE assigned_to = %s
-            ''', (member['id'],))
-            member_task_stats = cursor.fetchone()
-
-            # Get course demonstration stats from employee_course_demonstrations
-            cursor.execute('''
-                SELECT COUNT(*) as total_demos, COUNT(DISTINCT course_name) as unique_courses
-                FROM employee_course_demonstrations
-                WHERE user_id = %s
-            ''', (member['id'],))
-            demo_stats = cursor.fetchone()
-            total_demos = demo_stats['total_demos'] or 0
-            unique_courses = demo_stats['unique_courses'] or 0
-            total_courses = len(department_courses)
-
-            total_tasks = member_task_stats['total_tasks'] or 0
-            completed_tasks = member_task_stats['completed_tasks'] or 0
+            task_row = member_task_stats.get(member['id'], {})
+            demo_row = member_demo_stats.get(member['id'], {})
+
+            total_tasks = int(task_row.get('total_tasks') or 0)
+            completed_tasks = int(task_row.get('completed_tasks') or 0)
+            total_demos = int(demo_row.get('total_demos') or 0)
+            unique_courses = int(demo_row.get('unique_courses') or 0)
 
             task_completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
             # Use unique_courses for enrollment rate
@@ -1276,15 +4438,6 @@ def get_team_leader_dashboard(current_user_id):
         best_performer = performance_metrics[0] if performance_metrics else None
         worst_performer = performance_metrics[-1] if performance_metrics else None
 
-        # Get total demonstration count for the team leader's department only
-        cursor.execute('''
-            SELECT COUNT(*) as demo_count
-            FROM employee_course_demonstrations d
-            JOIN users u ON d.user_id = u.id
-            WHERE u.department = %s
-        ''', (user['department'],))
-        total_demonstrations = cursor.fetchone()['demo_count']
-
         # Find team members who have not started any tasks
         not_started_members = [
             m for m in performance_metrics if m['taskStats']['total'] == 0
@@ -1314,14 +4467,11 @@ def get_team_leader_dashboard(current_user_id):
             }
         }
 
-        return jsonify(convert_decimals(dashboard_data))
+        return jsonify(dashboard_data)
 
     except Exception as e:
         logger.error(f"Error fetching dashboard data: {str(e)}")
         return jsonify({'error': 'Server error'}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
 
 
@@ -1329,6 +4479,7 @@ def get_team_leader_dashboard(current_user_id):
 
 @app.route('/api/employee/course-demonstration', methods=['POST'])
 @token_required
+@upload_limit(DEMONSTRATION_MAX_BYTES)
 def submit_course_demonstration(current_user_id):
     try:
         data = request.form
@@ -1347,7 +4498,7 @@ def submit_course_demonstration(current_user_id):
             unique_filename = f"{timestamp}_{filename}"
             filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
             try:
-                document.save(filepath)
+                save_upload(document, filepath)
                 document_url = filepath
             except Exception as e:
                 logger.error(f"Error saving file: {str(e)}")
@@ -1362,6 +4513,8 @@ def submit_course_demonstration(current_user_id):
                 VALUES (%s, %s, %s, %s, %s)
             ''', (current_user_id, course_name, project_title, project_description, document_url))
             conn.commit()
+            dashboard_summary.demonstration_added()
+            response_cache.invalidate(['demonstrations'], [g.current_user['department']])
         except Exception as e:
             logger.error(f"Database error: {str(e)}")
             # Clean up the file if database insert fails
@@ -1386,6 +4539,7 @@ def submit_course_demonstration(current_user_id):
 
 @app.route('/api/tasks', methods=['POST'])
 @token_required
+@upload_limit(TASK_DOCUMENT_MAX_BYTES)
 def create_task(current_user_id):
     """Create a new task with department-based access control and file upload support"""
     try:
@@ -1393,8 +4547,7 @@ def create_task(current_user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Get current user's role and department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         if not current_user:
             return jsonify({'error': 'User not found'}), 404
@@ -1408,17 +4561,15 @@ def create_task(current_user_id):
             # Handle file upload
             data = request.form
             document_url = None
+            document_blob = None
             
             # Handle file upload
             if 'document' in request.files and request.files['document'].filename != '':
                 document = request.files['document']
                 filename = secure_filename(document.filename)
-                timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-                unique_filename = f"{timestamp}_{filename}"
-                filepath = os.path.join(TASK_DOCUMENTS_FOLDER, unique_filename)
                 try:
-                    document.save(filepath)
-                    document_url = f"/uploads/task_documents/{unique_filename}"
+                    document_blob = blob_store.put(document)
+                    document_url = blob_store.url('/uploads/task_documents/', document_blob, filename)
                 except Exception as e:
                     logger.error(f"Error saving file: {str(e)}")
                     return jsonify({'error': 'Error saving file'}), 500
@@ -1426,6 +4577,7 @@ def create_task(current_user_id):
             # Handle JSON data
             data = request.get_json()
             document_url = None
+            document_blob = None
 
         required_fields = ['title', 'description', 'assignedTo', 'deadline']
         
@@ -1473,10 +4625,12 @@ def create_task(current_user_id):
             data.get('progress', 0),
             document_url
         ))
+        task_id = cursor.lastrowid
+        if document_blob:
+            blob_store.add_ref(cursor, document_blob)
         conn.commit()
 
         # Get the created task with assigned user info
-        task_id = cursor.lastrowid
         cursor.execute('''
             SELECT t.*, 
                    u1.name as assigned_to_name, 
@@ -1490,6 +4644,9 @@ def create_task(current_user_id):
         ''', (task_id,))
         
         new_task = cursor.fetchone()
+        dashboard_summary.task_added(assigned_user['department'], 'Todo')
+        response_cache.invalidate(['tasks'], [assigned_user['department']])
+        notification_broker.publish('task_assigned', new_task, user_ids=[assigned_to])
         return jsonify(new_task), 201
 
     except Exception as e:
@@ -1508,8 +4665,7 @@ def update_task(current_user_id, task_id):
         cursor = conn.cursor(dictionary=True)
         
         # Get current user's role and department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         # Get the task
         cursor.execute('''
@@ -1576,6 +4732,7 @@ def update_task(current_user_id, task_id):
             SELECT t.*, 
                    u1.name as assigned_to_name, 
                    u1.email as assigned_to_email,
+                   u1.department as assigned_to_department,
                    u2.name as assigned_by_name
             FROM tasks t
             JOIN users u1 ON t.assigned_to = u1.id
@@ -1584,6 +4741,12 @@ def update_task(current_user_id, task_id):
         ''', (task_id,))
         
         updated_task = cursor.fetchone()
+        if updated_task:
+            dashboard_summary.task_changed(
+                task['assigned_user_department'], task['status'],
+                updated_task['assigned_to_department'], updated_task['status']
+            )
+            response_cache.invalidate(['tasks'], [task['assigned_user_department'], updated_task['assigned_to_department']])
         return jsonify(updated_task)
 
     except Exception as e:
@@ -1602,14 +4765,18 @@ def delete_task(current_user_id, task_id):
         cursor = conn.cursor(dictionary=True)
         
         # Verify user is a team leader
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
         
         if not user or user['role'] != 'TeamLeader':
             return jsonify({'error': 'Only team leaders can delete tasks'}), 403
 
         # Verify task exists and was created by this team leader
-        cursor.execute('SELECT assigned_by FROM tasks WHERE id = %s', (task_id,))
+        cursor.execute('''
+            SELECT t.assigned_by, t.status, t.document_url, u.department as assigned_user_department
+            FROM tasks t
+            LEFT JOIN users u ON t.assigned_to = u.id
+            WHERE t.id = %s
+        ''', (task_id,))
         task = cursor.fetchone()
         
         if not task:
@@ -1620,7 +4787,10 @@ def delete_task(current_user_id, task_id):
 
         # Delete the task
         cursor.execute('DELETE FROM tasks WHERE id = %s', (task_id,))
+        blob_store.release(cursor, task['document_url'])
         conn.commit()
+        dashboard_summary.task_removed(task['assigned_user_department'], task['status'])
+        response_cache.invalidate(['tasks'], [task['assigned_user_department']])
         
         return jsonify({'message': 'Task deleted successfully'})
 
@@ -1631,116 +4801,99 @@ def delete_task(current_user_id, task_id):
         cursor.close()
         conn.close()
 
+TASK_STATUS_JOINS = '''
+    FROM tasks t
+    JOIN users u1 ON t.assigned_to = u1.id
+    JOIN users u2 ON t.assigned_by = u2.id
+'''
+
+TASK_STATUS_SELECT = '''
+    SELECT t.*,
+           u1.name as assigned_to_name,
+           u1.email as assigned_to_email,
+           u1.department as assigned_to_department,
+           u2.name as assigned_by_name,
+           u2.email as assigned_by_email
+''' + TASK_STATUS_JOINS
+
+TASK_STATUS_AGGREGATE_SELECT = '''
+    SELECT
+        COUNT(*) as total,
+        COALESCE(SUM(CASE WHEN t.status = 'Completed' THEN 1 ELSE 0 END), 0) as completed,
+        COALESCE(SUM(CASE WHEN t.status = 'In Progress' THEN 1 ELSE 0 END), 0) as in_progress,
+        COALESCE(SUM(CASE WHEN t.status = 'Todo' THEN 1 ELSE 0 END), 0) as todo,
+        AVG(COALESCE(t.progress, 0)) as avg_progress
+''' + TASK_STATUS_JOINS
+
+def task_status_scope(user, user_id):
+    """(scope_clauses, scope_params) for the tasks `user` sees on the status board"""
+    if user['role'] == 'Admin':
+        # Admins can see all tasks
+        return [], []
+    if user['role'] == 'TeamLeader':
+        if user['department'] == 'Customer-Service':
+            # Customer Service team leaders can see tasks in both Customer Service and Finance departments
+            return ["u1.department IN ('Customer-Service', 'Finance')"], []
+        # Other team leaders can only see tasks in their department
+        return ['u1.department = %s'], [user['department']]
+    # Employees can only see tasks assigned to them
+    return ['t.assigned_to = %s'], [user_id]
+
+def build_task_status_aggregate(clauses, params):
+    """Counts and average progress over every task matching `clauses`. Returns (query, params)."""
+    query = TASK_STATUS_AGGREGATE_SELECT
+    if clauses:
+        query += ' WHERE ' + ' AND '.join(clauses)
+    return query, tuple(params)
+
 @app.route('/api/tasks/status', methods=['GET'])
 @token_required
+@conditional_get('users', 'tasks')
+@cached_response('users', 'tasks', per_user=True)
 def get_tasks_by_status(current_user_id):
-    """Get tasks filtered by status with department-based access control and progress calculation"""
+    """Get tasks filtered by status with department-based access control and progress calculation.
+
+    Tasks are paginated by (deadline, id); task_counts and overall_progress
+    cover every task matching the filters, not just the returned page.
+    """
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
         
         # Get user's role and department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        status = request.args.get('status')
-        if status and status not in ['Todo', 'In Progress', 'Completed']:
-            return jsonify({'error': 'Invalid status'}), 400
-
-        # Build query based on user role
-        if user['role'] == 'Admin':
-            # Admins can see all tasks
-            query = '''
-                SELECT t.*, 
-                       u1.name as assigned_to_name, 
-                       u1.email as assigned_to_email,
-                       u1.department as assigned_to_department,
-                       u2.name as assigned_by_name,
-                       u2.email as assigned_by_email
-                FROM tasks t
-                JOIN users u1 ON t.assigned_to = u1.id
-                JOIN users u2 ON t.assigned_by = u2.id
-            '''
-            params = []
-        elif user['role'] == 'TeamLeader':
-            # Customer Service team leaders can see tasks in both Customer Service and Finance departments
-            if user['department'] == 'Customer-Service':
-                query = '''
-                    SELECT t.*, 
-                           u1.name as assigned_to_name, 
-                           u1.email as assigned_to_email,
-                           u1.department as assigned_to_department,
-                           u2.name as assigned_by_name,
-                           u2.email as assigned_by_email
-                    FROM tasks t
-                    JOIN users u1 ON t.assigned_to = u1.id
-                    JOIN users u2 ON t.assigned_by = u2.id
-                    WHERE u1.department IN ('Customer-Service', 'Finance')
-                '''
-                params = []
-            else:
-                # Other team leaders can only see tasks in their department
-                query = '''
-                    SELECT t.*, 
-                           u1.name as assigned_to_name, 
-                           u1.email as assigned_to_email,
-                           u1.department as assigned_to_department,
-                           u2.name as assigned_by_name,
-                           u2.email as assigned_by_email
-                    FROM tasks t
-                    JOIN users u1 ON t.assigned_to = u1.id
-                    JOIN users u2 ON t.assigned_by = u2.id
-                    WHERE u1.department = %s
-                '''
-                params = [user['department']]
-        else:  # Employee
-            # Employees can only see tasks assigned to them
-            query = '''
-                SELECT t.*, 
-                       u1.name as assigned_to_name, 
-                       u1.email as assigned_to_email,
-                       u1.department as assigned_to_department,
-                       u2.name as assigned_by_name,
-                       u2.email as assigned_by_email
-                FROM tasks t
-                JOIN users u1 ON t.assigned_to = u1.id
-                JOIN users u2 ON t.assigned_by = u2.id
-                WHERE t.assigned_to = %s
-            '''
-            params = [current_user_id]
+        try:
+            filter_clauses, filter_params, limit, page_cursor = parse_task_query_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        # Add status filter if provided
-        if status:
-            query += ' AND t.status = %s'
-            params.append(status)
+        scope_clauses, scope_params = task_status_scope(user, current_user_id)
+        tasks, next_cursor = fetch_task_page(cursor, TASK_STATUS_SELECT, scope_clauses, scope_params,
+                                             filter_clauses, filter_params, limit, page_cursor)
 
-        query += ' ORDER BY t.deadline DESC'
-        
-        cursor.execute(query, tuple(params))
-        tasks = cursor.fetchall()
-        
-        # Calculate overall progress
-        total_progress = 0
-        for task in tasks:
-            total_progress += task['progress'] if task['progress'] is not None else 0
-        
-        overall_progress = round(total_progress / len(tasks)) if tasks else 0
+        # Calculate counts and overall progress in SQL over the full filtered set
+        cursor.execute(*build_task_status_aggregate(scope_clauses + filter_clauses, scope_params + filter_params))
+        aggregate = cursor.fetchone()
+
+        overall_progress = round(float(aggregate['avg_progress'])) if aggregate['total'] else 0
 
         # Get task counts by status
         task_counts = {
-            'total': len(tasks),
-            'completed': sum(1 for task in tasks if task['status'] == 'Completed'),
-            'in_progress': sum(1 for task in tasks if task['status'] == 'In Progress'),
-            'todo': sum(1 for task in tasks if task['status'] == 'Todo')
+            'total': int(aggregate['total']),
+            'completed': int(aggregate['completed']),
+            'in_progress': int(aggregate['in_progress']),
+            'todo': int(aggregate['todo'])
         }
         
         return jsonify({
             'tasks': tasks,
             'overall_progress': overall_progress,
-            'task_counts': task_counts
+            'task_counts': task_counts,
+            'next_cursor': next_cursor
         })
 
     except Exception as e:
@@ -1869,6 +5022,10 @@ def update_task_progress(current_user_id, task_id):
         ''', (task_id,))
         
         updated_task = cursor.fetchone()
+        if updated_task:
+            department = updated_task['assigned_to_department']
+            dashboard_summary.task_changed(department, task['status'], department, updated_task['status'])
+            response_cache.invalidate(['tasks'], [department])
         return jsonify(updated_task)
         
     except Exception as e:
@@ -1878,8 +5035,22 @@ def update_task_progress(current_user_id, task_id):
         cursor.close()
         conn.close()
 
+EMPLOYEE_TASKS_SQL = '''
+    SELECT t.*, u2.name as assigned_by_name FROM tasks t
+    JOIN users u2 ON t.assigned_by = u2.id
+    WHERE t.assigned_to = %s
+'''
+
+EMPLOYEE_DEMONSTRATIONS_SQL = '''
+    SELECT * FROM employee_course_demonstrations
+    WHERE user_id = %s
+    ORDER BY submitted_at DESC
+'''
+
 @app.route('/api/employee/dashboard', methods=['GET'])
 @token_required
+@conditional_get('users', 'tasks', 'demonstrations')
+@cached_response('users', 'tasks', 'demonstrations', per_user=True)
 def get_employee_dashboard(current_user_id):
     """
     Returns dashboard data for the logged-in employee.
@@ -1897,11 +5068,7 @@ def get_employee_dashboard(current_user_id):
         department = user['department']
 
         # Get all tasks for this employee
-        cursor.execute('''
-            SELECT t.*, u2.name as assigned_by_name FROM tasks t
-            JOIN users u2 ON t.assigned_by = u2.id
-            WHERE t.assigned_to = %s
-        ''', (current_user_id,))
+        cursor.execute(EMPLOYEE_TASKS_SQL, (current_user_id,))
         tasks = cursor.fetchall()
 
         total_tasks = len(tasks)
@@ -1914,11 +5081,7 @@ def get_employee_dashboard(current_user_id):
         upcoming = sorted(tasks, key=lambda t: t['deadline'])[:5]
 
         # Get employee's course demonstrations
-        cursor.execute('''
-            SELECT * FROM employee_course_demonstrations 
-            WHERE user_id = %s
-            ORDER BY submitted_at DESC
-        ''', (current_user_id,))
+        cursor.execute(EMPLOYEE_DEMONSTRATIONS_SQL, (current_user_id,))
         demonstrations = cursor.fetchall()
         total_demonstrations = len(demonstrations)
 
@@ -1983,58 +5146,480 @@ def get_employee_dashboard(current_user_id):
         cursor.close()
         conn.close()
 
+# Watched segments are fixed-length slices of a course video
+VIDEO_SEGMENT_SECONDS = int(os.getenv('VIDEO_SEGMENT_SECONDS', 5))
+
+
+class SegmentCoverage:
+    """Watched segment indexes kept as sorted, non-overlapping [start, end) runs.
+
+    Serialized as a JSON list of runs, e.g. [[0, 12], [30, 41]], so a fully
+    watched video is one pair no matter how long it is.
+    """
+
+    def __init__(self, runs=None):
+        self.runs = []
+        if runs:
+            self._merge(runs)
+
+    @classmethod
+    def from_json(cls, value):
+        """Parse stored runs; also accepts the legacy list of segment indexes"""
+        if not value:
+            return cls()
+        if isinstance(value, (str, bytes)):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return cls()
+        coverage = cls()
+        if not isinstance(value, list):
+            return coverage
+        runs = []
+        for item in value:
+            try:
+                if isinstance(item, (list, tuple)) and len(item) == 2:
+                    runs.append((int(item[0]), int(item[1])))
+                elif not isinstance(item, (dict, list, tuple, bool)):
+                    index = int(item)
+                    runs.append((index, index + 1))
+            except (TypeError, ValueError, OverflowError):
+                continue
+        coverage._merge(runs)
+        return coverage
+
+    @classmethod
+    def from_span(cls, start_seconds, end_seconds, segment_seconds=VIDEO_SEGMENT_SECONDS):
+        """Coverage for the segments touched by a played span of the video"""
+        coverage = cls()
+        if end_seconds > start_seconds:
+            coverage.add(int(max(start_seconds, 0) // segment_seconds), math.ceil(end_seconds / segment_seconds))
+        return coverage
+
+    def add(self, start, end):
+        """Merge the run [start, end) in, joining any runs it overlaps or touches"""
+        self._merge([(start, end)])
+
+    def _merge(self, runs):
+        # One sorted pass over old and new runs keeps bulk merges O(n log n)
+        merged = []
+        for start, end in sorted([(start, end) for start, end in runs if end > start]
+                                 + [(start, end) for start, end in self.runs]):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.runs = merged
+
+    def update(self, other):
+        self._merge(other.runs)
+        return self
+
+    def union(self, other):
+        return SegmentCoverage(self.runs).update(other)
+
+    def covered(self, total=None):
+        """Number of covered segments, counting only those below total when given"""
+        if total is None:
+            return sum(end - start for start, end in self.runs)
+        return sum(max(0, min(end, total) - start) for start, end in self.runs if start < total)
+
+    def percentage(self, total):
+        if not total:
+            return 0.0
+        return min(100.0, self.covered(total) * 100.0 / total)
+
+    def to_json(self):
+        return json.dumps(self.runs, separators=(',', ':'))
+
+    def __bool__(self):
+        return bool(self.runs)
+
+    def __eq__(self, other):
+        return isinstance(other, SegmentCoverage) and self.runs == other.runs
+
+
+def parse_duration_seconds(value):
+    """Seconds in a course duration such as '2:00:00', '45:30', '1h 30m' or '90 min'"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    text = str(value).strip().lower()
+    if not text:
+        return None
+    if ':' in text:
+        try:
+            seconds = 0
+            for part in text.split(':'):
+                seconds = seconds * 60 + int(part)
+            return seconds or None
+        except ValueError:
+            return None
+    units = re.findall(r'(\d+(?:\.\d+)?)\s*(h|hr|hrs|hours?|m|min|mins|minutes?|s|sec|secs|seconds?)\b', text)
+    if units:
+        multipliers = {'h': 3600, 'm': 60, 's': 1}
+        return int(sum(float(amount) * multipliers[unit[0]] for amount, unit in units)) or None
+    try:
+        # Bare numbers are minutes, the way course lengths are usually written
+        return int(float(text) * 60) or None
+    except ValueError:
+        return None
+
+def course_segment_count(duration_seconds, segment_seconds=VIDEO_SEGMENT_SECONDS):
+    if not duration_seconds:
+        return None
+    return math.ceil(duration_seconds / segment_seconds)
+
+
+# Watch history heartbeat buffering
+WATCH_HISTORY_BUFFERED = os.getenv('WATCH_HISTORY_BUFFERED', 'true').lower() == 'true'
+WATCH_HISTORY_FLUSH_INTERVAL = float(os.getenv('WATCH_HISTORY_FLUSH_INTERVAL', 5))
+WATCH_HISTORY_FLUSH_SIZE = int(os.getenv('WATCH_HISTORY_FLUSH_SIZE', 500))
+WATCH_HISTORY_MAX_ATTEMPTS = int(os.getenv('WATCH_HISTORY_MAX_ATTEMPTS', 3))
+WATCH_HISTORY_MAX_SEGMENTS = int(os.getenv('WATCH_HISTORY_MAX_SEGMENTS', 10000))
+
+
+class WatchHistoryBuffer:
+    """Write-behind buffer that coalesces player heartbeats per (user, course, day).
+
+    Heartbeats are merged in memory (durations summed, watched segments
+    unioned, the latest position kept) and written as one multi-row upsert
+    every WATCH_HISTORY_FLUSH_INTERVAL seconds, or sooner once
+    WATCH_HISTORY_FLUSH_SIZE keys are pending. When the database is
+    unreachable the batch is merged back in as is; when it rejects the batch,
+    the rows are retried one by one so a bad row cannot hold back the others,
+    and a row that still fails on its own WATCH_HISTORY_MAX_ATTEMPTS times is
+    dropped and logged. A schema mismatch (missing table or column) is never
+    blamed on the rows: everything is kept and the mismatch logged critically
+    until a write succeeds. Whatever is pending is flushed when the process exits.
+
+    Heartbeats are grouped by the application's calendar day and written
+    under the database's CURDATE(), shifted by however far the two clocks'
+    dates differ.
+
+    Each day's row stores the cumulative SegmentCoverage for the course, so
+    enrollment progress is the share of the video actually watched.
+    """
+
+    def __init__(self, interval=5, max_pending=500, max_attempts=3):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending = {}
+        self._date_offset = datetime.timedelta(0)  # CURDATE() minus the local date
+        self._schema_error = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._flusher = None
+        self._stats = {
+            'heartbeats': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'rows_dropped': 0,
+            'flush_failures': 0
+        }
+
+    def start(self):
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name='watch-history-flusher', daemon=True)
+                self._flusher.start()
+                atexit.register(self.stop)
+
+    def add(self, user_id, course_id, duration, position, segments, progress=None, video_duration=None):
+        """Queue a heartbeat; segments is a SegmentCoverage of what was watched since the last one"""
+        self.start()
+        key = (user_id, course_id, datetime.date.today())
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = {
+                    'duration': duration,
+                    'position': position,
+                    'segments': SegmentCoverage(segments.runs),
+                    'progress': progress,
+                    'video_duration': video_duration,
+                    'attempts': 0
+                }
+            else:
+                entry['duration'] += duration
+                entry['position'] = position
+                entry['segments'].update(segments)
+                if progress is not None:
+                    entry['progress'] = progress
+                if video_duration:
+                    entry['video_duration'] = video_duration
+            self._stats['heartbeats'] += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def pending_for(self, user_id, course_id):
+        """Unflushed entries for one viewer, as {watch_date: entry} in the database's dates"""
+        with self._lock:
+            return {key[2] + self._date_offset: dict(entry, segments=SegmentCoverage(entry['segments'].runs))
+                    for key, entry in self._pending.items()
+                    if key[0] == user_id and key[1] == course_id}
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Watch history flush error: {str(e)}")
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+            if not batch:
+                return 0
+
+            departments = set()
+            try:
+                departments = self._write(batch)
+            except Exception as e:
+                if is_schema_db_error(e):
+                    self._requeue(batch, count_attempt=False)
+                    if self._schema_error is None:
+                        logger.critical(f"Watch history tables do not match the code, keeping heartbeats "
+                                        f"until a write succeeds (run migrations): {str(e)}")
+                    self._schema_error = str(e)
+                    raise
+                if is_transient_db_error(e) or len(batch) == 1:
+                    failed = batch
+                    error = e
+                else:
+                    # Something in the batch was rejected: isolate it so the other viewers still persist
+                    failed = {}
+                    error = None
+                    for key, entry in batch.items():
+                        try:
+                            departments |= self._write({key: entry})
+                        except Exception as row_error:
+                            failed[key] = entry
+                            error = row_error
+                if failed:
+                    self._requeue(failed, count_attempt=not (is_transient_db_error(error) or
+                                                             is_schema_db_error(error)))
+                    if len(failed) == len(batch):
+                        raise error
+                    logger.error(f"Watch history rows rejected: {str(error)}")
+                written = len(batch) - len(failed)
+            else:
+                written = len(batch)
+            if self._schema_error is not None:
+                logger.info('Watch history writes succeeded again')
+                self._schema_error = None
+            if departments:
+                response_cache.invalidate(['course_enrollments'], sorted(departments))
+
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['rows_written'] += written
+            return written
+
+    def _requeue(self, failed, count_attempt):
+        dropped = []
+        with self._lock:
+            self._stats['flush_failures'] += 1
+            for key, entry in failed.items():
+                if count_attempt:
+                    entry['attempts'] += 1
+                    if entry['attempts'] >= self.max_attempts:
+                        dropped.append(key)
+                        continue
+                # Anything that arrived meanwhile is newer: keep its position, add our duration
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = entry
+                else:
+                    current['duration'] += entry['duration']
+                    current['segments'].update(entry['segments'])
+                    current['attempts'] = max(current['attempts'], entry['attempts'])
+            self._stats['rows_dropped'] += len(dropped)
+        for user_id, course_id, watch_date in dropped:
+            logger.error(f"Dropping watch history for user {user_id}, course {course_id} on {watch_date} "
+                         f"after {self.max_attempts} failed writes")
+
+    def _write(self, batch):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            # Rows are dated by the database, as a direct CURDATE() insert would be
+            cursor.execute('SELECT CURDATE()')
+            date_offset = cursor.fetchone()[0] - datetime.date.today()
+            self._date_offset = date_offset
+
+            items = list(batch.items())
+            viewers = sorted({(user_id, course_id) for user_id, course_id, watch_date in batch})
+
+            # Rows carry cumulative coverage, so start from each viewer's latest stored row
+            stored = {}
+            placeholders = ', '.join(['(%s, %s)'] * len(viewers))
+            cursor.execute(f'''
+                SELECT h.user_id, h.course_id, h.completed_segments
+                FROM course_watch_history h
+                JOIN (
+                    SELECT user_id, course_id, MAX(watch_date) as watch_date
+                    FROM course_watch_history
+                    WHERE (user_id, course_id) IN ({placeholders})
+                    GROUP BY user_id, course_id
+                ) latest ON h.user_id = latest.user_id AND h.course_id = latest.course_id
+                    AND h.watch_date = latest.watch_date
+            ''', [value for viewer in viewers for value in viewer])
+            for user_id, course_id, completed_segments in cursor.fetchall():
+                stored[(user_id, course_id)] = completed_segments
+
+            course_ids = sorted({course_id for user_id, course_id in viewers})
+            cursor.execute(f'''
+                SELECT id, duration FROM courses WHERE id IN ({', '.join(['%s'] * len(course_ids))})
+            ''', course_ids)
+            course_durations = {course_id: parse_duration_seconds(duration) for course_id, duration in cursor.fetchall()}
+
+            coverage = {viewer: SegmentCoverage.from_json(stored.get(viewer)) for viewer in viewers}
+            cumulative = {}
+            for key, entry in sorted(items, key=lambda item: item[0][2]):
+                cumulative[key] = coverage[key[:2]].update(entry['segments']).to_json()
+
+            # executemany folds this into a single multi-row INSERT
+            cursor.executemany('''
+                INSERT INTO course_watch_history
+                (user_id, course_id, watch_date, watch_duration, watch_position, completed_segments)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                watch_duration = watch_duration + VALUES(watch_duration),
+                watch_position = VALUES(watch_position),
+                completed_segments = VALUES(completed_segments)
+            ''', [
+                (user_id, course_id, watch_date + date_offset, entry['duration'], entry['position'],
+                 cumulative[(user_id, course_id, watch_date)])
+                for (user_id, course_id, watch_date), entry in items
+            ])
+
+            # Enrollment progress only needs the most recent state per viewer
+            latest = {}
+            for (user_id, course_id, watch_date), entry in items:
+                previous = latest.get((user_id, course_id))
+                if previous is None or watch_date >= previous[0]:
+                    latest[(user_id, course_id)] = (watch_date, entry)
+            rows = []
+            for (user_id, course_id), (watch_date, entry) in latest.items():
+                duration = course_durations.get(course_id) or parse_duration_seconds(entry['video_duration'])
+                total = course_segment_count(duration)
+                # Without a known video length the client's own figure is all there is
+                progress = round(coverage[(user_id, course_id)].percentage(total)) if total else entry['progress']
+                rows.append((user_id, course_id, progress, entry['position']))
+
+            for start in range(0, len(rows), self.max_pending):
+                chunk = rows[start:start + self.max_pending]
+                derived = ' UNION ALL '.join(
+                    ['SELECT %s as user_id, %s as course_id, %s as progress, %s as watch_position']
+                    + ['SELECT %s, %s, %s, %s'] * (len(chunk) - 1)
+                )
+                cursor.execute(f'''
+                    UPDATE course_enrollments ce
+                    JOIN ({derived}) v ON ce.user_id = v.user_id AND ce.course_id = v.course_id
+                    SET ce.progress = COALESCE(v.progress, ce.progress),
+                        ce.last_accessed_at = CURRENT_TIMESTAMP,
+                        ce.last_watch_position = v.watch_position
+                ''', [value for row in chunk for value in row])
+
+            # Departments whose cached enrollment figures this write changed
+            user_ids = sorted({user_id for user_id, course_id in viewers})
+            cursor.execute(f'''
+                SELECT DISTINCT department FROM users WHERE id IN ({', '.join(['%s'] * len(user_ids))})
+            ''', user_ids)
+            departments = {department for department, in cursor.fetchall()}
+
+            conn.commit()
+            return departments
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join(timeout=self.interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing watch history on shutdown: {str(e)}")
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+            metrics['pending'] = len(self._pending)
+        metrics['schema_error'] = self._schema_error
+        return metrics
+
+
+watch_history_buffer = WatchHistoryBuffer(interval=WATCH_HISTORY_FLUSH_INTERVAL, max_pending=WATCH_HISTORY_FLUSH_SIZE,
+                                          max_attempts=WATCH_HISTORY_MAX_ATTEMPTS)
+
 @app.route('/api/courses/watch-history', methods=['POST'])
 @token_required
 def update_watch_history(current_user_id):
     """Update course watch history and progress"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
         data = request.get_json()
         course_id = data.get('courseId')
         watch_duration = data.get('watchDuration')
         watch_position = data.get('watchPosition')
-        completed_segments = data.get('completedSegments', [])
         
         if not all([course_id, watch_duration, watch_position]):
             return jsonify({'error': 'Missing required fields'}), 400
 
-        # Update or insert watch history
-        cursor.execute('''
-            INSERT INTO course_watch_history 
-            (user_id, course_id, watch_date, watch_duration, watch_position, completed_segments)
-            VALUES (%s, %s, CURDATE(), %s, %s, %s)
-            ON DUPLICATE KEY UPDATE
-            watch_duration = watch_duration + %s,
-            watch_position = %s,
-            completed_segments = %s
-        ''', (
+        try:
+            course_id = int(course_id)
+            watch_duration = int(watch_duration)
+            watch_position = round(float(watch_position))
+        except (TypeError, ValueError, OverflowError):
+            return jsonify({'error': 'Invalid courseId, watchDuration or watchPosition'}), 400
+
+        # Only used when the course length is unknown; the column holds 0..100
+        progress = data.get('progress')
+        if progress is not None:
+            try:
+                progress = min(100, max(0, round(float(progress))))
+            except (TypeError, ValueError, OverflowError):
+                return jsonify({'error': 'Invalid progress'}), 400
+
+        completed_segments = data.get('completedSegments')
+        if isinstance(completed_segments, str):
+            try:
+                completed_segments = json.loads(completed_segments)
+            except ValueError:
+                completed_segments = None
+        if isinstance(completed_segments, list) and len(completed_segments) > WATCH_HISTORY_MAX_SEGMENTS:
+            return jsonify({'error': f'completedSegments may list at most {WATCH_HISTORY_MAX_SEGMENTS} entries'}), 400
+
+        # What was played since the last heartbeat, plus anything the player reports itself
+        segments = SegmentCoverage.from_span(watch_position - watch_duration, watch_position)
+        segments.update(SegmentCoverage.from_json(completed_segments))
+
+        watch_history_buffer.add(
             current_user_id,
             course_id,
             watch_duration,
             watch_position,
-            json.dumps(completed_segments),
-            watch_duration,
-            watch_position,
-            json.dumps(completed_segments)
-        ))
-
-        # Update course enrollment progress
-        cursor.execute('''
-            UPDATE course_enrollments 
-            SET progress = %s,
-                last_accessed_at = CURRENT_TIMESTAMP,
-                last_watch_position = %s
-            WHERE user_id = %s AND course_id = %s
-        ''', (
-            data.get('progress', 0),
-            watch_position,
-            current_user_id,
-            course_id
-        ))
-
-        conn.commit()
+            segments,
+            progress,
+            data.get('videoDuration')
+        )
+        if not WATCH_HISTORY_BUFFERED:
+            watch_history_buffer.flush()
         
         return jsonify({
             'success': True,
@@ -2044,9 +5629,6 @@ def update_watch_history(current_user_id):
     except Exception as e:
         logger.error(f"Error updating watch history: {str(e)}")
         return jsonify({'error': 'Server error'}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
 @app.route('/api/courses/watch-history/<int:course_id>', methods=['GET'])
 @token_required
@@ -2069,10 +5651,30 @@ def get_watch_history(current_user_id, course_id):
         
         history = cursor.fetchall()
         
-        # Convert JSON strings to objects
         for record in history:
-            if record['completed_segments']:
-                record['completed_segments'] = json.loads(record['completed_segments'])
+            record['completed_segments'] = SegmentCoverage.from_json(record['completed_segments'])
+
+        # Fold in heartbeats that have not been flushed yet; rows hold cumulative coverage
+        pending = watch_history_buffer.pending_for(current_user_id, course_id)
+        if pending:
+            latest = history[0]['completed_segments'] if history else SegmentCoverage()
+            for record in history:
+                entry = pending.pop(record['watch_date'], None)
+                if entry:
+                    record['watch_duration'] = (record['watch_duration'] or 0) + entry['duration']
+                    record['watch_position'] = entry['position']
+                    record['completed_segments'] = record['completed_segments'].union(entry['segments'])
+            for watch_date, entry in pending.items():
+                history.append({
+                    'watch_date': watch_date,
+                    'watch_duration': entry['duration'],
+                    'watch_position': entry['position'],
+                    'completed_segments': latest.union(entry['segments'])
+                })
+            history.sort(key=lambda record: record['watch_date'], reverse=True)
+
+        for record in history:
+            record['completed_segments'] = record['completed_segments'].runs
         
         return jsonify(history)
 
@@ -2084,6 +5686,291 @@ def get_watch_history(current_user_id, course_id):
         conn.close()
 
 
+# Course player event collection
+INTERACTION_TYPES = ['play', 'pause', 'seek', 'complete_segment', 'complete_course']
+INTERACTION_MAX_EVENTS_PER_REQUEST = int(os.getenv('INTERACTION_MAX_EVENTS_PER_REQUEST', 1000))
+INTERACTION_QUEUE_SIZE = int(os.getenv('INTERACTION_QUEUE_SIZE', 100000))
+INTERACTION_BATCH_SIZE = int(os.getenv('INTERACTION_BATCH_SIZE', 1000))
+INTERACTION_FLUSH_INTERVAL = float(os.getenv('INTERACTION_FLUSH_INTERVAL', 1))
+
+# Column limits of course_interactions: int(11) ids and positions, TIMESTAMP times
+MYSQL_INT_MAX = 2147483647
+MYSQL_TIMESTAMP_MAX = 2147483647  # 2038-01-19 03:14:07 UTC, in epoch seconds
+
+
+class InteractionCollector:
+    """Bounded in-memory queue of course_interactions rows, written by a background thread.
+
+    Request threads only validate and append; the writer drains up to
+    INTERACTION_BATCH_SIZE rows at a time into one multi-row INSERT. When the
+    queue is full new events are refused instead of blocking the request.
+
+    A batch that fails because the database is unreachable goes back to the
+    front of the queue. So does one that fails because the schema is behind
+    the code (see SCHEMA_ERROR_CODES); that is logged as critical and new
+    events are refused until a write succeeds again. A batch the database
+    rejects otherwise is split in halves until the offending rows stand
+    alone, and those are dropped and logged.
+    """
+
+    def __init__(self, max_queue=100000, batch_size=1000, interval=1):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._writer = None
+        self._schema_error = None
+        self._stats = {
+            'accepted': 0,
+            'rejected_full': 0,
+            'rejected_unavailable': 0,
+            'written': 0,
+            'batches': 0,
+            'write_failures': 0,
+            'dropped': 0,
+            'rejected_rows': 0
+        }
+
+    def start(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='interaction-writer', daemon=True)
+                self._writer.start()
+                atexit.register(self.stop)
+
+    def offer(self, rows):
+        """Queue rows for insertion; returns False without queueing anything if they do not fit"""
+        self.start()
+        with self._lock:
+            if self._schema_error is not None:
+                self._stats['rejected_unavailable'] += len(rows)
+                return False
+            if len(self._queue) + len(rows) > self.max_queue:
+                self._stats['rejected_full'] += len(rows)
+                return False
+            self._queue.extend(rows)
+            self._stats['accepted'] += len(rows)
+            full_batch = len(self._queue) >= self.batch_size
+        if full_batch:
+            self._wake.set()
+        return True
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Interaction write error: {str(e)}")
+
+    def flush(self):
+        """Write everything queued so far, one batch per INSERT"""
+        written = 0
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    count = min(len(self._queue), self.batch_size)
+                    batch = [self._queue.popleft() for _ in range(count)]
+                if not batch:
+                    return written
+                try:
+                    self._write(batch)
+                    batch_written = len(batch)
+                except Exception as e:
+                    with self._lock:
+                        self._stats['write_failures'] += 1
+                    if is_schema_db_error(e):
+                        self._requeue(batch)
+                        self._schema_mismatch(e)
+                        raise
+                    if is_transient_db_error(e):
+                        self._requeue(batch)
+                        raise
+                    batch_written = self._write_isolating(batch, e)
+                with self._lock:
+                    if self._schema_error is not None:
+                        logger.info('course_interactions writes are succeeding again, accepting events')
+                        self._schema_error = None
+                    self._stats['written'] += batch_written
+                    self._stats['batches'] += 1
+                written += batch_written
+
+    def _schema_mismatch(self, e):
+        with self._lock:
+            first = self._schema_error is None
+            self._schema_error = str(e)
+        if first:
+            logger.critical(f"course_interactions does not match the code, refusing new events "
+                            f"until a write succeeds (run migrations): {str(e)}")
+
+    def _requeue(self, rows):
+        with self._lock:
+            # Put the rows back in front; drop the oldest events if that overflows
+            self._queue.extendleft(reversed(rows))
+            overflow = len(self._queue) - self.max_queue
+            for _ in range(max(overflow, 0)):
+                self._queue.popleft()
+            self._stats['dropped'] += max(overflow, 0)
+
+    def _write_isolating(self, batch, error):
+        """Write a rejected batch in halves, dropping the rows that fail on their own; returns rows written"""
+        written = 0
+        parts = deque([batch])
+        while parts:
+            part = parts.popleft()
+            if part is not batch:
+                try:
+                    self._write(part)
+                    written += len(part)
+                    continue
+                except Exception as e:
+                    if is_transient_db_error(e) or is_schema_db_error(e):
+                        self._requeue([row for rest in [part] + list(parts) for row in rest])
+                        if is_schema_db_error(e):
+                            self._schema_mismatch(e)
+                        raise
+                    error = e
+            if len(part) == 1:
+                with self._lock:
+                    self._stats['rejected_rows'] += 1
+                user_id, course_id, interaction_type = part[0][:3]
+                logger.error(f"Dropping {interaction_type} event of user {user_id} for course {course_id}: {str(error)}")
+                continue
+            middle = len(part) // 2
+            parts.extendleft([part[middle:], part[:middle]])
+        return written
+
+    def _write(self, batch):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            # executemany folds this into a single multi-row INSERT
+            cursor.executemany('''
+                INSERT INTO course_interactions
+                (user_id, course_id, interaction_type, interaction_time, video_position, segment_id, metadata)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ''', batch)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._writer is not None and self._writer is not threading.current_thread():
+            self._writer.join(timeout=self.interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing course interactions on shutdown: {str(e)}")
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+            metrics['queued'] = len(self._queue)
+            metrics['schema_error'] = self._schema_error
+        return metrics
+
+
+interaction_collector = InteractionCollector(
+    max_queue=INTERACTION_QUEUE_SIZE,
+    batch_size=INTERACTION_BATCH_SIZE,
+    interval=INTERACTION_FLUSH_INTERVAL
+)
+
+def parse_interaction(user_id, event):
+    """Validate one player event and turn it into a course_interactions row. Raises ValueError."""
+    if not isinstance(event, dict):
+        raise ValueError('Event must be an object')
+
+    interaction_type = event.get('type')
+    if interaction_type not in INTERACTION_TYPES:
+        raise ValueError(f"type must be one of: {', '.join(INTERACTION_TYPES)}")
+
+    try:
+        course_id = int(event.get('courseId'))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('courseId must be an integer')
+    if not 0 < course_id <= MYSQL_INT_MAX:
+        raise ValueError('courseId is out of range')
+
+    position = event.get('position')
+    if position is not None:
+        try:
+            position = round(float(position))
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError('position must be a number')
+        if not 0 <= position <= MYSQL_INT_MAX:
+            raise ValueError('position is out of range')
+
+    segment_id = event.get('segmentId')
+    if segment_id is not None:
+        segment_id = str(segment_id)
+        if len(segment_id) > 50:
+            raise ValueError('segmentId must be at most 50 characters')
+
+    timestamp = event.get('timestamp')
+    if timestamp is None:
+        interaction_time = datetime.datetime.now()
+    elif isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+        # Epoch milliseconds, as Date.now() sends them
+        interaction_time = datetime.datetime.fromtimestamp(timestamp / 1000)
+    elif isinstance(timestamp, str):
+        interaction_time = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        if interaction_time.tzinfo is not None:
+            interaction_time = interaction_time.astimezone().replace(tzinfo=None)
+    else:
+        raise ValueError('timestamp must be epoch milliseconds or an ISO 8601 string')
+    if not 0 < interaction_time.timestamp() <= MYSQL_TIMESTAMP_MAX:
+        raise ValueError('timestamp is out of range')
+
+    metadata = event.get('metadata')
+    if metadata is not None:
+        if not isinstance(metadata, dict):
+            raise ValueError('metadata must be an object')
+        metadata = json.dumps(metadata, separators=(',', ':'))
+
+    return (user_id, course_id, interaction_type, interaction_time, position, segment_id, metadata)
+
+@app.route('/api/courses/interactions', methods=['POST'])
+@token_required
+def collect_course_interactions(current_user_id):
+    """Accept a batch of player events ({"events": [...]} or a bare array) for background insertion"""
+    data = request.get_json(silent=True)
+    events = data.get('events') if isinstance(data, dict) else data
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': 'Expected a non-empty array of events'}), 400
+    if len(events) > INTERACTION_MAX_EVENTS_PER_REQUEST:
+        return jsonify({'error': f'At most {INTERACTION_MAX_EVENTS_PER_REQUEST} events per request'}), 413
+
+    rows = []
+    rejected = []
+    for index, event in enumerate(events):
+        try:
+            rows.append(parse_interaction(current_user_id, event))
+        except (ValueError, OverflowError, OSError) as e:
+            rejected.append({'index': index, 'error': str(e)})
+
+    if not rows:
+        return jsonify({'error': 'No valid events', 'rejected': rejected}), 400
+
+    if not interaction_collector.offer(rows):
+        response = jsonify({'error': 'Events cannot be accepted right now, please retry'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    return jsonify({'accepted': len(rows), 'rejected': rejected}), 202
+
+
 
 
 
@@ -2101,8 +5988,7 @@ def get_team_course_progress(current_user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Verify user is a team leader and get their department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
         
         if not user or user['role'] != 'TeamLeader':
             return jsonify({'error': 'Unauthorized'}), 403
@@ -2175,8 +6061,7 @@ def get_department_employees(current_user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Verify user is a team leader and get their department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
         
         if not user or user['role'] != 'TeamLeader':
             return jsonify({'error': 'Unauthorized'}), 403
@@ -2225,8 +6110,7 @@ def get_department_members_progress(current_user_id):
         cursor = conn.cursor(dictionary=True)
 
         # Get team leader's department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
+        user = g.current_user
         if not user or user['role'] != 'TeamLeader':
             return jsonify({'error': 'Unauthorized'}), 403
 
@@ -2352,216 +6236,587 @@ def validate_token(current_user_id):
         cursor.close()
         conn.close()
 
-@app.route('/api/team-leader/export-tasks-pdf', methods=['GET'])
-@token_required
-def export_tasks_pdf(current_user_id):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+# PDF exports: each kind has a row fetcher (runs against the database) and a
+# renderer (pure function of those rows, safe to run in another process)
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', 2))
+EXPORT_JOB_TTL = int(os.getenv('EXPORT_JOB_TTL', 3600))
+EXPORT_MAX_PENDING = int(os.getenv('EXPORT_MAX_PENDING', 20))
+EXPORT_MAX_PENDING_PER_USER = int(os.getenv('EXPORT_MAX_PENDING_PER_USER', 2))
+EXPORT_STREAM_BATCH_SIZE = int(os.getenv('EXPORT_STREAM_BATCH_SIZE', 500))
+
+TASKS_EXPORT_SQL = '''
+    SELECT t.id, t.title, t.description, t.status, t.progress, t.deadline, u.name as assigned_to_name
+    FROM tasks t
+    JOIN users u ON t.assigned_to = u.id
+    WHERE u.department = %s
+    ORDER BY t.deadline DESC
+'''
+
+USERS_EXPORT_SQL = '''
+    SELECT name, email, phone_number, department, role, skill_level
+    FROM users
+    WHERE role = %s
+    ORDER BY department, name
+'''
+
+EMPLOYEE_REPORT_SQL = '''
+    SELECT 
+        u.id,
+        u.name,
+        u.email,
+        u.role,
+        u.department,
+        u.phone_number,
+        u.skill_level,
+        u.experience,
+        u.experience_level,
+        u.description,
+        u.is_active,
+        u.created_at,
+        COUNT(t.id) as total_tasks,
+        SUM(CASE WHEN t.status = 'Completed' THEN 1 ELSE 0 END) as completed_tasks,
+        SUM(CASE WHEN t.status = 'In Progress' THEN 1 ELSE 0 END) as in_progress_tasks,
+        AVG(t.progress) as avg_progress
+    FROM users u
+    LEFT JOIN tasks t ON u.id = t.assigned_to
+    WHERE u.role = 'Employee'
+    GROUP BY u.id
+    ORDER BY u.department, u.name
+'''
+
+def fetch_tasks_export(cursor, user):
+    department = user['department']
+    cursor.execute(TASKS_EXPORT_SQL, (department,))
+    return (department, cursor.fetchall())
+
+def fetch_users_export(role, title):
+    def fetch(cursor, user):
+        cursor.execute(USERS_EXPORT_SQL, (role,))
+        return (title, cursor.fetchall())
+    return fetch
+
+def fetch_employee_report_export(cursor, user):
+    cursor.execute('''
+        SELECT 
+            name, email, department, phone_number, skill_level, 
+            experience, experience_level, is_active, created_at
+        FROM users 
+        WHERE role = 'Employee'
+        ORDER BY department, name
+    ''')
+    return (cursor.fetchall(), datetime.datetime.now())
+
+def render_tasks_pdf(department, tasks):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt=f"Tasks for Department: {department}", ln=True, align='C')
+    pdf.ln(10)
+    pdf.set_font("Arial", size=10)
+    # Table header
+    pdf.cell(10, 10, "ID", 1)
+    pdf.cell(40, 10, "Title", 1)
+    pdf.cell(30, 10, "Assigned To", 1)
+    pdf.cell(25, 10, "Status", 1)
+    pdf.cell(20, 10, "Progress", 1)
+    pdf.cell(35, 10, "Deadline", 1)
+    pdf.ln()
+    # Table rows
+    for t in tasks:
+        deadline_str = str(t['deadline']) if not hasattr(t['deadline'], 'strftime') else t['deadline'].strftime('%Y-%m-%d %H:%M')
+        pdf.cell(10, 10, str(t['id']), 1)
+        pdf.cell(40, 10, t['title'][:20], 1)
+        pdf.cell(30, 10, t['assigned_to_name'][:15], 1)
+        pdf.cell(25, 10, t['status'], 1)
+        pdf.cell(20, 10, f"{t['progress']}%", 1)
+        pdf.cell(35, 10, deadline_str, 1)
+        pdf.ln()
+    return pdf.output(dest='S').encode('latin1')
+
+def render_users_pdf(title, users):
+    pdf = FPDF(orientation='L', unit='mm', format='A4')
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, txt=title, ln=True, align='C')
+    pdf.ln(5)
+    pdf.set_font("Arial", size=10)
+    # Table header
+    col_widths = [45, 60, 35, 35, 25, 35]  # Adjusted to fit A4 landscape
+    headers = ["Name", "Email", "Phone Number", "Department", "Role", "Skill Level"]
+    for i, header in enumerate(headers):
+        pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
+    pdf.ln()
+    # Table rows
+    for u in users:
+        pdf.cell(col_widths[0], 8, str(u['name'])[:30], 1, 0, 'L')
+        pdf.cell(col_widths[1], 8, str(u['email'])[:40], 1, 0, 'L')
+        pdf.cell(col_widths[2], 8, str(u['phone_number'] or ''), 1, 0, 'L')
+        pdf.cell(col_widths[3], 8, str(u['department'] or ''), 1, 0, 'L')
+        pdf.cell(col_widths[4], 8, str(u['role']), 1, 0, 'L')
+        pdf.cell(col_widths[5], 8, str(u['skill_level'] or ''), 1, 0, 'L')
+        pdf.ln()
+    return pdf.output(dest='S').encode('latin1')
+
+def render_employee_report_pdf(employees, generated_at):
+    pdf = FPDF(orientation='L', unit='mm', format='A4')
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(0, 10, txt="Employee Report", ln=True, align='C')
+    pdf.ln(5)
+    
+    # Add generation date
+    pdf.set_font("Arial", size=10)
+    pdf.cell(0, 8, txt=f"Generated on: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
+    pdf.ln(5)
+    
+    # Table header
+    col_widths = [35, 50, 25, 30, 25, 20, 20, 15, 25]
+    headers = ["Name", "Email", "Department", "Phone", "Skill Level", "Experience", "Exp Level", "Active", "Created"]
+    
+    for i, header in enumerate(headers):
+        pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
+    pdf.ln()
+    
+    # Table rows
+    for emp in employees:
+        pdf.cell(col_widths[0], 8, str(emp['name'])[:25], 1)
+        pdf.cell(col_widths[1], 8, str(emp['email'])[:35], 1)
+        pdf.cell(col_widths[2], 8, str(emp['department'] or ''), 1)
+        pdf.cell(col_widths[3], 8, str(emp['phone_number'] or '')[:20], 1)
+        pdf.cell(col_widths[4], 8, str(emp['skill_level'] or ''), 1)
+        pdf.cell(col_widths[5], 8, str(emp['experience'] or ''), 1)
+        pdf.cell(col_widths[6], 8, str(emp['experience_level'] or ''), 1)
+        pdf.cell(col_widths[7], 8, 'Yes' if emp['is_active'] else 'No', 1)
+        
+        created_date = emp['created_at'].strftime('%Y-%m-%d') if emp['created_at'] else ''
+        pdf.cell(col_widths[8], 8, created_date, 1)
+        pdf.ln()
+    return pdf.output(dest='S').encode('latin1')
+
+EXPORT_KINDS = {
+    'tasks': {
+        'role': 'TeamLeader',
+        'fetch': fetch_tasks_export,
+        'render': render_tasks_pdf,
+        'filename': 'tasks.pdf'
+    },
+    'employees': {
+        'role': 'Admin',
+        'fetch': fetch_users_export('Employee', 'Employees Listing'),
+        'render': render_users_pdf,
+        'filename': 'employees.pdf'
+    },
+    'team-leaders': {
+        'role': 'Admin',
+        'fetch': fetch_users_export('TeamLeader', 'Team Leaders Listing'),
+        'render': render_users_pdf,
+        'filename': 'team_leaders.pdf'
+    },
+    'employee-report': {
+        'role': 'Admin',
+        'fetch': fetch_employee_report_export,
+        'render': render_employee_report_pdf,
+        'filename': 'employee_report.pdf',
+        'forbidden': 'Only admins can export reports'
+    }
+}
 
-        # Get team leader's department
-        cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
-        if not user or user['role'] != 'TeamLeader':
-            return jsonify({'error': 'Unauthorized'}), 403
 
-        department = user['department']
+class ExportJobQueue:
+    """Runs PDF exports in the background and keeps the rendered files for download.
 
-        # Get all tasks in the department
-        cursor.execute('''
-            SELECT t.id, t.title, t.description, t.status, t.progress, t.deadline, u.name as assigned_to_name
-            FROM tasks t
-            JOIN users u ON t.assigned_to = u.id
-            WHERE u.department = %s
-            ORDER BY t.deadline DESC
-        ''', (department,))
-        tasks = cursor.fetchall()
+    Rows are fetched on a job thread through the connection pool and the PDF
+    is rendered in a process pool, so request workers only enqueue and poll.
+    Each job's state is mirrored to <job_id>.json next to its PDF in the
+    exports folder, so any worker sharing that folder can report on and serve
+    it. A worker accepts at most max_pending unfinished jobs, and at most
+    max_pending_per_user per user. Finished jobs and their files are dropped
+    after EXPORT_JOB_TTL seconds.
+    """
 
-        # Create PDF
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 10, txt=f"Tasks for Department: {department}", ln=True, align='C')
-        pdf.ln(10)
-        pdf.set_font("Arial", size=10)
-        # Table header
-        pdf.cell(10, 10, "ID", 1)
-        pdf.cell(40, 10, "Title", 1)
-        pdf.cell(30, 10, "Assigned To", 1)
-        pdf.cell(25, 10, "Status", 1)
-        pdf.cell(20, 10, "Progress", 1)
-        pdf.cell(35, 10, "Deadline", 1)
-        pdf.ln()
-        # Table rows
-        for t in tasks:
-            deadline_str = str(t['deadline']) if not hasattr(t['deadline'], 'strftime') else t['deadline'].strftime('%Y-%m-%d %H:%M')
-            pdf.cell(10, 10, str(t['id']), 1)
-            pdf.cell(40, 10, t['title'][:20], 1)
-            pdf.cell(30, 10, t['assigned_to_name'][:15], 1)
-            pdf.cell(25, 10, t['status'], 1)
-            pdf.cell(20, 10, f"{t['progress']}%", 1)
-            pdf.cell(35, 10, deadline_str, 1)
-            pdf.ln()
-
-        # Output PDF to memory (fix for fpdf)
+    JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+    def __init__(self, folder, workers=2, ttl=3600, max_pending=20, max_pending_per_user=2):
+        self.folder = folder
+        self.workers = workers
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self._processes = None
+
+    def _process_pool(self):
+        with self._lock:
+            if self._processes is None:
+                # Forking a threaded server can copy held locks into the child; forkserver
+                # starts renderers from a clean single-threaded process instead
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._processes = ProcessPoolExecutor(max_workers=self.workers,
+                                                      mp_context=multiprocessing.get_context(start_method))
+            return self._processes
+
+    def _reset_process_pool(self):
+        with self._lock:
+            self._processes = None
+
+    def submit(self, kind, user):
+        """Queue an export; returns the job, or None when the queue or the user's share of it is full"""
+        self._purge_expired()
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'user_id': user['id'],
+            'status': 'queued',
+            'created_at': datetime.datetime.now(),
+            'finished_at': None,
+            'error': None,
+            'filename': EXPORT_KINDS[kind]['filename'],
+            'path': None,
+            'size': None
+        }
+        with self._lock:
+            pending = [other for other in self._jobs.values() if other['finished_at'] is None]
+            if (len(pending) >= self.max_pending or
+                    sum(1 for other in pending if other['user_id'] == user['id']) >= self.max_pending_per_user):
+                return None
+            self._jobs[job['id']] = job
+            snapshot = dict(job)
+        self._save(snapshot)
+        self._threads.submit(self._run, job['id'], kind, dict(user))
+        return snapshot
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            snapshot = dict(job)
+        self._save(snapshot)
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.folder, f"{job_id}.json")
+
+    def _save(self, job):
+        record = dict(job,
+                      created_at=job['created_at'].isoformat(),
+                      finished_at=job['finished_at'].isoformat() if job['finished_at'] else None,
+                      path=os.path.basename(job['path']) if job['path'] else None)
         try:
-            pdf_bytes = pdf.output(dest='S').encode('latin1')
-            pdf_output = io.BytesIO(pdf_bytes)
-            pdf_output.seek(0)
-            return send_file(pdf_output, as_attachment=True, download_name="tasks.pdf", mimetype='application/pdf')
+            fd, temp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(record, f)
+            os.replace(temp_path, self._meta_path(job['id']))
+        except OSError as e:
+            logger.error(f"Error saving export job {job['id']}: {str(e)}")
+
+    def _load(self, job_id):
+        try:
+            with open(self._meta_path(job_id)) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        job['created_at'] = datetime.datetime.fromisoformat(job['created_at'])
+        if job['finished_at']:
+            job['finished_at'] = datetime.datetime.fromisoformat(job['finished_at'])
+        if job['path']:
+            job['path'] = os.path.join(self.folder, job['path'])
+        return job
+
+    def _run(self, job_id, kind, user):
+        spec = EXPORT_KINDS[kind]
+        self._update(job_id, status='running')
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                args = spec['fetch'](cursor, user)
+            finally:
+                cursor.close()
+                conn.close()
+
+            try:
+                pdf_bytes = self._process_pool().submit(spec['render'], *args).result()
+            except BrokenProcessPool:
+                self._reset_process_pool()
+                raise
+
+            path = os.path.join(self.folder, f"{job_id}.pdf")
+            with open(path, 'wb') as f:
+                f.write(pdf_bytes)
+            self._update(job_id, status='completed', path=path, size=len(pdf_bytes),
+                         finished_at=datetime.datetime.now())
         except Exception as e:
-            print('PDF generation error:', traceback.format_exc())
-            return jsonify({'error': 'PDF generation failed', 'details': str(e)}), 500
+            logger.error(f"Export job {job_id} failed: {str(e)}")
+            self._update(job_id, status='failed', error=str(e), finished_at=datetime.datetime.now())
+
+    def get(self, job_id):
+        if not self.JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        # Queued on another worker
+        return self._load(job_id)
+
+    def _purge_expired(self):
+        cutoff = datetime.datetime.now() - datetime.timedelta(seconds=self.ttl)
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job['finished_at'] and job['finished_at'] < cutoff]
+            for job in expired:
+                del self._jobs[job['id']]
+
+        # Every worker's jobs live in the shared folder; unfinished ones this old were abandoned
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return
+        for name in names:
+            job_id, extension = os.path.splitext(name)
+            if extension != '.json' or not self.JOB_ID_PATTERN.fullmatch(job_id):
+                continue
+            with self._lock:
+                if job_id in self._jobs:
+                    continue
+            job = self._load(job_id)
+            if job is None or (job['finished_at'] or job['created_at']) >= cutoff:
+                continue
+            for path in (job['path'], self._meta_path(job_id)):
+                if path and os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        logger.error(f"Error removing export file {path}: {str(e)}")
+
+
+export_jobs = ExportJobQueue(EXPORTS_FOLDER, workers=EXPORT_WORKERS, ttl=EXPORT_JOB_TTL,
+                            max_pending=EXPORT_MAX_PENDING, max_pending_per_user=EXPORT_MAX_PENDING_PER_USER)
+
+def send_export_pdf(kind):
+    """Build an export in the request and send it as a download"""
+    spec = EXPORT_KINDS[kind]
+    user = g.current_user
+    if not user or user['role'] != spec['role']:
+        return jsonify({'error': spec.get('forbidden', 'Unauthorized')}), 403
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        args = spec['fetch'](cursor, user)
     except Exception as e:
         return jsonify({'error': 'Server error', 'details': str(e)}), 500
     finally:
         cursor.close()
         conn.close()
 
+    try:
+        pdf_bytes = spec['render'](*args)
+        return send_file(io.BytesIO(pdf_bytes), as_attachment=True, download_name=spec['filename'], mimetype='application/pdf')
+    except Exception as e:
+        logger.exception(f"PDF generation error for {kind} export")
+        return jsonify({'error': 'PDF generation failed', 'details': str(e)}), 500
+
+def serialize_export_job(job):
+    return {
+        'jobId': job['id'],
+        'type': job['kind'],
+        'status': job['status'],
+        'createdAt': job['created_at'].isoformat(),
+        'finishedAt': job['finished_at'].isoformat() if job['finished_at'] else None,
+        'error': job['error'],
+        'size': job['size'],
+        'statusUrl': f"/api/exports/{job['id']}",
+        'downloadUrl': f"/api/exports/{job['id']}/download" if job['status'] == 'completed' else None
+    }
+
+@app.route('/api/team-leader/export-tasks-pdf', methods=['GET'])
+@token_required
+def export_tasks_pdf(current_user_id):
+    return send_export_pdf('tasks')
+
 @app.route('/api/admin/export-employees-pdf', methods=['GET'])
 @token_required
 def export_employees_pdf(current_user_id):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+    return send_export_pdf('employees')
 
-        # Check if user is admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
-        if not user or user['role'] != 'Admin':
-            return jsonify({'error': 'Unauthorized'}), 403
+@app.route('/api/admin/export-team-leaders-pdf', methods=['GET'])
+@token_required
+def export_team_leaders_pdf(current_user_id):
+    return send_export_pdf('team-leaders')
 
-        # Get all employees
-        cursor.execute('''
-            SELECT name, email, phone_number, department, role, skill_level
-            FROM users
-            WHERE role = 'Employee'
-            ORDER BY department, name
-        ''')
-        employees = cursor.fetchall()
+@app.route('/api/exports/<kind>', methods=['POST'])
+@token_required
+def create_export_job(current_user_id, kind):
+    """Queue a PDF export (tasks, employees, team-leaders, employee-report)"""
+    spec = EXPORT_KINDS.get(kind)
+    if not spec:
+        return jsonify({'error': 'Unknown export type'}), 404
+
+    user = g.current_user
+    if not user or user['role'] != spec['role']:
+        return jsonify({'error': spec.get('forbidden', 'Unauthorized')}), 403
+
+    job = export_jobs.submit(kind, user)
+    if job is None:
+        response = jsonify({'error': 'Too many exports in progress, please retry shortly'})
+        response.headers['Retry-After'] = '30'
+        return response, 429
+    return jsonify(serialize_export_job(job)), 202
+
+@app.route('/api/exports/<job_id>', methods=['GET'])
+@token_required
+def get_export_job(current_user_id, job_id):
+    """Get the status of a queued export"""
+    job = export_jobs.get(job_id)
+    if not job or job['user_id'] != current_user_id:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify(serialize_export_job(job))
+
+@app.route('/api/exports/<job_id>/download', methods=['GET'])
+@token_required
+def download_export(current_user_id, job_id):
+    """Download a finished export"""
+    job = export_jobs.get(job_id)
+    if not job or job['user_id'] != current_user_id:
+        return jsonify({'error': 'Export not found'}), 404
+    if job['status'] != 'completed':
+        return jsonify({'error': 'Export is not ready', 'status': job['status']}), 409
+    return send_file(job['path'], as_attachment=True, download_name=job['filename'], mimetype='application/pdf')
+
+# Row exports streamed straight from an unbuffered cursor: (role, query builder, columns)
+STREAM_EXPORTS = {
+    'tasks': {
+        'role': 'TeamLeader',
+        'query': lambda user: (TASKS_EXPORT_SQL, (user['department'],)),
+        'columns': ['id', 'title', 'description', 'status', 'progress', 'deadline', 'assigned_to_name']
+    },
+    'employees': {
+        'role': 'Admin',
+        'query': lambda user: (USERS_EXPORT_SQL, ('Employee',)),
+        'columns': ['name', 'email', 'phone_number', 'department', 'role', 'skill_level']
+    },
+    'team-leaders': {
+        'role': 'Admin',
+        'query': lambda user: (USERS_EXPORT_SQL, ('TeamLeader',)),
+        'columns': ['name', 'email', 'phone_number', 'department', 'role', 'skill_level']
+    },
+    'employee-report': {
+        'role': 'Admin',
+        'query': lambda user: (EMPLOYEE_REPORT_SQL, ()),
+        'columns': [
+            'id', 'name', 'email', 'role', 'department', 'phone_number', 'skill_level',
+            'experience', 'experience_level', 'description', 'is_active', 'created_at',
+            'total_tasks', 'completed_tasks', 'in_progress_tasks', 'avg_progress'
+        ],
+        'forbidden': 'Only admins can export reports'
+    }
+}
 
-        # Create PDF
-        pdf = FPDF(orientation='L', unit='mm', format='A4')
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 10, txt="Employees Listing", ln=True, align='C')
-        pdf.ln(5)
-        pdf.set_font("Arial", size=10)
-        # Table header
-        col_widths = [45, 60, 35, 35, 25, 35]  # Adjusted to fit A4 landscape
-        headers = ["Name", "Email", "Phone Number", "Department", "Role", "Skill Level"]
-        for i, header in enumerate(headers):
-            pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-        pdf.ln()
-        # Table rows
-        for emp in employees:
-            pdf.cell(col_widths[0], 8, str(emp['name'])[:30], 1)
-            pdf.cell(col_widths[1], 8, str(emp['email'])[:40], 1)
-            pdf.cell(col_widths[2], 8, str(emp['phone_number'] or ''), 1)
-            pdf.cell(col_widths[3], 8, str(emp['department'] or ''), 1)
-            pdf.cell(col_widths[4], 8, str(emp['role']), 1)
-            pdf.cell(col_widths[5], 8, str(emp['skill_level'] or ''), 1)
-            pdf.ln()
-
-        # Output PDF to memory
-        try:
-            pdf_bytes = pdf.output(dest='S').encode('latin1')
-            pdf_output = io.BytesIO(pdf_bytes)
-            pdf_output.seek(0)
-            return send_file(pdf_output, as_attachment=True, download_name="employees.pdf", mimetype='application/pdf')
-        except Exception as e:
-            import traceback
-            print('PDF generation error:', traceback.format_exc())
-            return jsonify({'error': 'PDF generation failed', 'details': str(e)}), 500
+STREAM_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+def csv_value(val):
+    if val is None:
+        return ''
+    if isinstance(val, (datetime.datetime, datetime.date)):
+        return val.isoformat()
+    if isinstance(val, bytes):
+        return val.decode('utf-8')
+    return val
+
+def stream_export_rows(conn, cursor, columns, fmt):
+    """Yield an export batch by batch from an already executed cursor"""
+    try:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == 'csv':
+            writer.writerow(columns)
+            yield buf.getvalue()
+
+        while True:
+            rows = cursor.fetchmany(EXPORT_STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            buf.seek(0)
+            buf.truncate()
+            if fmt == 'csv':
+                writer.writerows([csv_value(row[col]) for col in columns] for row in rows)
+            else:
+                for row in rows:
+                    buf.write(dumps_json({col: row[col] for col in columns}))
+                    buf.write('\n')
+            yield buf.getvalue()
     except Exception as e:
-        return jsonify({'error': 'Server error', 'details': str(e)}), 500
+        # Headers are already sent: mark NDJSON output as failed, then re-raise so the
+        # server aborts the chunked response and the client sees an incomplete transfer
+        logger.error(f"Error streaming export: {str(e)}")
+        if fmt == 'ndjson':
+            yield dumps_json({'error': 'Export failed before all rows were sent'}) + '\n'
+        raise
     finally:
-        cursor.close()
+        # Closing an unbuffered cursor with unread rows raises; the connection must still go back
+        try:
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Error closing export cursor: {str(e)}")
         conn.close()
 
-@app.route('/api/admin/export-team-leaders-pdf', methods=['GET'])
+@app.route('/api/exports/<kind>/stream', methods=['GET'])
 @token_required
-def export_team_leaders_pdf(current_user_id):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+def stream_export(current_user_id, kind):
+    """Stream an export as CSV (default) or NDJSON without loading it into memory"""
+    spec = STREAM_EXPORTS.get(kind)
+    if not spec:
+        return jsonify({'error': 'Unknown export type'}), 404
 
-        # Check if user is admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        user = cursor.fetchone()
-        if not user or user['role'] != 'Admin':
-            return jsonify({'error': 'Unauthorized'}), 403
+    user = g.current_user
+    if not user or user['role'] != spec['role']:
+        return jsonify({'error': spec.get('forbidden', 'Unauthorized')}), 403
 
-        # Get all team leaders
-        cursor.execute('''
-            SELECT name, email, phone_number, department, role, skill_level
-            FROM users
-            WHERE role = 'TeamLeader'
-            ORDER BY department, name
-        ''')
-        leaders = cursor.fetchall()
-
-        # Create PDF
-        pdf = FPDF(orientation='L', unit='mm', format='A4')
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 10, txt="Team Leaders Listing", ln=True, align='C')
-        pdf.ln(5)
-        pdf.set_font("Arial", size=10)
-        # Table header
-        col_widths = [45, 60, 35, 35, 25, 35]  # Adjusted to fit A4 landscape
-        headers = ["Name", "Email", "Phone Number", "Department", "Role", "Skill Level"]
-        for i, header in enumerate(headers):
-            pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-        pdf.ln()
-        # Table rows
-        for leader in leaders:
-            pdf.cell(col_widths[0], 8, str(leader['name'])[:30], 1, 0, 'L')
-            pdf.cell(col_widths[1], 8, str(leader['email'])[:40], 1, 0, 'L')
-            pdf.cell(col_widths[2], 8, str(leader['phone_number'] or ''), 1, 0, 'L')
-            pdf.cell(col_widths[3], 8, str(leader['department'] or ''), 1, 0, 'L')
-            pdf.cell(col_widths[4], 8, str(leader['role']), 1, 0, 'L')
-            pdf.cell(col_widths[5], 8, str(leader['skill_level'] or ''), 1, 0, 'L')
-            pdf.ln()
-
-        # Output PDF to memory
-        try:
-            pdf_bytes = pdf.output(dest='S').encode('latin1')
-            pdf_output = io.BytesIO(pdf_bytes)
-            pdf_output.seek(0)
-            return send_file(pdf_output, as_attachment=True, download_name="team_leaders.pdf", mimetype='application/pdf')
-        except Exception as e:
-            import traceback
-            print('PDF generation error:', traceback.format_exc())
-            return jsonify({'error': 'PDF generation failed', 'details': str(e)}), 500
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in STREAM_FORMATS:
+        return jsonify({'error': f"Unsupported format, expected one of: {', '.join(STREAM_FORMATS)}"}), 400
+
+    conn = get_db_connection()
+    # Unbuffered cursor: rows are read off the socket as the client consumes them
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        sql, params = spec['query'](user)
+        cursor.execute(sql, params)
     except Exception as e:
-        return jsonify({'error': 'Server error', 'details': str(e)}), 500
-    finally:
         cursor.close()
         conn.close()
+        logger.error(f"Error starting {kind} export: {str(e)}")
+        return jsonify({'error': 'Server error'}), 500
+
+    filename = f"{kind.replace('-', '_')}.{fmt}"
+    response = Response(
+        stream_with_context(stream_export_rows(conn, cursor, spec['columns'], fmt)),
+        mimetype=STREAM_FORMATS[fmt]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    # Let the first rows through reverse proxies without waiting for the rest
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 def to_number(val):
     if isinstance(val, Decimal):
         return float(val)
     return val
 
-def convert_decimals(obj):
-    if isinstance(obj, dict):
-        return {k: convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_decimals(i) for i in obj]
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    else:
-        return obj
-    
+
 @app.route('/api/leave-requests', methods=['GET'])
 @token_required
 def get_leave_requests(current_user_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-    user = cursor.fetchone()
+    user = g.current_user
     if user['role'] in ['Admin', 'TeamLeader']:
         cursor.execute('''
             SELECT lr.*, u.name as employee_name
@@ -2605,8 +6860,7 @@ def submit_leave_request(current_user_id):
 def get_job_applications(current_user_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-    user = cursor.fetchone()
+    user = g.current_user
     if user['role'] in ['Admin', 'TeamLeader']:
         cursor.execute('''
             SELECT ja.*, u.name as applicant_name
@@ -2629,6 +6883,7 @@ def get_job_applications(current_user_id):
 
 @app.route('/api/job-applications', methods=['POST'])
 @token_required
+@upload_limit(CV_MAX_BYTES)
 def submit_job_application(current_user_id):
     job_title = request.form.get('job_title')
     cover_letter = request.form.get('cover_letter')
@@ -2641,21 +6896,17 @@ def submit_job_application(current_user_id):
     ext = os.path.splitext(filename)[1].lower()
     if ext not in allowed_ext:
         return jsonify({'error': 'Invalid file type. Only PDF, DOC, DOCX allowed.'}), 400
-    if len(cv_file.read()) > 2 * 1024 * 1024:
-        return jsonify({'error': 'File too large. Max 2MB.'}), 400
-    cv_file.seek(0)
-    # Unique filename
-    unique_filename = f"{current_user_id}_{int(time.time())}_{filename}"
-    filepath = os.path.join(CV_UPLOAD_FOLDER, unique_filename)
-    cv_file.save(filepath)
-    cv_url = f'/uploads/cvs/{unique_filename}'
+    blob = blob_store.put(cv_file)
+    cv_url = blob_store.url('/uploads/cvs/', blob, filename)
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute('''
         INSERT INTO job_applications (job_title, user_id, cover_letter, cv_url)
         VALUES (%s, %s, %s, %s)
     ''', (job_title, current_user_id, cover_letter, cv_url))
+    blob_store.add_ref(cursor, blob)
     conn.commit()
+    response_cache.invalidate(['job_applications'], [g.current_user['department']])
     cursor.close()
     conn.close()
     return jsonify({'message': 'Application submitted', 'cv_url': cv_url}), 201
@@ -2669,14 +6920,14 @@ def update_job_application_status(current_user_id, application_id):
         return jsonify({'error': 'Invalid status'}), 400
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-    user = cursor.fetchone()
+    user = g.current_user
     if user['role'] not in ['Admin', 'TeamLeader']:
         return jsonify({'error': 'Unauthorized'}), 403
     cursor.execute('UPDATE job_applications SET status = %s WHERE id = %s', (status, application_id))
     conn.commit()
     cursor.close()
     conn.close()
+    response_cache.invalidate(['job_applications'])
     return jsonify({'message': 'Status updated'})
 
 @app.route('/api/leave-requests/<int:request_id>/status', methods=['PATCH'])
@@ -2689,8 +6940,7 @@ def update_leave_request_status(current_user_id, request_id):
         return jsonify({'error': 'Invalid status'}), 400
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-    user = cursor.fetchone()
+    user = g.current_user
     if user['role'] not in ['Admin', 'TeamLeader']:
         return jsonify({'error': 'Unauthorized'}), 403
     cursor.execute('UPDATE leave_requests SET status = %s, response = %s WHERE id = %s', (status, response, request_id))
@@ -2699,9 +6949,82 @@ def update_leave_request_status(current_user_id, request_id):
     conn.close()
     return jsonify({'message': 'Status updated'})
 
+# Upload delivery configuration: none | x-sendfile | x-accel-redirect
+UPLOAD_OFFLOAD = os.getenv('UPLOAD_OFFLOAD', 'none').lower()
+UPLOAD_ACCEL_PREFIX = os.getenv('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
+UPLOAD_CACHE_MAX_AGE = int(os.getenv('UPLOAD_CACHE_MAX_AGE', 86400))
+
+# send_file then hands the path to the front server instead of reading the file
+app.config['USE_X_SENDFILE'] = UPLOAD_OFFLOAD == 'x-sendfile'
+
+def upload_etag(stat):
+    """Strong validator in nginx's own mtime-size format, so app and proxy agree"""
+    return f'{int(stat.st_mtime):x}-{stat.st_size:x}'
+
+UPLOAD_REFERENCE_SQL = 'SELECT 1 as found FROM {table} WHERE {column} = %s LIMIT 1'
+
+def upload_referenced(folder, filename):
+    """Whether some row references filename under the URL prefix that serves folder"""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for table, column, prefix, reference_folder in UPLOAD_REFERENCES:
+            if reference_folder != folder:
+                continue
+            cursor.execute(UPLOAD_REFERENCE_SQL.format(table=table, column=column), (prefix + filename,))
+            if cursor.fetchone():
+                return True
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+def send_upload(folder, filename, as_attachment=False):
+    """Send a stored upload with strong validators, byte ranges and optional proxy offload.
+
+    Uploads are written once, as content-addressed blobs or under legacy
+    timestamped names, so mtime and size identify the content. Served in-process, send_file streams through wsgi.file_wrapper
+    (sendfile under gunicorn) and answers Range, If-Range, If-None-Match and
+    If-Modified-Since. With x-accel-redirect the app only checks the validators
+    and nginx serves the bytes, ranges included. Blobs are shared across
+    folders, so one is only served through a folder whose rows reference it.
+    """
+    blob_sha = blob_sha256(filename)
+    if blob_sha:
+        if not upload_referenced(folder, filename):
+            return jsonify({'error': 'File not found'}), 404
+        path = blob_store.path(blob_sha)
+        filename = BLOB_FILENAME_PATTERN.match(filename).group(2)
+    else:
+        path = safe_join(folder, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'error': 'File not found'}), 404
+
+    stat = os.stat(path)
+    etag = upload_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    if UPLOAD_OFFLOAD == 'x-accel-redirect':
+        response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        if not is_resource_modified(request.environ, etag=etag, last_modified=response.last_modified):
+            response.status_code = 304
+        else:
+            relative = os.path.relpath(path, UPLOAD_FOLDER).replace(os.sep, '/')
+            response.headers['X-Accel-Redirect'] = UPLOAD_ACCEL_PREFIX.rstrip('/') + '/' + quote(relative)
+            response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline', filename=filename)
+    else:
+        response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], as_attachment=as_attachment,
+                             download_name=filename, conditional=True, etag=etag, last_modified=last_modified)
+
+    response.headers['Cache-Control'] = f'private, max-age={UPLOAD_CACHE_MAX_AGE}'
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
 @app.route('/uploads/cvs/<filename>')
 def serve_cv(filename):
-    return send_file(os.path.join(CV_UPLOAD_FOLDER, filename))
+    return send_upload(CV_UPLOAD_FOLDER, filename)
 
 
 @app.route('/api/users/<int:user_id>/promote-skill', methods=['PUT'])
@@ -2712,8 +7035,7 @@ def promote_user_skill(current_user_id, user_id):
         cursor = conn.cursor(dictionary=True)
 
         # Check if current user is admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         if not current_user or current_user['role'] != 'Admin':
             return jsonify({'error': 'Only admins can promote skill level'}), 403
 
@@ -2724,6 +7046,8 @@ def promote_user_skill(current_user_id, user_id):
 
         cursor.execute('UPDATE users SET skill_level = %s WHERE id = %s', (skill_level, user_id))
         conn.commit()
+        principal_cache.invalidate(user_id)
+        response_cache.invalidate(['users'])
 
         # Fetch and return updated user
         cursor.execute('SELECT id, name, email, skill_level FROM users WHERE id = %s', (user_id,))
@@ -2738,14 +7062,14 @@ def promote_user_skill(current_user_id, user_id):
 
 @app.route('/api/quizzes/<int:quiz_id>/submit', methods=['POST'])
 @token_required
+@upload_limit(QUIZ_FILE_MAX_BYTES)
 def submit_quiz(current_user_id, quiz_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     # Check if user is allowed to submit (assigned or in department)
     cursor.execute('SELECT department, assigned_to FROM quizzes WHERE id = %s', (quiz_id,))
     quiz = cursor.fetchone()
-    cursor.execute('SELECT department FROM users WHERE id = %s', (current_user_id,))
-    user = cursor.fetchone()
+    user = g.current_user
     if not quiz or not user:
         return jsonify({'error': 'Quiz or user not found'}), 404
     if quiz['assigned_to'] and int(quiz['assigned_to']) != current_user_id:
@@ -2757,20 +7081,25 @@ def submit_quiz(current_user_id, quiz_id):
     if not file:
         return jsonify({'error': 'No file uploaded'}), 400
     filename = secure_filename(file.filename)
-    unique_filename = f'{quiz_id}_{current_user_id}_{int(time.time())}_{filename}'
-    filepath = os.path.join(QUIZ_SUBMISSION_FOLDER, unique_filename)
-    file.save(filepath)
-    file_url = f'/uploads/quiz_submissions/{unique_filename}'
+    blob = blob_store.put(file)
+    file_url = blob_store.url('/uploads/quiz_submissions/', blob, filename)
 
     cursor.execute('''
         INSERT INTO quiz_submissions (quiz_id, user_id, file_url)
         VALUES (%s, %s, %s)
     ''', (quiz_id, current_user_id, file_url))
+    blob_store.add_ref(cursor, blob)
     conn.commit()
     cursor.close()
     conn.close()
     return jsonify({'message': 'Submission successful'})
 
+QUIZ_SUBMISSIONS_SQL = '''
+    SELECT qs.*, u.name as user_name FROM quiz_submissions qs
+    JOIN users u ON qs.user_id = u.id
+    WHERE qs.quiz_id = %s
+'''
+
 @app.route('/api/quizzes/<int:quiz_id>/submissions', methods=['GET'])
 @token_required
 def get_quiz_submissions(current_user_id, quiz_id):
@@ -2781,11 +7110,7 @@ def get_quiz_submissions(current_user_id, quiz_id):
     quiz = cursor.fetchone()
     if not quiz or quiz['uploaded_by'] != current_user_id:
         return jsonify({'error': 'Not authorized'}), 403
-    cursor.execute('''
-        SELECT qs.*, u.name as user_name FROM quiz_submissions qs
-        JOIN users u ON qs.user_id = u.id
-        WHERE qs.quiz_id = %s
-    ''', (quiz_id,))
+    cursor.execute(QUIZ_SUBMISSIONS_SQL, (quiz_id,))
     submissions = cursor.fetchall()
     cursor.close()
     conn.close()
@@ -2797,11 +7122,11 @@ def quizzes_options():
 
 @app.route('/api/quizzes', methods=['POST'])
 @token_required
+@upload_limit(QUIZ_FILE_MAX_BYTES)
 def upload_quiz(current_user_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-    user = cursor.fetchone()
+    user = g.current_user
     if not user or user['role'] != 'TeamLeader':
         return jsonify({'error': 'Only TeamLeaders can upload quizzes'}), 403
 
@@ -2813,40 +7138,45 @@ def upload_quiz(current_user_id):
         return jsonify({'error': 'Missing title or file'}), 400
 
     filename = secure_filename(file.filename)
-    unique_filename = f"{int(time.time())}_{filename}"
-    filepath = os.path.join(QUIZ_UPLOAD_FOLDER, unique_filename)
-    file.save(filepath)
-    file_url = f'/uploads/quizzes/{unique_filename}'
+    blob = blob_store.put(file)
+    file_url = blob_store.url('/uploads/quizzes/', blob, filename)
 
     cursor.execute('''
         INSERT INTO quizzes (title, description, file_url, uploaded_by, department, assigned_to)
         VALUES (%s, %s, %s, %s, %s, %s)
     ''', (title, description, file_url, current_user_id, user['department'], assigned_to if assigned_to else None))
+    blob_store.add_ref(cursor, blob)
     conn.commit()
+    response_cache.invalidate(['quizzes'], [user['department']])
     cursor.close()
     conn.close()
     return jsonify({'message': 'Quiz uploaded successfully'}), 201
 
+TEAM_LEADER_QUIZZES_SQL = 'SELECT * FROM quizzes WHERE uploaded_by = %s'
+
+EMPLOYEE_QUIZZES_SQL = '''
+    SELECT * FROM quizzes
+    WHERE (department = %s AND (assigned_to IS NULL OR assigned_to = ''))
+       OR assigned_to = %s
+'''
+
 @app.route('/api/quizzes', methods=['GET'])
 @token_required
+@conditional_get('quizzes')
+@cached_response('quizzes', per_user=True)
 def list_quizzes(current_user_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute('SELECT role, department FROM users WHERE id = %s', (current_user_id,))
-    user = cursor.fetchone()
+    user = g.current_user
     if not user:
         return jsonify({'error': 'User not found'}), 404
 
     if user['role'] == 'TeamLeader':
         # See all quizzes uploaded by this team leader
-        cursor.execute('SELECT * FROM quizzes WHERE uploaded_by = %s', (current_user_id,))
+        cursor.execute(TEAM_LEADER_QUIZZES_SQL, (current_user_id,))
     else:
         # Employee: see quizzes for their department or assigned to them
-        cursor.execute('''
-            SELECT * FROM quizzes
-            WHERE (department = %s AND (assigned_to IS NULL OR assigned_to = ''))
-               OR assigned_to = %s
-        ''', (user['department'], current_user_id))
+        cursor.execute(EMPLOYEE_QUIZZES_SQL, (user['department'], current_user_id))
     quizzes = cursor.fetchall()
     cursor.close()
     conn.close()
@@ -2854,18 +7184,15 @@ def list_quizzes(current_user_id):
 
 @app.route('/uploads/quizzes/<filename>')
 def serve_quiz_file(filename):
-    filepath = os.path.join(QUIZ_UPLOAD_FOLDER, filename)
-    if not os.path.exists(filepath):
-        return jsonify({'error': 'File not found'}), 404
-    return send_file(filepath, as_attachment=True)
+    return send_upload(QUIZ_UPLOAD_FOLDER, filename, as_attachment=True)
 
 @app.route('/uploads/quiz_submissions/<filename>')
 def serve_quiz_submission_file(filename):
-    return send_file(os.path.join(QUIZ_SUBMISSION_FOLDER, filename))
+    return send_upload(QUIZ_SUBMISSION_FOLDER, filename)
 
 @app.route('/uploads/task_documents/<filename>')
 def serve_task_document(filename):
-    return send_file(os.path.join(TASK_DOCUMENTS_FOLDER, filename))
+    return send_upload(TASK_DOCUMENTS_FOLDER, filename)
 
 @app.route('/api/users/<int:user_id>/cv', methods=['GET'])
 @token_required
@@ -2876,8 +7203,7 @@ def get_user_cv(current_user_id, user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Check if current user is admin or team leader
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         if current_user['role'] not in ['Admin', 'TeamLeader']:
             return jsonify({'error': 'Unauthorized'}), 403
@@ -2911,6 +7237,7 @@ def get_user_cv(current_user_id, user_id):
 
 @app.route('/api/users/<int:user_id>/cv', methods=['POST'])
 @token_required
+@upload_limit(ADMIN_CV_MAX_BYTES)
 def upload_user_cv(current_user_id, user_id):
     """Upload CV for a specific user"""
     try:
@@ -2918,8 +7245,7 @@ def upload_user_cv(current_user_id, user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Check if current user is admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         if current_user['role'] != 'Admin':
             return jsonify({'error': 'Only admins can upload CVs'}), 403
@@ -2939,26 +7265,18 @@ def upload_user_cv(current_user_id, user_id):
         if ext not in allowed_ext:
             return jsonify({'error': 'Invalid file type. Only PDF, DOC, DOCX allowed.'}), 400
 
-        # Check file size (max 5MB)
-        cv_file.seek(0, 2)  # Seek to end
-        file_size = cv_file.tell()
-        cv_file.seek(0)  # Reset to beginning
-        if file_size > 5 * 1024 * 1024:
-            return jsonify({'error': 'File too large. Max 5MB.'}), 400
-
-        # Create unique filename
-        unique_filename = f"{user_id}_{int(time.time())}_{filename}"
-        filepath = os.path.join(CV_UPLOAD_FOLDER, unique_filename)
-        cv_file.save(filepath)
-        cv_url = f'/uploads/cvs/{unique_filename}'
+        blob = blob_store.put(cv_file)
+        cv_url = blob_store.url('/uploads/cvs/', blob, filename)
 
         # Store CV information in job_applications table as a special entry
         cursor.execute('''
             INSERT INTO job_applications (user_id, job_title, cover_letter, cv_url, status)
             VALUES (%s, %s, %s, %s, %s)
         ''', (user_id, 'Employee CV', 'CV uploaded by admin', cv_url, 'Accepted'))
+        blob_store.add_ref(cursor, blob)
         
         conn.commit()
+        response_cache.invalidate(['job_applications'])
         
         return jsonify({
             'message': 'CV uploaded successfully',
@@ -2972,6 +7290,20 @@ def upload_user_cv(current_user_id, user_id):
         cursor.close()
         conn.close()
 
+RECENT_EMPLOYEE_ACTIVITY_SQL = '''
+    SELECT
+        u.name,
+        u.department,
+        t.title as task_title,
+        t.status,
+        t.updated_at
+    FROM tasks t
+    JOIN users u ON t.assigned_to = u.id
+    WHERE u.role = 'Employee'
+    ORDER BY t.updated_at DESC
+    LIMIT 10
+'''
+
 @app.route('/api/admin/employee-report', methods=['GET'])
 @token_required
 def generate_employee_report(current_user_id):
@@ -2981,37 +7313,13 @@ def generate_employee_report(current_user_id):
         cursor = conn.cursor(dictionary=True)
         
         # Check if current user is admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
+        current_user = g.current_user
         
         if current_user['role'] != 'Admin':
             return jsonify({'error': 'Only admins can generate reports'}), 403
 
         # Get all employees with their details
-        cursor.execute('''
-            SELECT 
-                u.id,
-                u.name,
-                u.email,
-                u.role,
-                u.department,
-                u.phone_number,
-                u.skill_level,
-                u.experience,
-                u.experience_level,
-                u.description,
-                u.is_active,
-                u.created_at,
-                COUNT(t.id) as total_tasks,
-                SUM(CASE WHEN t.status = 'Completed' THEN 1 ELSE 0 END) as completed_tasks,
-                SUM(CASE WHEN t.status = 'In Progress' THEN 1 ELSE 0 END) as in_progress_tasks,
-                AVG(t.progress) as avg_progress
-            FROM users u
-            LEFT JOIN tasks t ON u.id = t.assigned_to
-            WHERE u.role = 'Employee'
-            GROUP BY u.id
-            ORDER BY u.department, u.name
-        ''')
+        cursor.execute(EMPLOYEE_REPORT_SQL)
         
         employees = cursor.fetchall()
         
@@ -3045,19 +7353,7 @@ def generate_employee_report(current_user_id):
         overall_stats = cursor.fetchone()
         
         # Get recent activity
-        cursor.execute('''
-            SELECT 
-                u.name,
-                u.department,
-                t.title as task_title,
-                t.status,
-                t.updated_at
-            FROM tasks t
-            JOIN users u ON t.assigned_to = u.id
-            WHERE u.role = 'Employee'
-            ORDER BY t.updated_at DESC
-            LIMIT 10
-        ''')
+        cursor.execute(RECENT_EMPLOYEE_ACTIVITY_SQL)
         
         recent_activity = cursor.fetchall()
         
@@ -3091,82 +7387,60 @@ def generate_employee_report(current_user_id):
 @token_required
 def export_employee_report_pdf(current_user_id):
     """Export employee report as PDF"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Check if current user is admin
-        cursor.execute('SELECT role FROM users WHERE id = %s', (current_user_id,))
-        current_user = cursor.fetchone()
-        
-        if current_user['role'] != 'Admin':
-            return jsonify({'error': 'Only admins can export reports'}), 403
-
-        # Get employee data for PDF
-        cursor.execute('''
-            SELECT 
-                name, email, department, phone_number, skill_level, 
-                experience, experience_level, is_active, created_at
-            FROM users 
-            WHERE role = 'Employee'
-            ORDER BY department, name
-        ''')
-        
-        employees = cursor.fetchall()
-
-        # Create PDF
-        pdf = FPDF(orientation='L', unit='mm', format='A4')
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 10, txt="Employee Report", ln=True, align='C')
-        pdf.ln(5)
-        
-        # Add generation date
-        pdf.set_font("Arial", size=10)
-        pdf.cell(0, 8, txt=f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
-        pdf.ln(5)
-        
-        # Table header
-        col_widths = [35, 50, 25, 30, 25, 20, 20, 15, 25]
-        headers = ["Name", "Email", "Department", "Phone", "Skill Level", "Experience", "Exp Level", "Active", "Created"]
-        
-        for i, header in enumerate(headers):
-            pdf.cell(col_widths[i], 10, header, 1, 0, 'C')
-        pdf.ln()
-        
-        # Table rows
-        for emp in employees:
-            pdf.cell(col_widths[0], 8, str(emp['name'])[:25], 1)
-            pdf.cell(col_widths[1], 8, str(emp['email'])[:35], 1)
-            pdf.cell(col_widths[2], 8, str(emp['department'] or ''), 1)
-            pdf.cell(col_widths[3], 8, str(emp['phone_number'] or '')[:20], 1)
-            pdf.cell(col_widths[4], 8, str(emp['skill_level'] or ''), 1)
-            pdf.cell(col_widths[5], 8, str(emp['experience'] or ''), 1)
-            pdf.cell(col_widths[6], 8, str(emp['experience_level'] or ''), 1)
-            pdf.cell(col_widths[7], 8, 'Yes' if emp['is_active'] else 'No', 1)
-            
-            created_date = emp['created_at'].strftime('%Y-%m-%d') if emp['created_at'] else ''
-            pdf.cell(col_widths[8], 8, created_date, 1)
-            pdf.ln()
-
-        # Output PDF to memory
-        try:
-            pdf_bytes = pdf.output(dest='S').encode('latin1')
-            pdf_output = io.BytesIO(pdf_bytes)
-            pdf_output.seek(0)
-            return send_file(pdf_output, as_attachment=True, download_name="employee_report.pdf", mimetype='application/pdf')
-        except Exception as e:
-            print('PDF generation error:', traceback.format_exc())
-            return jsonify({'error': 'PDF generation failed', 'details': str(e)}), 500
-            
-    except Exception as e:
-        return jsonify({'error': 'Server error', 'details': str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    return send_export_pdf('employee-report')
+
+# The hot routes' SQL for check_query_plans(), taken from the same constants and
+# builders the handlers run, with representative parameters
+HOT_QUERY_TEAM_LEADER = {'role': 'TeamLeader', 'department': 'IT'}
+HOT_QUERY_EMPLOYEE = {'role': 'Employee', 'department': 'IT'}
+
+HOT_QUERIES = [
+    ('login', USER_BY_EMAIL_SQL, ('admin@gmail.com',)),
+    ('login', ACTIVE_SESSIONS_LOCK_SQL.format(placeholders='%s'), (1,)),
+    ('session_sweep', EXPIRED_SESSIONS_SQL, ('2000-01-01',)),
+    ('token_required', PRINCIPAL_SQL, (1,)),
+    ('get_users', USERS_LISTING_SQL.format(where='WHERE u.department = %s'), ('IT',)),
+    ('get_tasks',) + build_task_page_query(*task_list_scope(HOT_QUERY_TEAM_LEADER, 1), [], [], TASKS_PAGE_SIZE, None),
+    ('get_tasks',) + build_task_page_query(*task_list_scope(HOT_QUERY_EMPLOYEE, 1), [], [], TASKS_PAGE_SIZE, None),
+    ('get_tasks_by_status',) + build_task_page_query(TASK_STATUS_SELECT, *task_status_scope(HOT_QUERY_TEAM_LEADER, 1),
+                                                     ['t.status = %s'], ['Todo'], TASKS_PAGE_SIZE, None),
+    ('get_tasks_by_status',) + build_task_status_aggregate(*task_status_scope(HOT_QUERY_TEAM_LEADER, 1)),
+    *[('get_team_leader_dashboard', sql, ('IT',)) for sql in TEAM_LEADER_DASHBOARD_QUERIES.values()],
+    *[('dashboard_summary', sql, params) for sql, params in DASHBOARD_SUMMARY_QUERIES.values()],
+    ('get_courses', COURSE_CATALOG_SQL.format(where='WHERE c.department = %s'), ('IT',)),
+    ('get_notifications',) + build_notification_page_query(1, False, False, NOTIFICATIONS_PAGE_SIZE, None),
+    ('get_unread_notification_count', UNREAD_COUNT_SQL, (1,)),
+    ('get_employee_dashboard', EMPLOYEE_TASKS_SQL, (1,)),
+    ('get_employee_dashboard', EMPLOYEE_DEMONSTRATIONS_SQL, (1,)),
+    ('generate_employee_report', RECENT_EMPLOYEE_ACTIVITY_SQL, ()),
+    ('list_quizzes', TEAM_LEADER_QUIZZES_SQL, (1,)),
+    ('list_quizzes', EMPLOYEE_QUIZZES_SQL, ('IT', 1)),
+    ('get_quiz_submissions', QUIZ_SUBMISSIONS_SQL, (1,)),
+    *[('send_upload', UPLOAD_REFERENCE_SQL.format(table=table, column=column), (prefix + '0' * 64 + '_file.pdf',))
+      for table, column, prefix, folder in UPLOAD_REFERENCES]
+]
 
 #
 if __name__ == '__main__':
-    # Log the server startup
-    #Always remember to run the app at port 5000
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == 'migrate':
+        applied = apply_migrations()
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+    elif command == 'check-indexes':
+        findings = check_query_plans()
+        for finding in findings:
+            flag = 'FULL SCAN' if finding['full_scan'] else 'ok'
+            print(f"{flag:9} {finding['route']:28} {finding['table'] or '-':32} type={finding['type']} key={finding['key']} rows={finding['rows']}")
+        sys.exit(1 if any(f['full_scan'] for f in findings) else 0)
+    elif command == 'dedupe-uploads':
+        imported = blob_store.import_legacy_uploads()
+        print(f"Moved {imported['files']} files ({imported['rows']} rows) into the blob store, "
+              f"{imported['bytes_saved']} duplicate bytes freed")
+    elif command == 'gc-uploads':
+        removed = blob_store.collect_garbage()
+        print(f"Removed {len(removed)} unreferenced blobs")
+    else:
+        # Log the server startup
+        #Always remember to run the app at port 5000
+        app.run(debug=True, port=5000)
\ No newline at end of file
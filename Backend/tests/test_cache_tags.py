@@ -0,0 +1,32 @@
+from server import cache_tags, invalidation_tags
+
+
+def test_cache_tags_for_a_department():
+    assert cache_tags(['tasks'], ['IT']) == ['tasks', 'dept:IT/tasks']
+
+
+def test_cache_tags_for_every_department():
+    assert cache_tags(['tasks', 'users'], None) == ['tasks', 'users', 'dept:*/tasks', 'dept:*/users']
+
+
+def test_unscoped_write_invalidates_the_whole_entity():
+    assert invalidation_tags(['tasks']) == ['tasks']
+    assert invalidation_tags(['tasks'], [None, '']) == ['tasks']
+
+
+def test_department_write_invalidates_that_department_and_cross_department_entries():
+    assert invalidation_tags(['tasks'], ['IT', 'IT']) == ['dept:IT/tasks', 'dept:*/tasks']
+
+
+def test_invalidation_reaches_the_entries_that_read_the_data():
+    it_entry = set(cache_tags(['tasks'], ['IT']))
+    sales_entry = set(cache_tags(['tasks'], ['Sales']))
+    admin_entry = set(cache_tags(['tasks'], None))
+
+    it_write = set(invalidation_tags(['tasks'], ['IT']))
+    assert it_write & it_entry
+    assert it_write & admin_entry
+    assert not it_write & sales_entry
+
+    unscoped_write = set(invalidation_tags(['tasks']))
+    assert all(unscoped_write & entry for entry in (it_entry, sales_entry, admin_entry))
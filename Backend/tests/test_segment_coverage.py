@@ -0,0 +1,55 @@
+from server import SegmentCoverage
+
+
+def test_overlapping_and_touching_runs_merge():
+    coverage = SegmentCoverage([(5, 8), (0, 3), (3, 4), (7, 10)])
+    assert coverage.runs == [[0, 4], [5, 10]]
+
+
+def test_empty_runs_are_dropped():
+    assert SegmentCoverage([(4, 4), (6, 2)]).runs == []
+
+
+def test_add_bridges_a_gap():
+    coverage = SegmentCoverage([(0, 2), (5, 7)])
+    coverage.add(2, 5)
+    assert coverage.runs == [[0, 7]]
+
+
+def test_union_leaves_operands_alone():
+    left = SegmentCoverage([(0, 2)])
+    right = SegmentCoverage([(10, 12)])
+    assert left.union(right).runs == [[0, 2], [10, 12]]
+    assert left.runs == [[0, 2]]
+    assert right.runs == [[10, 12]]
+
+
+def test_from_json_accepts_runs_and_legacy_indexes():
+    assert SegmentCoverage.from_json('[[0, 3], [2, 5]]').runs == [[0, 5]]
+    assert SegmentCoverage.from_json([0, 1, 2, 4]).runs == [[0, 3], [4, 5]]
+    assert SegmentCoverage.from_json('not json').runs == []
+    assert SegmentCoverage.from_json(None).runs == []
+
+
+def test_json_round_trip():
+    coverage = SegmentCoverage([(0, 12), (30, 41)])
+    assert coverage.to_json() == '[[0,12],[30,41]]'
+    assert SegmentCoverage.from_json(coverage.to_json()) == coverage
+
+
+def test_from_span_covers_every_touched_segment():
+    assert SegmentCoverage.from_span(5, 25, segment_seconds=10).runs == [[0, 3]]
+    assert SegmentCoverage.from_span(10, 10, segment_seconds=10).runs == []
+
+
+def test_percentage_counts_only_segments_below_total():
+    coverage = SegmentCoverage([(0, 5), (8, 20)])
+    assert coverage.covered() == 17
+    assert coverage.covered(10) == 7
+    assert coverage.percentage(10) == 70.0
+
+
+def test_percentage_is_capped_and_handles_no_total():
+    assert SegmentCoverage([(0, 50)]).percentage(10) == 100.0
+    assert SegmentCoverage([(0, 5)]).percentage(0) == 0.0
+    assert SegmentCoverage([(0, 5)]).percentage(None) == 0.0
@@ -0,0 +1,41 @@
+from server import TokenCache, session_floor
+
+
+def test_session_floor_without_sessions():
+    assert session_floor(None, None) == 0
+
+
+def test_session_floor_is_the_active_latest_session():
+    assert session_floor(12, 12) == 12
+
+
+def test_session_floor_passes_an_ended_latest_session():
+    assert session_floor(12, None) == 13
+    assert session_floor(12, 9) == 13
+
+
+def test_tokens_without_a_session_are_never_revoked():
+    assert not TokenCache().is_revoked({'user_id': 1}, session_floor=50)
+
+
+def test_revoked_below_the_principal_floor():
+    cache = TokenCache()
+    assert cache.is_revoked({'user_id': 1, 'sid': 4}, session_floor=5)
+    assert not cache.is_revoked({'user_id': 1, 'sid': 5}, session_floor=5)
+    assert not cache.is_revoked({'user_id': 1, 'sid': 5}, session_floor=None)
+    assert cache.metrics()['revoked'] == 1
+
+
+def test_local_revocation_applies_before_the_principal_catches_up():
+    cache = TokenCache()
+    cache.revoke_sessions_before(1, 8)
+    assert cache.is_revoked({'user_id': 1, 'sid': 7}, session_floor=0)
+    assert not cache.is_revoked({'user_id': 1, 'sid': 8}, session_floor=0)
+    assert not cache.is_revoked({'user_id': 2, 'sid': 7}, session_floor=0)
+
+
+def test_local_floor_only_moves_forward():
+    cache = TokenCache()
+    cache.revoke_sessions_before(1, 8)
+    cache.revoke_sessions_before(1, 3)
+    assert cache.is_revoked({'user_id': 1, 'sid': 7}, session_floor=0)
@@ -0,0 +1,54 @@
+import datetime
+
+import pytest
+
+import server
+from server import decode_cursor, encode_cursor, parse_task_query_args
+
+
+def test_cursor_round_trip():
+    values = ['2025-01-31T00:00:00', 42]
+    cursor = encode_cursor(values)
+    assert isinstance(cursor, str)
+    assert decode_cursor(cursor) == values
+
+
+def test_defaults():
+    assert parse_task_query_args({}) == ([], [], server.TASKS_PAGE_SIZE, None)
+
+
+def test_filters_become_clauses_and_params():
+    clauses, params, limit, cursor = parse_task_query_args({
+        'assignee': '7',
+        'status': 'Todo',
+        'deadline_from': '2025-01-01',
+        'deadline_to': '2025-02-01T12:00:00',
+        'limit': '20'
+    })
+    assert clauses == ['t.assigned_to = %s', 't.status = %s', 't.deadline >= %s', 't.deadline <= %s']
+    assert params == [7, 'Todo', datetime.datetime(2025, 1, 1), datetime.datetime(2025, 2, 1, 12)]
+    assert limit == 20
+    assert cursor is None
+
+
+def test_limit_is_clamped():
+    assert parse_task_query_args({'limit': '0'})[2] == 1
+    assert parse_task_query_args({'limit': '100000'})[2] == server.TASKS_MAX_PAGE_SIZE
+
+
+def test_cursor_is_decoded():
+    cursor = encode_cursor(['2025-03-01T09:30:00', '15'])
+    assert parse_task_query_args({'cursor': cursor})[3] == (datetime.datetime(2025, 3, 1, 9, 30), 15)
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'assignee': 'abc'}, 'assignee must be an integer'),
+    ({'status': 'Archived'}, 'Invalid status'),
+    ({'deadline_from': 'yesterday'}, 'Invalid deadline_from'),
+    ({'limit': 'many'}, 'Invalid limit'),
+    ({'cursor': 'not-a-cursor'}, 'Invalid cursor'),
+    ({'cursor': encode_cursor(['2025-03-01'])}, 'Invalid cursor')
+])
+def test_bad_input_raises_value_error(args, message):
+    with pytest.raises(ValueError, match=message):
+        parse_task_query_args(args)
@@ -0,0 +1,77 @@
+import hashlib
+import io
+import os
+
+import pytest
+from flask import jsonify, request
+
+import server
+
+UPLOAD_TEST_LIMIT = 1024
+
+
+@server.upload_limit(UPLOAD_TEST_LIMIT)
+def limited_upload():
+    destination = os.path.join(request.form['directory'], 'stored')
+    return jsonify(server.save_upload(request.files['file'], destination))
+
+def unlimited_upload():
+    destination = os.path.join(request.form['directory'], 'stored')
+    return jsonify(server.save_upload(request.files['file'], destination))
+
+server.app.add_url_rule('/_test/uploads/limited', 'test_limited_upload', limited_upload, methods=['POST'])
+server.app.add_url_rule('/_test/uploads/unlimited', 'test_unlimited_upload', unlimited_upload, methods=['POST'])
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def post(client, url, directory, content):
+    return client.post(url, data={'directory': str(directory), 'file': (io.BytesIO(content), 'upload.txt')},
+                       content_type='multipart/form-data')
+
+
+def spooled_files():
+    return os.listdir(server.UPLOAD_INCOMING_FOLDER)
+
+
+@pytest.mark.parametrize('url', ['/_test/uploads/limited', '/_test/uploads/unlimited'])
+def test_save_upload_returns_size_and_sha256(client, tmp_path, url):
+    content = b'quarterly report\n' * 10
+    response = post(client, url, tmp_path, content)
+    assert response.status_code == 200
+    assert response.get_json() == {'size': len(content), 'sha256': hashlib.sha256(content).hexdigest()}
+    assert (tmp_path / 'stored').read_bytes() == content
+
+
+def test_file_at_the_limit_is_accepted(client, tmp_path):
+    response = post(client, '/_test/uploads/limited', tmp_path, b'x' * UPLOAD_TEST_LIMIT)
+    assert response.status_code == 200
+    assert response.get_json()['size'] == UPLOAD_TEST_LIMIT
+
+
+def test_oversized_content_length_is_refused_before_parsing(client, tmp_path):
+    content = b'x' * (UPLOAD_TEST_LIMIT + server.UPLOAD_FORM_OVERHEAD + 1)
+    response = post(client, '/_test/uploads/limited', tmp_path, content)
+    assert response.status_code == 413
+    assert response.get_json() == {'error': f'File too large. Max {UPLOAD_TEST_LIMIT / (1024 * 1024):g}MB.'}
+    assert not (tmp_path / 'stored').exists()
+
+
+def test_file_growing_past_the_limit_stops_the_parse(client, tmp_path):
+    before = set(spooled_files())
+    response = post(client, '/_test/uploads/limited', tmp_path, b'x' * (UPLOAD_TEST_LIMIT + 1))
+    assert response.status_code == 413
+    assert not (tmp_path / 'stored').exists()
+    # The partially spooled file is removed with the request
+    assert set(spooled_files()) <= before
+
+
+def test_spooled_file_is_moved_into_place(client, tmp_path):
+    before = set(spooled_files())
+    response = post(client, '/_test/uploads/limited', tmp_path, b'notes')
+    assert response.status_code == 200
+    assert (tmp_path / 'stored').read_bytes() == b'notes'
+    assert set(spooled_files()) <= before
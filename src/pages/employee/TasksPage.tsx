@@ -16,6 +16,7 @@ const API_URL = 'https://manzi897098.pythonanywhere.com/api';
 
 interface TaskResponse {
   tasks: Task[];
+  next_cursor: string | null;
   overall_progress: number;
   task_counts: {
     total: number;
@@ -66,7 +67,23 @@ export default function TasksPage() {
         }
 
         const data: TaskResponse = await response.json();
-        setUserTasks(data.tasks);
+        // Counts and progress cover every task; the list itself is paginated
+        const tasks = [...data.tasks];
+        let cursor = data.next_cursor;
+        while (cursor) {
+          const pageResponse = await fetch(`${API_URL}/tasks/status?cursor=${encodeURIComponent(cursor)}`, {
+            headers: {
+              'Authorization': `Bearer ${token}`
+            }
+          });
+          if (!pageResponse.ok) {
+            throw new Error('Failed to fetch tasks');
+          }
+          const page: TaskResponse = await pageResponse.json();
+          tasks.push(...page.tasks);
+          cursor = page.next_cursor;
+        }
+        setUserTasks(tasks);
         setOverallProgress(data.overall_progress);
         setTaskCounts({
           total: data.task_counts.total,
@@ -45,19 +45,28 @@ export default function TeamLeaderTasksPage() {
       const token = localStorage.getItem('token');
       if (!token) throw new Error('No authentication token found');
 
-      const tasksResponse = await fetch(`${API_URL}/tasks/status`, {
-        headers: {
-          'Authorization': `Bearer ${token}`
+      // The endpoint is paginated; follow next_cursor until every task is loaded
+      const tasks: Task[] = [];
+      let cursor: string | null = null;
+      do {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const tasksResponse = await fetch(`${API_URL}/tasks/status${query}`, {
+          headers: {
+            'Authorization': `Bearer ${token}`
+          }
+        });
+
+        if (!tasksResponse.ok) {
+          throw new Error('Failed to fetch tasks');
         }
-      });
 
-      if (!tasksResponse.ok) {
-        throw new Error('Failed to fetch tasks');
-      }
+        const page = await tasksResponse.json();
+        tasks.push(...page.tasks);
+        cursor = page.next_cursor;
+      } while (cursor);
 
-      const response = await tasksResponse.json();
       // Filter tasks to only show those from the team leader's department
-      const departmentTasks = response.tasks.filter((task: Task) => {
+      const departmentTasks = tasks.filter((task: Task) => {
         // For Customer Service team leaders, show tasks from both Customer Service and Finance
         if (currentUser?.department === 'Customer-Service') {
           return ['Customer-Service'].includes(task.assigned_to_department);
@@ -61,19 +61,22 @@ const transformTaskForBackend = (task: Partial<Task>) => {
   };
 };
 
-// Get all tasks with error handling
+// Get all tasks with error handling; /tasks is paginated, so follow X-Next-Cursor to the last page
 export const getTasks = async (): Promise<Task[]> => {
-  const response = await apiGet<BackendTask[]>('/tasks');
-  
-  if (response.error) {
-    throw new Error(response.error);
-  }
-  
-  if (!response.data) {
-    return [];
-  }
-  
-  return response.data.map(transformTaskData);
+  const tasks: BackendTask[] = [];
+  let cursor: string | undefined;
+
+  do {
+    try {
+      const response = await apiClient.get<BackendTask[]>('/tasks', { params: cursor ? { cursor } : undefined });
+      tasks.push(...(response.data || []));
+      cursor = response.headers['x-next-cursor'] || undefined;
+    } catch (error) {
+      throw new Error((error as Error).message || 'An unknown error occurred');
+    }
+  } while (cursor);
+
+  return tasks.map(transformTaskData);
 };
 
 // Create a new task